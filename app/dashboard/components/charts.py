@@ -2,6 +2,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
+from app.dashboard.utils.aggregates import ADULT_SHARE_PREFIX, SHARE_PREFIX, VOTING_PREFIX, pivot_aggregates
+from app.dashboard.utils.constants import AGE_ANALYSIS_GROUPS, AGE_ORDER, GRAPH_COLORS, LARGE_SELECTION_THRESHOLD
+from app.dashboard.visualizations.charts import LARGE_SELECTION_MODES, create_comparison_chart, pivot_by_age
+from app.dashboard.utils.shared_dataset import get_aggregates
 
 def create_time_series_plot(df: pd.DataFrame, column: str, title: str = None):
     """時系列グラフを作成する関数"""
@@ -290,75 +294,9 @@ def create_voting_power_chart(df_list):
         # DataFrameに変換
         result_df = pd.DataFrame(result_data)
         
-        # グラフの作成
-        fig = go.Figure()
-        
-        # カラーマップの定義
-        colors = {
-            '20代': '#FFD700',      # 黄色
-            '30代': '#FF7F00',      # オレンジ
-            '40代': '#9370DB',      # 紫
-            '50代': '#FF4500',      # 赤
-            '60代': '#98FB98',      # 薄緑
-            '70歳以上': '#20B2AA'    # ターコイズ
-        }
-        
-        # x軸のラベルを作成（自治体ごとに人口構成比と投票影響度を並る）
-        x_labels = []
-        codes = sorted(municipality_names.keys())
-        for code in codes:
-            x_labels.extend([f"{municipality_names[code]}\n(人口構成比)", f"{municipality_names[code]}\n(投票影響度)"])
-        
-        # 年齢区分ごとにデータを追加
-        for age in age_order:
-            age_data = result_df[result_df['年齢区分'] == age]
-            y_values = []
-            text_values = []
-            
-            # 自治体ごとに人口構成比と投票影響度のデータを交互に配置
-            for code in codes:
-                mun_data = age_data[age_data['団体コード'] == code]
-                if not mun_data.empty:
-                    y_values.extend([
-                        mun_data['人口構成比'].values[0],
-                        mun_data['投票影響度'].values[0]
-                    ])
-                    text_values.extend([
-                        f'{mun_data["人口構成比"].values[0]:.1f}%',
-                        f'{mun_data["投票影響度"].values[0]:.1f}%'
-                    ])
-                else:
-                    print(f"警告: {code} ({municipality_names.get(code, '不明')}) の {age} のデータが見つかりません")
-                    y_values.extend([0, 0])
-                    text_values.extend(['0.0%', '0.0%'])
-            
-            fig.add_trace(go.Bar(
-                name=f"{age}",
-                x=x_labels,
-                y=y_values,
-                text=text_values,
-                textposition='auto',
-                marker_color=colors[age],
-                showlegend=True
-            ))
-        
-        # レイアウトの設定
-        fig.update_layout(
-            title='年齢区分別の人口構成比と投票影響度（20歳以上）',
-            barmode='stack',
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            height=500,
-            yaxis_title='割合 (%)',
-            yaxis={'range': [0, 100]},
-            margin=dict(t=100)
-        )
+        # 市区町村×年齢区分の表を1度だけ作り、年齢区分ごとのトレースを作る
+        pivots = {label: pivot_by_age(result_df, label) for label in ['人口構成比', '投票影響度']}
+        fig = create_comparison_chart(pivots, '年齢区分別の人口構成比と投票影響度（20歳以上）', GRAPH_COLORS)
         
         return fig
         
@@ -366,222 +304,77 @@ def create_voting_power_chart(df_list):
         print(f"グラフ作成エラー: {str(e)}")
         return None
 
-def display_age_analysis(df: pd.DataFrame, prefecture: str):
-    """年齢構成分析を表示する関数"""
-    st.header("年齢構成分析")
-    
-    # 年齢区分の定義
-    age_groups = {
-        '20歳未満': ['0歳～4歳', '5歳～9歳', '10歳～14歳', '15歳～19歳'],
-        '30代': ['30歳～34歳', '35歳～39歳'],
-        '40代': ['40歳～44歳', '45歳～49歳'],
-        '50代': ['50歳～54歳', '55歳～59歳'],
-        '60代': ['60歳～64歳', '65歳～69歳'],
-        '70歳以上': ['70歳～74歳', '75歳～79歳', '80歳～84歳', '85歳～89歳', '90歳～94歳', '95歳～99歳', '100歳以上']
-    }
-    
-    # 年齢区分ごとの人口を計算
-    results = []
-    for _, row in df.iterrows():
-        city_name = row['市区町村名']
-        total_pop = float(row['総数'])
-        
-        for group, columns in age_groups.items():
-            population = sum(float(row[col]) for col in columns)
-            ratio = (population / total_pop * 100) if total_pop > 0 else 0
-            results.append({
-                '市区町村名': city_name,
-                '年齢区分': group,
-                '人口': population,
-                '構成比': ratio
-            })
-    
-    age_df = pd.DataFrame(results)
-    
-    # グラフの作成
-    fig = px.bar(
-        age_df,
-        x='市区町村名',
-        y='構成比',
-        color='年齢区分',
-        title=f'{prefecture}の年齢構成比率',
-        labels={'構成比': '構成比率 (%)', '市区町村名': '市区町村'},
-        height=600,  # 高さを600pxに変更
-        text=age_df['構成比'].apply(lambda x: f'{x:.1f}%')  # パーセント表示を追加
+def select_large_selection_mode(count: int, key: str) -> str:
+    """選択数が多い場合に、グラフの表示方法を選ぶ（少ない場合は積み上げ棒グラフ）"""
+    if count <= LARGE_SELECTION_THRESHOLD:
+        return 'heatmap'
+    st.caption(f"{count}件の市区町村を選択しているため、積み上げ棒グラフの代わりに一覧できる表示に切り替えています。")
+    return st.radio(
+        "表示方法",
+        list(LARGE_SELECTION_MODES),
+        format_func=LARGE_SELECTION_MODES.get,
+        horizontal=True,
+        key=key
     )
+
+def display_age_analysis(df: pd.DataFrame, prefecture: str, aggregates: pd.DataFrame = None):
+    """年齢構成分析を表示する関数（aggregatesには読み込み時に計算済みの集計行を渡す）"""
+    st.header("年齢構成分析")
     
-    fig.update_layout(
-        barmode='stack',
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        yaxis={'range': [0, 100]},
-        margin=dict(t=100, b=50),  # 上下のマージンを調整
-        uniformtext_minsize=8,  # テキストの最小サイズ
-        uniformtext_mode='hide'  # 小さすぎるテキストは非表示
-    )
+    # 年齢区分ごとの人口と構成比（集計済みの行から市区町村×年齢区分の表を1度だけ作る）
+    if aggregates is None:
+        aggregates = get_aggregates(df)
+    groups = list(AGE_ANALYSIS_GROUPS)
+    population = pivot_aggregates(df, aggregates, groups)
+    shares = pivot_aggregates(df, aggregates, groups, SHARE_PREFIX)
     
-    # テキストの位置を調整
-    fig.update_traces(
-        textposition='auto',
-        textangle=0,
-        texttemplate='%{text}'
-    )
+    # グラフの作成（選択数が多い場合はヒートマップ等に切り替える）
+    mode = select_large_selection_mode(len(shares), "age_chart_mode")
+    fig = create_comparison_chart({'': shares}, f'{prefecture}の年齢構成比率', mode=mode, height=600)
+    if len(shares) <= LARGE_SELECTION_THRESHOLD:
+        fig.update_layout(
+            yaxis_title='構成比率 (%)',
+            xaxis_title='市区町村',
+            uniformtext_minsize=8,  # テキストの最小サイズ
+            uniformtext_mode='hide'  # 小さすぎるテキストは非表示
+        )
     
     st.plotly_chart(fig, use_container_width=True)
     
     # データテーブルの表示
     if st.checkbox('詳細データを表示'):
         st.dataframe(
-            age_df.pivot(
-                index='市区町村名',
-                columns='年齢区分',
-                values=['人口', '構成比']
-            ).style.format({
-                ('人口', ''): '{:,.0f}',
-                ('構成比', ''): '{:.1f}%'
-            })
+            pd.concat({'人口': population, '構成比': shares}, axis=1).style.format(
+                {**{('人口', group): '{:,.0f}' for group in groups}, **{('構成比', group): '{:.1f}%' for group in groups}}
+            )
         )
 
-def display_voting_trend(df: pd.DataFrame, prefecture: str):
-    """投票傾向分析を表示する関数"""
+def display_voting_trend(df: pd.DataFrame, prefecture: str, aggregates: pd.DataFrame = None):
+    """投票傾向分析を表示する関数（aggregatesには読み込み時に計算済みの集計行を渡す）"""
     st.header("投票傾向分析")
     
-    # 投票率の定義
-    voting_rates = {
-        '20代': 0.35,
-        '30代': 0.44,
-        '40代': 0.53,
-        '50代': 0.63,
-        '60代': 0.72,
-        '70歳以上': 0.60
-    }
-    
-    # 年齢区分の定義
-    age_groups = {
-        '20代': ['20歳～24歳', '25歳～29歳'],
-        '30代': ['30歳～34歳', '35歳～39歳'],
-        '40代': ['40歳～44歳', '45歳～49歳'],
-        '50代': ['50歳～54歳', '55歳～59歳'],
-        '60代': ['60歳～64歳', '65歳～69歳'],
-        '70歳以上': ['70歳～74歳', '75歳～79歳', '80歳～84歳', '85歳～89歳', '90歳～94歳', '95歳～99歳', '100歳以上']
-    }
-    
-    # 投票影響度を計算
-    results = []
-    for _, row in df.iterrows():
-        city_name = row['市区町村名']
-        total_pop = sum(sum(float(row[col]) for col in cols) for cols in age_groups.values())
-        
-        for group, columns in age_groups.items():
-            population = sum(float(row[col]) for col in columns)
-            ratio = (population / total_pop * 100) if total_pop > 0 else 0
-            voting_power = ratio * voting_rates[group]
-            
-            results.append({
-                '市区町村名': city_name,
-                '年齢区分': group,
-                '人口構成比': ratio,
-                '投票影響度': voting_power
-            })
-    
-    voting_df = pd.DataFrame(results)
-    
-    # 投票影響度を100%に正規化
-    for city in voting_df['市区町村名'].unique():
-        city_mask = voting_df['市区町村名'] == city
-        total_power = voting_df.loc[city_mask, '投票影響度'].sum()
-        if total_power > 0:
-            voting_df.loc[city_mask, '投票影響度'] = voting_df.loc[city_mask, '投票影響度'] / total_power * 100
-    
-    # グラフの作成
-    fig = go.Figure()
-    
-    # カラーマップの定義
-    colors = {
-        '20代': '#FFD700',      # 黄色
-        '30代': '#FF7F00',      # オレンジ
-        '40代': '#9370DB',      # 紫
-        '50代': '#FF4500',      # 赤
-        '60代': '#98FB98',      # 薄緑
-        '70歳以上': '#20B2AA'    # ターコイズ
+    # 20歳以上に対する構成比と、100%に正規化した投票影響度（集計済みの行を参照）
+    if aggregates is None:
+        aggregates = get_aggregates(df)
+    pivots = {
+        '人口構成比': pivot_aggregates(df, aggregates, AGE_ORDER, ADULT_SHARE_PREFIX),
+        '投票影響度': pivot_aggregates(df, aggregates, AGE_ORDER, VOTING_PREFIX)
     }
     
-    # x軸のラベルを作成
-    cities = sorted(voting_df['市区町村名'].unique())
-    x_labels = []
-    for city in cities:
-        x_labels.extend([f"{city}\n(人口構成比)", f"{city}\n(投票影響度)"])
-    
-    # 年齢区分ごとにデータを追加
-    for age in age_groups.keys():
-        age_data = voting_df[voting_df['年齢区分'] == age]
-        y_values = []
-        text_values = []
-        
-        for city in cities:
-            city_data = age_data[age_data['市区町村名'] == city]
-            if not city_data.empty:
-                y_values.extend([
-                    city_data['人口構成比'].values[0],
-                    city_data['投票影響度'].values[0]
-                ])
-                text_values.extend([
-                    f'{city_data["人口構成比"].values[0]:.1f}%',
-                    f'{city_data["投票影響度"].values[0]:.1f}%'
-                ])
-            else:
-                y_values.extend([0, 0])
-                text_values.extend(['0.0%', '0.0%'])
-        
-        fig.add_trace(go.Bar(
-            name=age,
-            x=x_labels,
-            y=y_values,
-            text=text_values,
-            textposition='auto',
-            marker_color=colors[age]
-        ))
-    
-    # レイアウトの設定
-    fig.update_layout(
-        title='年齢区分別の人口構成比と投票影響度',
-        barmode='stack',
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        height=600,
-        yaxis_title='割合 (%)',
-        yaxis={'range': [0, 100]},
-        margin=dict(t=100, b=50)
-    )
+    # グラフの作成（選択数が多い場合はヒートマップ等に切り替える）
+    mode = select_large_selection_mode(len(pivots['人口構成比']), "voting_chart_mode")
+    fig = create_comparison_chart(pivots, '年齢区分別の人口構成比と投票影響度', GRAPH_COLORS, mode, height=600)
     
     st.plotly_chart(fig, use_container_width=True)
     
     # 説明を追加
     st.markdown("""
     **グラフの見方：**
-    - 左側の棒グラフは各年齢区分の人口構成比を示しています
-    - 右側の棒グラフは投票率を加味した実際の投票影響度を示しています
+    - 左側の棒グラフ（ヒートマップでは左側の表）は各年齢区分の人口構成比を示しています
+    - 右側の棒グラフ（ヒートマップでは右側の表）は投票率を加味した実際の投票影響度を示しています
     - 投票影響度は、人口構成比に各年齢区分の平均投票率を掛けて算出しています
     """)
     
     # データテーブルの表示
     if st.checkbox('投票傾向の詳細データを表示'):
-        st.dataframe(
-            voting_df.pivot(
-                index='市区町村名',
-                columns='年齢区分',
-                values=['人口構成比', '投票影響度']
-            ).style.format('{:.1f}%')
-        )
\ No newline at end of file
+        st.dataframe(pd.concat(pivots, axis=1).style.format('{:.1f}%'))
@@ -0,0 +1,37 @@
+import streamlit as st
+from app.dashboard.utils.clustering import (
+    CLUSTER_GROUPINGS,
+    DEFAULT_CLUSTER_COUNT,
+    MAX_CLUSTER_COUNT,
+    get_age_profile_clusters
+)
+from app.dashboard.utils.constants import PENDING_SELECTION_KEY
+
+def display_cluster_filter(dataset, prefecture):
+    """全国の市区町村を年齢構成で分け、クラスタで比較対象を絞り込む（結果は地図の色分けにも使う）"""
+    with st.sidebar.expander("年齢構成のクラスタ", expanded=False):
+        k = st.slider(
+            "クラスタ数", min_value=2, max_value=MAX_CLUSTER_COUNT,
+            value=DEFAULT_CLUSTER_COUNT, key="cluster_count"
+        )
+        grouping = st.radio("年齢の区切り", list(CLUSTER_GROUPINGS), index=1, horizontal=True, key="cluster_grouping")
+        clusters = get_age_profile_clusters(dataset, k, grouping)
+
+        st.caption("番号は平均年齢の低い順です。年齢の列は各クラスタの平均構成比（%）です。")
+        summary = clusters.summary
+        st.dataframe(summary.style.format({col: '{:,}' if col == '件数' else '{:.1f}' for col in summary.columns}))
+
+        # 選択したクラスタに属する、同じ都道府県の市区町村を比較対象にする
+        chosen = st.multiselect(
+            "絞り込むクラスタ", list(clusters.summary.index),
+            format_func=lambda label: f"クラスタ{label}", key="cluster_filter"
+        )
+        if chosen:
+            table = clusters.table
+            matched = table.loc[
+                (table['都道府県名'] == prefecture) & table['クラスタ'].isin(chosen), '市区町村名'
+            ].tolist()
+            if st.button(f"該当する{prefecture}の市区町村（{len(matched)}件）を比較対象にする"):
+                st.session_state[PENDING_SELECTION_KEY] = matched
+                st.rerun()
+    return clusters
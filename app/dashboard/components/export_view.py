@@ -0,0 +1,67 @@
+import streamlit as st
+from app.dashboard.utils.export import (
+    CSV_ENCODINGS,
+    EXPORT_FORMATS,
+    EXPORT_SCOPES,
+    export_file_name,
+    iter_export,
+    iter_export_chunks,
+    select_positions,
+    unencodable_values
+)
+
+@st.cache_data(show_spinner=False)
+def find_unencodable(data_version, prefecture, encoding, _frame):
+    """都道府県（Noneなら全国）の行のうち、文字コードで表せない値を返す（データバージョン・範囲・文字コードごとに1度だけ）"""
+    return unencodable_values(_frame, select_positions(_frame, prefecture), encoding)
+
+def display_unencodable(values, encoding):
+    """文字コードで表せない値があれば、出力できない理由を表示する"""
+    st.error(f"{encoding}で表せない文字を含む市区町村名があるため出力できません。UTF-8を選択してください。")
+    st.caption("該当する値: " + "、".join(values[:5]) + (" ほか" if len(values) > 5 else ""))
+
+def display_export_section(dataset, prefecture, selected_codes):
+    """選択中の市区町村・都道府県・全国のデータをCSVまたはParquetでダウンロードする"""
+    with st.sidebar.expander("データのダウンロード", expanded=False):
+        scope = st.radio("範囲", EXPORT_SCOPES, horizontal=True, key="export_scope")
+        export_format = st.radio(
+            "形式", list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key="export_format"
+        )
+        encoding = 'UTF-8'
+        if export_format == 'csv':
+            encoding = st.selectbox("文字コード", list(CSV_ENCODINGS), key="export_encoding")
+
+        frame = dataset.view()
+        if scope == '選択中の市区町村':
+            if not selected_codes:
+                st.info("市区町村を選択してください。")
+                return
+            # 選択中の行は少ないため、再実行のたびに確認する
+            positions = select_positions(frame, prefecture, selected_codes)
+            unencodable = unencodable_values(frame, positions, encoding)
+            label = f"{prefecture}_選択"
+        else:
+            # 都道府県・全国は行が多いため、文字コードの確認結果をキャッシュし、行の位置はクリック後に求める
+            target = prefecture if scope == '都道府県' else None
+            unencodable = find_unencodable(dataset.version, target, encoding, frame)
+            positions = None
+            label = target or '全国'
+        if unencodable:
+            display_unencodable(unencodable, encoding)
+            return
+
+        def build_file():
+            rows = positions if positions is not None else select_positions(frame, target)
+            return b''.join(iter_export(iter_export_chunks(frame, rows, dataset.aggregates), export_format, encoding))
+
+        # ファイルはクリックされてから画面とは別のスレッドで作成する
+        st.download_button(
+            "ダウンロード",
+            data=build_file,
+            file_name=export_file_name(label, export_format, encoding),
+            mime=EXPORT_FORMATS[export_format],
+            on_click='ignore',
+            key="export_download"
+        )
+        if scope != '選択中の市区町村':
+            st.caption("計・男・女の全ての行と、年齢区分の集計・投票影響度を出力します。")
@@ -1,62 +1,363 @@
 import json
+import time
+import branca.colormap
 import folium
-from pathlib import Path
+import numpy as np
+import pandas as pd
 import streamlit as st
-from streamlit_folium import folium_static
+from streamlit_folium import folium_static, st_folium
 import logging
-from typing import Dict, Any
+from app.dashboard.utils.geo_join import load_geo_join_table, normalize_municipality_code, statistics_version
+from app.dashboard.utils.spatial_index import MunicipalitySpatialIndex
+from app.dashboard.utils.boundaries import BOUNDARIES_PATH, BoundaryStore, level_for_zoom
+from app.dashboard.utils.vector_tiles import load_tile_metadata
+from app.dashboard.utils.tile_server import TILE_URL_TEMPLATE, start_tile_server
+from app.dashboard.components.tile_layer import BoundaryTileLayer
+from app.dashboard.utils.warmup import get_dashboard_warmup
+from app.dashboard.utils.constants import PENDING_SELECTION_KEY, VALUE_COLUMNS
+from app.dashboard.utils.designated_cities import (
+    CITY_GRANULARITIES,
+    city_granularity_mask,
+    to_city_granularity,
+    ward_groups
+)
+from app.dashboard.utils.rollup import designated_city_of
+from app.dashboard.utils.shared_dataset import get_aggregates
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
-def load_city_coordinates() -> Dict[str, Dict[str, Any]]:
-    """市区町村の座標データを読み込む"""
-    json_path = Path(__file__).parent.parent / 'data' / 'city_coordinates_with_codes.json'
-    logger.info(f"Loading coordinates from: {json_path}")
-    
+# 全国地図の初期表示
+NATIONAL_CENTER = (36.0, 136.0)
+NATIONAL_ZOOM = 5
+# これ未満のズームでは都道府県単位に集約して表示
+PREFECTURE_BUBBLE_MAX_ZOOM = 8
+
+def get_warm_artifact(df, name):
+    """起動時に読み込み済み（または読み込み中）のデータがあれば取得する"""
+    registry = get_dashboard_warmup()
+    if registry is None:
+        return None
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            coordinates_data = json.load(f)
-            
-            # データを都道府県ごとに整理
-            organized_data = {}
-            for code, city_data in coordinates_data.items():
-                pref_name = city_data['prefecture']
-                if pref_name not in organized_data:
-                    organized_data[pref_name] = {}
-                
-                organized_data[pref_name][code] = {
-                    'name': city_data['city'],
-                    'lat': city_data['lat'],
-                    'lng': city_data['lng']
-                }
-            
-            return organized_data
+        if not registry.get('population').owns(df):
+            return None
+        return registry.get(name)
     except Exception as e:
-        logger.error(f"Failed to load coordinates: {str(e)}")
+        logger.warning(f"起動時の読み込みを利用できません（{name}）: {str(e)}")
+        return None
+
+@st.cache_resource(show_spinner=False)
+def build_join_table(version, _df):
+    """統計データのバージョンごとに結合表を1度だけ読み込む"""
+    return load_geo_join_table(_df)
+
+def get_join_table(df):
+    """統計データと座標の結合表とデータバージョンを取得する"""
+    try:
+        join_table, report = get_warm_artifact(df, 'join_table') or build_join_table(statistics_version(df), df)
+    except Exception as e:
+        logger.error(f"Failed to build join table: {str(e)}")
         st.error("座標データの読み込みに失敗しました。管理者に連絡してください。")
+        return None, None
+
+    unmatched = report['未照合（統計側）']
+    if unmatched:
+        logger.warning(f"座標が見つからない市区町村: {len(unmatched)}件")
+    return join_table, report['データバージョン']
+
+@st.cache_resource(show_spinner=False)
+def build_spatial_index(data_version, _join_table):
+    """データバージョンごとに空間索引を1度だけ構築する"""
+    logger.info(f"空間索引を構築します: {data_version}")
+    return MunicipalitySpatialIndex(_join_table)
+
+def get_spatial_index(df, data_version, join_table):
+    """空間索引を取得する（起動時に構築済みならそれを使う）"""
+    return get_warm_artifact(df, 'spatial_index') or build_spatial_index(data_version, join_table)
+
+def get_indicator_values(df, positions, selected_value):
+    """行位置で集計済みの指標を参照する"""
+    aggregates = get_aggregates(df)
+    return aggregates[selected_value].to_numpy(dtype=float)[np.asarray(positions)]
+
+def add_population_markers(m, rows, values, selected_value, color='blue', name_column='市区町村名', max_radius=20,
+                           colors=None):
+    """市区町村ごとに指標の大きさの円マーカーを追加する（colorsを渡すと行ごとに色を変える）"""
+    # 最大人口を取得して円の大きさを調整
+    max_population = values.max() if len(values) else 0
+    
+    if colors is None:
+        colors = [color] * len(values)
+    
+    for city_name, lat, lng, value, marker_color in zip(rows[name_column], rows['lat'], rows['lng'], values, colors):
+        # 円の半径を人口に応じて調整（最小5、最大max_radius）
+        radius = 5 + (value / max_population * (max_radius - 5)) if max_population > 0 else 5
+        
+        # ツールチップとポップアップの内容を作成
+        tooltip = f"{city_name}: {int(value):,}人"
+        popup_html = f"""
+            <div style='width:200px'>
+                <b>{city_name}</b><br>
+                {selected_value}: {int(value):,}人
+            </div>
+        """
+        
+        # マーカーを追加
+        folium.CircleMarker(
+            location=[lat, lng],
+            radius=radius,
+            color=marker_color,
+            fill=True,
+            popup=folium.Popup(popup_html, max_width=300),
+            tooltip=tooltip
+        ).add_to(m)
+
+@st.cache_data(show_spinner=False)
+def get_prefecture_bubbles(data_version, selected_value, _df, _index):
+    """都道府県単位に集約した指標と表示位置を計算する（データバージョン・指標ごとに1度だけ）"""
+    rows = _index.rows
+    # 政令指定都市の区は市の行と重複するため集約から除外（団体コードで判定）
+    rows = rows[~rows['団体コード'].str[:5].map(designated_city_of).notna().to_numpy()]
+    values = get_indicator_values(_df, rows['行番号'], selected_value)
+    weights = _df.iloc[rows['行番号'].to_numpy()]['総数'].to_numpy(dtype=float)
+    
+    frame = rows[['都道府県名', 'lat', 'lng']].assign(value=values, weight=weights)
+    frame['lat_w'] = frame['lat'] * frame['weight']
+    frame['lng_w'] = frame['lng'] * frame['weight']
+    grouped = frame.groupby('都道府県名', sort=False)[['value', 'weight', 'lat_w', 'lng_w']].sum()
+    # 人口で重み付けした中心に配置
+    return pd.DataFrame({
+        '都道府県名': grouped.index,
+        'lat': (grouped['lat_w'] / grouped['weight']).to_numpy(),
+        'lng': (grouped['lng_w'] / grouped['weight']).to_numpy(),
+        'value': grouped['value'].to_numpy()
+    })
+
+def parse_bounds(bounds):
+    """st_foliumが返す表示範囲を（南, 西, 北, 東）に変換する"""
+    if not bounds or not bounds.get('_southWest') or not bounds.get('_northEast'):
+        return None
+    south_west, north_east = bounds['_southWest'], bounds['_northEast']
+    return south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng']
+
+def display_national_map(df, selected_value, show_boundary_tiles=False, granularity='区'):
+    """表示範囲内の市区町村だけを読み込む全国地図を表示する（政令指定都市はgranularityの単位で表示）"""
+    join_table, data_version = get_join_table(df)
+    if join_table is None:
+        st.error("座標データが利用できません。")
+        return
+    
+    index = get_spatial_index(df, data_version, join_table)
+    view = st.session_state.setdefault('national_map_view', {'bounds': None, 'zoom': NATIONAL_ZOOM})
+    bounds, zoom = view['bounds'], view['zoom']
+    
+    # 表示範囲とズームに応じて、必要な点だけを問い合わせる
+    start = time.perf_counter()
+    layer = folium.FeatureGroup(name='markers')
+    if zoom < PREFECTURE_BUBBLE_MAX_ZOOM:
+        rows = get_prefecture_bubbles(data_version, selected_value, df, index)
+        if bounds:
+            south, west, north, east = bounds
+            rows = rows[rows['lat'].between(south, north) & rows['lng'].between(west, east)]
+        add_population_markers(layer, rows, rows['value'].to_numpy(), selected_value,
+                               color='darkred', name_column='都道府県名', max_radius=30)
+        level = '都道府県'
+    else:
+        rows = index.within_bbox(*bounds) if bounds else index.rows
+        rows = rows[city_granularity_mask(rows, granularity)]
+        values = get_indicator_values(df, rows['行番号'], selected_value)
+        add_population_markers(layer, rows, values, selected_value)
+        level = '市区町村'
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    # 基本の地図は固定し、マーカーのレイヤーだけを差し替える
+    m = folium.Map(location=NATIONAL_CENTER, zoom_start=NATIONAL_ZOOM, tiles="OpenStreetMap")
+    if show_boundary_tiles:
+        add_boundary_tile_layer(m, df, join_table, data_version, selected_value)
+    map_state = st_folium(
+        m,
+        key='national_map',
+        height=600,
+        use_container_width=True,
+        feature_group_to_add=layer,
+        returned_objects=['bounds', 'zoom']
+    )
+    
+    st.caption(f"{level}単位で{len(rows):,}件を表示（ズーム: {zoom}、検索時間: {elapsed_ms:.2f}ms）")
+    
+    # 表示範囲が変わったら、その範囲で問い合わせ直す
+    new_bounds = parse_bounds((map_state or {}).get('bounds'))
+    new_zoom = (map_state or {}).get('zoom') or zoom
+    if new_bounds and (new_bounds != bounds or new_zoom != zoom):
+        st.session_state['national_map_view'] = {'bounds': new_bounds, 'zoom': new_zoom}
+        st.rerun()
+
+@st.cache_resource(show_spinner=False)
+def get_boundary_store(boundaries_mtime):
+    """境界データを読み込む（ファイルが更新されるまで再利用）"""
+    logger.info(f"境界データを読み込みます: {BOUNDARIES_PATH}")
+    return BoundaryStore.load(BOUNDARIES_PATH)
+
+def get_choropleth_values(df, rows, selected_value):
+    """塗り分けに使う値（総人口は人数、年齢区分は総数に対する割合）を計算する"""
+    values = get_indicator_values(df, rows['行番号'], selected_value)
+    if selected_value == '総人口':
+        return values, '{:,.0f}人'
+    totals = get_indicator_values(df, rows['行番号'], '総人口')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.where(totals > 0, values / totals * 100, np.nan)
+    return shares, '{:.1f}%'
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_choropleth_geojson(boundaries_mtime, data_version, prefecture, level, selected_value, granularity, _df,
+                           _join_table):
+    """塗り分け用のGeoJSONを作成する（データ・範囲・解像度・指標・政令指定都市の単位ごとに1度だけ）"""
+    store = get_boundary_store(boundaries_mtime)
+    rows = _join_table if prefecture is None else _join_table[_join_table['都道府県名'] == prefecture]
+    # 政令指定都市は市（区を融合した形状）と区のどちらか一方だけを描く
+    rows = rows[city_granularity_mask(rows, granularity, available=store.objects)]
+    values, value_format = get_choropleth_values(_df, rows, selected_value)
+    properties = {
+        code: {'value': None, 'label': '-'} if np.isnan(value) else {'value': float(value), 'label': value_format.format(value)}
+        for code, value in zip(rows['団体コード'], values)
+    }
+    return store.feature_collection(rows['団体コード'], level, properties)
+
+@st.cache_resource(show_spinner=False)
+def get_tile_server():
+    """境界タイルのローカルサーバーをプロセスごとに1度だけ起動する"""
+    try:
+        return start_tile_server()
+    except OSError as e:
+        # 別プロセスで起動済みのサーバーをそのまま使う
+        logger.info(f"タイルサーバーを起動しませんでした（起動済みの可能性があります）: {str(e)}")
+        return None
+
+def get_value_colormap(values, caption):
+    """指標の値に対応する色の凡例を作成する"""
+    return branca.colormap.LinearColormap(
+        ['#ffffcc', '#fd8d3c', '#800026'],
+        vmin=float(np.nanmin(values)),
+        vmax=float(np.nanmax(values)),
+        caption=caption
+    )
+
+@st.cache_data(show_spinner=False)
+def get_tile_colors(data_version, selected_value, _df, _join_table):
+    """団体コードごとの塗り分けの色を計算する（データバージョン・指標ごとに1度だけ）"""
+    values, _ = get_choropleth_values(_df, _join_table, selected_value)
+    if np.all(np.isnan(values)):
         return {}
+    colormap = get_value_colormap(values, selected_value)
+    return {
+        code: colormap(value)
+        for code, value in zip(_join_table['団体コード'], values)
+        if not np.isnan(value)
+    }
 
-def create_map_view(df, prefecture, selected_codes=None, selected_value='総人口'):
-    """地図表示コンポーネントを作成"""
-    # デバッグ情報：データフレームのカラム名と内容を確認
-    logger.info(f"データフレームのカラム: {df.columns.tolist()}")
-    logger.info(f"データフレームのサンプル:\n{df[['団体コード', '都道府県名', '市区町村名']].head()}")
+def add_boundary_tile_layer(m, df, join_table, data_version, selected_value):
+    """タイルサーバーから境界タイルを読み込むレイヤーを地図に追加する"""
+    metadata = load_tile_metadata()
+    if metadata is None:
+        st.info("境界タイルがありません。`python -m app.dashboard.utils.vector_tiles` を実行してください。")
+        return False
     
-    # 座標データを読み込む
-    coordinates_data = load_city_coordinates()
+    get_tile_server()
+    colors = get_tile_colors(data_version, selected_value, df, join_table)
+    BoundaryTileLayer(
+        url=TILE_URL_TEMPLATE,
+        min_native_zoom=metadata['minzoom'],
+        max_native_zoom=metadata['maxzoom'],
+        colors=colors
+    ).add_to(m)
+    return True
+
+def display_choropleth_map(df, prefecture, selected_value, granularity='区'):
+    """市区町村境界を指標で塗り分けた地図を表示する（政令指定都市はgranularityの単位で表示）"""
+    if not BOUNDARIES_PATH.exists():
+        st.warning("境界データがありません。`python create_boundaries_json.py` を実行してください。")
+        return
     
-    if not coordinates_data:
+    join_table, data_version = get_join_table(df)
+    if join_table is None:
+        st.error("座標データが利用できません。")
+        return
+    
+    scope = st.radio("表示範囲", [prefecture, '全国'], horizontal=True)
+    target = None if scope == '全国' else prefecture
+    
+    # ズームに応じて解像度を選ぶ
+    view_key = f"choropleth_zoom_{scope}"
+    start_zoom = NATIONAL_ZOOM if target is None else 8
+    zoom = st.session_state.get(view_key, start_zoom)
+    
+    boundaries_mtime = BOUNDARIES_PATH.stat().st_mtime
+    store = get_boundary_store(boundaries_mtime)
+    level = level_for_zoom(zoom, store.level_names)
+    
+    start = time.perf_counter()
+    geojson = get_choropleth_geojson(
+        boundaries_mtime, data_version, target, level, selected_value, granularity, df, join_table
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    values = [f['properties']['value'] for f in geojson['features'] if f['properties']['value'] is not None]
+    if not values:
+        st.warning("表示できる境界データがありません。")
+        return
+    colormap = get_value_colormap(values, selected_value)
+    
+    layer = folium.FeatureGroup(name='choropleth')
+    folium.GeoJson(
+        geojson,
+        style_function=lambda feature: {
+            'fillColor': colormap(feature['properties']['value']) if feature['properties']['value'] is not None else '#cccccc',
+            'color': '#555555',
+            'weight': 0.5,
+            'fillOpacity': 0.7
+        },
+        tooltip=folium.GeoJsonTooltip(fields=['name', 'label'], aliases=['市区町村', selected_value])
+    ).add_to(layer)
+    
+    # 中心は結合表の座標から求め、基本の地図は固定してレイヤーだけを差し替える
+    rows = join_table if target is None else join_table[join_table['都道府県名'] == target]
+    center = NATIONAL_CENTER if target is None else (float(rows['lat'].mean()), float(rows['lng'].mean()))
+    m = folium.Map(location=center, zoom_start=start_zoom, tiles="OpenStreetMap")
+    colormap.add_to(m)
+    map_state = st_folium(
+        m,
+        key=f"choropleth_map_{scope}",
+        height=600,
+        use_container_width=True,
+        feature_group_to_add=layer,
+        returned_objects=['zoom']
+    )
+    
+    size_kb = len(json.dumps(geojson, separators=(',', ':'))) / 1024
+    st.caption(f"解像度: {level}（{len(geojson['features']):,}件、約{size_kb:,.0f}KB、作成時間: {elapsed_ms:.0f}ms）")
+    
+    # 解像度が変わるズームになったら描き直す
+    new_zoom = (map_state or {}).get('zoom')
+    if new_zoom and new_zoom != zoom:
+        st.session_state[view_key] = new_zoom
+        if level_for_zoom(new_zoom, store.level_names) != level:
+            st.rerun()
+
+def create_map_view(df, prefecture, selected_codes=None, selected_value='総人口', show_boundary_tiles=False,
+                    clusters=None, granularity='区'):
+    """地図表示コンポーネントを作成（clustersを渡すと年齢構成のクラスタで色分けし、政令指定都市はgranularityの単位で表示）"""
+    # 統計データの行位置と座標の結合表を取得
+    join_table, data_version = get_join_table(df)
+    
+    if join_table is None or join_table['lat'].notna().sum() == 0:
         st.error("座標データが利用できません。")
         return None
     
-    # デバッグ情報：座標データの内容を確認
-    logger.info(f"座標データの都道府県: {list(coordinates_data.keys())}")
-    if prefecture in coordinates_data:
-        logger.info(f"座標データのサンプル（{prefecture}）: {list(coordinates_data[prefecture].keys())[:5]}")
+    # 役場位置（P34）による名称での補完は結合表の作成時に済んでいる
+    prefecture_rows = join_table[(join_table['都道府県名'] == prefecture) & join_table['lat'].notna()]
     
-    if prefecture not in coordinates_data:
-        st.error(f"選択された都道府県（{prefecture}）��座標データが見つかりません。")
+    if prefecture_rows.empty:
+        st.error(f"選択された都道府県（{prefecture}）の座標データが見つかりません。")
         return None
 
     # デバッグ情報の表示
@@ -65,20 +366,10 @@ def create_map_view(df, prefecture, selected_codes=None, selected_value='総人
     if selected_codes:
         logger.info(f"選択された団体コード: {selected_codes}")
 
-    # デフォルトの中心座標（日本の中心あたり）
-    center_lat, center_lng = 36.0, 136.0
-    zoom_start = 5
-    
-    # 都道府県が選択されている場合は、その都道府県の中心に移動
-    if prefecture and prefecture in coordinates_data:
-        prefecture_coords = coordinates_data[prefecture]
-        if prefecture_coords:
-            lats = [coord['lat'] for coord in prefecture_coords.values()]
-            lngs = [coord['lng'] for coord in prefecture_coords.values()]
-            if lats and lngs:
-                center_lat = sum(lats) / len(lats)
-                center_lng = sum(lngs) / len(lngs)
-                zoom_start = 8
+    # 都道府県の中心に移動
+    center_lat = float(prefecture_rows['lat'].mean())
+    center_lng = float(prefecture_rows['lng'].mean())
+    zoom_start = 8
 
     # 地図を作成
     m = folium.Map(
@@ -86,119 +377,233 @@ def create_map_view(df, prefecture, selected_codes=None, selected_value='総人
         zoom_start=zoom_start,
         tiles="OpenStreetMap"
     )
+    
+    # 境界はタイルサーバーから表示範囲の分だけ読み込む
+    if show_boundary_tiles:
+        add_boundary_tile_layer(m, df, join_table, data_version, selected_value)
 
-    # 年齢区分の定義
-    value_columns = {
-        '総人口': '総数',
-        '20歳未満': ['0歳～4歳', '5歳～9歳', '10歳～14歳', '15歳～19歳'],
-        '30-60代': ['30歳～34歳', '35歳～39歳', '40歳～44歳', '45歳～49歳', 
-                  '50歳～54歳', '55歳～59歳', '60歳～64歳', '65歳～69歳'],
-        '70歳以上': ['70歳～74歳', '75歳～79歳', '80歳～84歳', '85歳～89歳', 
-                  '90歳～94歳', '95歳～99歳', '100歳以上']
-    }
+    # 選択された市区町村を結合表から取得（政令指定都市の市・区は表示する単位に読み替える）
+    rows = prefecture_rows[city_granularity_mask(prefecture_rows, granularity)]
+    if selected_codes:
+        codes = [code for code in map(normalize_municipality_code, selected_codes) if code is not None]
+        wards = ward_groups(prefecture_rows['団体コード'])
+        expanded = to_city_granularity(codes, granularity, wards)
+        rows = rows[rows['団体コード'].isin({*codes, *expanded})]
+        # 表示する単位に読み替えたコードで数える（市を表示できない場合は区の行で表示される）
+        shown = set(rows['団体コード'])
+        missing = [code for code in expanded if code not in shown and not shown.intersection(wards.get(code, []))]
+        if missing:
+            logger.warning(f"座標が見つからない選択市区町村: {len(missing)}件")
 
-    # データフレームに含まれる市区町村をマッピング
-    if not df.empty and prefecture:
-        try:
-            # 選択された市区町村のデータをフィルタリング
-            prefecture_mask = df['都道府県名'].astype(str) == prefecture
-            gender_mask = df['性別'].astype(str) == '計'
-            
-            filtered_df = df[prefecture_mask & gender_mask]
-            
-            # デバッグ情報：フィルタリング後のデータを確認
-            logger.info(f"都道府県でフィルタリング後のデータ件数: {len(filtered_df)}")
-            logger.info(f"フィルタリング後のデータサンプル:\n{filtered_df[['団体コード', '市区町村名']].head()}")
-            
-            if selected_codes:
-                filtered_df = filtered_df[filtered_df['団体コード'].isin(selected_codes)]
-                logger.info(f"選択された団体コード: {selected_codes}")
-
-            # デバッグ情報
-            logger.info(f"最終的なフィルタリング後のデータ行数: {len(filtered_df)}")
-            
-            # 最大人口を取得して円の大きさを調整
-            max_population = 0
-            for _, row in filtered_df.iterrows():
-                if selected_value == '総人口':
-                    value = float(row[value_columns[selected_value]])
-                else:
-                    value = sum(float(row[col]) for col in value_columns[selected_value])
-                max_population = max(max_population, value)
-            
-            logger.info(f"最大人口: {max_population}")
-            
-            # 市区町村ごとにマーカーを追加
-            markers_added = 0
-            for _, row in filtered_df.iterrows():
-                code = str(row['団体コード']).zfill(6)
-                city_name = row['市区町村名']
-                
-                # 値の計算
-                if selected_value == '総人口':
-                    value = float(row[value_columns[selected_value]])
-                else:
-                    value = sum(float(row[col]) for col in value_columns[selected_value])
-                
-                # 座標の取得
-                if code in coordinates_data[prefecture]:
-                    coord = coordinates_data[prefecture][code]
-                    # 円の半径を人口に応じて調整（最小5、最大20）
-                    radius = 5 + (value / max_population * 15) if max_population > 0 else 5
-                    
-                    # ツールチップとポップアップの内容を作成
-                    tooltip = f"{city_name}: {int(value):,}人"
-                    popup_html = f"""
-                        <div style='width:200px'>
-                            <b>{city_name}</b><br>
-                            {selected_value}: {int(value):,}人
-                        </div>
-                    """
-                    
-                    # マーカーを追加
-                    folium.CircleMarker(
-                        location=[coord['lat'], coord['lng']],
-                        radius=radius,
-                        color='blue',
-                        fill=True,
-                        popup=folium.Popup(popup_html, max_width=300),
-                        tooltip=tooltip
-                    ).add_to(m)
-                    markers_added += 1
-                else:
-                    logger.warning(f"座標が見つかりません: {city_name} (コード: {code})")
-            
-            logger.info(f"追加されたマーカーの数: {markers_added}")
+    if rows.empty:
+        return m
+
+    try:
+        values = get_indicator_values(df, rows['行番号'], selected_value)
+        logger.info(f"最大人口: {values.max()}")
+        colors = None
+        if clusters is not None:
+            colors = [clusters.color_of(label) for label in clusters.labels_for(rows['団体コード'])]
+        add_population_markers(m, rows, values, selected_value, colors=colors)
         
-        except Exception as e:
-            logger.error(f"データ処理中にエラーが発生しました: {str(e)}")
-            st.error(f"データの処理中にエラーが発生しました: {str(e)}")
-            return None
+        logger.info(f"追加されたマーカーの数: {len(rows)}")
+    
+    except Exception as e:
+        logger.error(f"データ処理中にエラーが発生しました: {str(e)}")
+        st.error(f"データの処理中にエラーが発生しました: {str(e)}")
+        return None
 
     return m
 
-def display_map_section(df, prefecture, selected_codes=None):
-    """地図セクションを表示"""
+def display_radius_selection(df, prefecture, selected_codes, selected_value, granularity='区'):
+    """地図上で中心をクリックし、半径内の市区町村を選択する（政令指定都市はgranularityの単位で表示）"""
+    join_table, data_version = get_join_table(df)
+    if join_table is None:
+        st.error("座標データが利用できません。")
+        return
+    
+    index = get_spatial_index(df, data_version, join_table)
+    radius_km = st.slider("半径（km）", min_value=1, max_value=100, value=20)
+    
+    # 中心の初期値は最初に選択された市区町村、なければ都道府県の中心
+    center_key = f"radius_center_{prefecture}"
+    if center_key not in st.session_state:
+        prefecture_rows = index.rows[index.rows['都道府県名'] == prefecture]
+        codes = [normalize_municipality_code(code) for code in (selected_codes or [])]
+        origin = prefecture_rows[prefecture_rows['団体コード'].isin(codes)]
+        origin = origin if not origin.empty else prefecture_rows
+        if origin.empty:
+            st.error(f"選択された都道府県（{prefecture}）の座標データが見つかりません。")
+            return
+        st.session_state[center_key] = (float(origin['lat'].iloc[0]), float(origin['lng'].iloc[0]))
+    center_lat, center_lng = st.session_state[center_key]
+    
+    # 空間索引で半径内の市区町村を検索
+    start = time.perf_counter()
+    result = index.within_radius(center_lat, center_lng, radius_km)
+    result = result[city_granularity_mask(result, granularity)]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    m = folium.Map(location=[center_lat, center_lng], zoom_start=9, tiles="OpenStreetMap")
+    folium.Circle(
+        location=[center_lat, center_lng],
+        radius=radius_km * 1000,
+        color='red',
+        fill=False
+    ).add_to(m)
+    folium.Marker(location=[center_lat, center_lng], tooltip="中心").add_to(m)
+    if not result.empty:
+        values = get_indicator_values(df, result['行番号'], selected_value)
+        add_population_markers(m, result, values, selected_value)
+    
+    map_state = st_folium(
+        m,
+        key=f"radius_map_{prefecture}",
+        height=500,
+        use_container_width=True,
+        returned_objects=['last_clicked']
+    )
+    
+    # クリックされた地点を新しい中心にする
+    clicked = (map_state or {}).get('last_clicked')
+    if clicked and (clicked['lat'], clicked['lng']) != (center_lat, center_lng):
+        st.session_state[center_key] = (clicked['lat'], clicked['lng'])
+        st.rerun()
+    
+    st.caption(f"半径{radius_km}km以内: {len(result):,}件（検索時間: {elapsed_ms:.3f}ms）")
+    if result.empty:
+        return
+    
+    st.dataframe(
+        result[['都道府県名', '市区町村名', '距離(km)']].style.format({'距離(km)': '{:.1f}'}),
+        hide_index=True
+    )
+    
+    # 比較対象は都道府県単位で選択するため、同じ都道府県の市区町村のみを反映
+    in_prefecture = result.loc[result['都道府県名'] == prefecture, '市区町村名'].tolist()
+    if st.button(f"範囲内の{prefecture}の市区町村（{len(in_prefecture)}件）を比較対象にする"):
+        st.session_state[PENDING_SELECTION_KEY] = in_prefecture
+        st.rerun()
+
+def display_nearest_selection(df, prefecture, selected_codes, selected_value, granularity='区'):
+    """基準の市区町村に近い順にK件の市区町村を選択する（政令指定都市はgranularityの単位で表示）"""
+    join_table, data_version = get_join_table(df)
+    if join_table is None:
+        st.error("座標データが利用できません。")
+        return
+    
+    index = get_spatial_index(df, data_version, join_table)
+    shown = city_granularity_mask(index.rows, granularity)
+    prefecture_rows = index.rows[shown & (index.rows['都道府県名'] == prefecture).to_numpy()]
+    if prefecture_rows.empty:
+        st.error(f"選択された都道府県（{prefecture}）の座標データが見つかりません。")
+        return
+    
+    # 基準の初期値は最初に選択された市区町村
+    options = dict(zip(prefecture_rows['市区町村名'], prefecture_rows['団体コード']))
+    codes = to_city_granularity(
+        [normalize_municipality_code(code) for code in (selected_codes or [])], granularity,
+        ward_groups(prefecture_rows['団体コード'])
+    )
+    names = list(options)
+    default = next((names.index(name) for name, code in options.items() if code in codes), 0)
+    base_name = st.selectbox("基準の市区町村", names, index=default, key=f"nearest_base_{prefecture}")
+    k = st.slider("件数（K）", min_value=1, max_value=30, value=10)
+    
+    # 表示しない単位の行（政令指定都市の市または区）を除いてもK件残るよう、その分だけ多めに検索する
+    start = time.perf_counter()
+    result = index.nearest_to_code(options[base_name], k + int((~shown).sum()))
+    result = result[city_granularity_mask(result, granularity)].head(k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    base = prefecture_rows[prefecture_rows['市区町村名'] == base_name].iloc[0]
+    m = folium.Map(location=[base['lat'], base['lng']], zoom_start=9, tiles="OpenStreetMap")
+    folium.Marker(location=[base['lat'], base['lng']], tooltip=f"基準: {base_name}").add_to(m)
+    if not result.empty:
+        values = get_indicator_values(df, result['行番号'], selected_value)
+        add_population_markers(m, result, values, selected_value)
+    folium_static(m)
+    
+    st.caption(f"{base_name}に近い{len(result):,}件（検索時間: {elapsed_ms:.3f}ms）")
+    if result.empty:
+        return
+    
+    st.dataframe(
+        result[['都道府県名', '市区町村名', '距離(km)']].style.format({'距離(km)': '{:.1f}'}),
+        hide_index=True
+    )
+    
+    # 比較対象は都道府県単位で選択するため、同じ都道府県の市区町村のみを反映
+    in_prefecture = [base_name] + result.loc[result['都道府県名'] == prefecture, '市区町村名'].tolist()
+    if st.button(f"{base_name}と近い{prefecture}の市区町村（{len(in_prefecture)}件）を比較対象にする"):
+        st.session_state[PENDING_SELECTION_KEY] = in_prefecture
+        st.rerun()
+
+def display_map_section(df, prefecture, selected_codes=None, clusters=None):
+    """地図セクションを表示（clustersにはサイドバーで計算した年齢構成のクラスタを渡す）"""
     st.header("地図表示")
     
     if df.empty:
-        st.warning("データが読���込まれていません。")
+        st.warning("データが読み込まれていません。")
         return
     
     if not prefecture:
         st.warning("都道府県を選択してください。")
         return
     
+    # 表示モードの選択
+    mode = st.radio(
+        "表示モード",
+        ['選択した市区町村', '半径で選択', '近い順に選択', '全国（表示範囲）', '塗り分け（境界）'],
+        horizontal=True
+    )
+    
     # 表示する指標の選択
-    value_options = ['総人口', '20歳未満', '30-60代', '70歳以上']
+    value_options = list(VALUE_COLUMNS.keys())
     selected_value = st.selectbox(
         "表示する指標を選択",
         value_options,
         index=0
     )
     
+    show_boundary_tiles = False
+    if mode in ('選択した市区町村', '全国（表示範囲）'):
+        show_boundary_tiles = st.checkbox("境界タイルを重ねて表示（指標で塗り分け）")
+    
+    color_by_cluster = False
+    if mode == '選択した市区町村' and clusters is not None:
+        color_by_cluster = st.checkbox("年齢構成のクラスタで色分け")
+    
+    # 政令指定都市は区ごと、または区を融合した市全体で表示する
+    granularity = st.radio(
+        "政令指定都市の表示単位", CITY_GRANULARITIES, horizontal=True, key="designated_city_granularity"
+    )
+    
+    if mode == '塗り分け（境界）':
+        st.markdown("市区町村の境界を指標で塗り分けます。年齢区分は総数に対する割合で表示します。")
+        display_choropleth_map(df, prefecture, selected_value, granularity)
+        return
+    
+    if mode == '全国（表示範囲）':
+        st.markdown("表示範囲内の市区町村だけを読み込みます。縮小時は都道府県単位に集約して表示します。")
+        display_national_map(df, selected_value, show_boundary_tiles, granularity)
+        return
+    
+    if mode == '半径で選択':
+        st.markdown("地図をクリックすると、その地点を中心に半径内の市区町村を検索します。")
+        display_radius_selection(df, prefecture, selected_codes, selected_value, granularity)
+        return
+    
+    if mode == '近い順に選択':
+        st.markdown("基準の市区町村から距離の近い順にK件の市区町村を検索します。")
+        display_nearest_selection(df, prefecture, selected_codes, selected_value, granularity)
+        return
+    
     # 地図の作成と表示
-    m = create_map_view(df, prefecture, selected_codes, selected_value)
+    m = create_map_view(
+        df, prefecture, selected_codes, selected_value, show_boundary_tiles,
+        clusters if color_by_cluster else None, granularity
+    )
     if m is not None:
         folium_static(m)
         
@@ -208,5 +613,10 @@ def display_map_section(df, prefecture, selected_codes=None):
         - 円の大きさは選択した指標の値に比例します
         - 円をクリックすると詳細情報を確認できます
         """)
+        if color_by_cluster:
+            st.markdown(" ".join(
+                f"<span style='color:{clusters.color_of(label)}'>●</span> クラスタ{label}"
+                for label in clusters.summary.index
+            ), unsafe_allow_html=True)
     else:
         st.error("地図の表示に失敗しました。")
\ No newline at end of file
@@ -0,0 +1,83 @@
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+from app.dashboard.utils.pyramid import PYRAMID_AGES, without_covered_wards
+
+# 男女の色
+SEX_COLORS = {'男': '#4682B4', '女': '#DB7093'}
+COMBINED_LABEL = '選択した市区町村の合計'
+
+def create_pyramid_chart(male: np.ndarray, female: np.ndarray, title: str, as_share: bool = False) -> go.Figure:
+    """男性を左、女性を右に並べた人口ピラミッドを作成する関数"""
+    if as_share:
+        total = male.sum() + female.sum()
+        male, female = (male / total * 100, female / total * 100) if total > 0 else (male, female)
+    unit = '%' if as_share else '人'
+    value_format = '{:.1f}' if as_share else '{:,.0f}'
+
+    fig = go.Figure()
+    for sex, values, sign in (('男', male, -1), ('女', female, 1)):
+        fig.add_trace(go.Bar(
+            name=sex,
+            y=PYRAMID_AGES,
+            x=sign * values,
+            orientation='h',
+            marker_color=SEX_COLORS[sex],
+            customdata=[value_format.format(v) for v in values],
+            hovertemplate=f'%{{y}} {sex}: %{{customdata}}{unit}<extra></extra>'
+        ))
+
+    # 左右で同じ目盛りにし、男性側も正の値で表示する
+    limit = float(max(male.max(initial=0), female.max(initial=0))) * 1.1 or 1.0
+    ticks = np.linspace(-limit, limit, 7)
+    fig.update_layout(
+        title=title,
+        barmode='overlay',
+        bargap=0.1,
+        height=600,
+        xaxis=dict(
+            range=[-limit, limit],
+            tickvals=ticks,
+            ticktext=[value_format.format(abs(t)) for t in ticks],
+            title=f'人口（{unit}）'
+        ),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+def display_population_pyramid(pyramids, municipality_options):
+    """選択した市区町村の人口ピラミッドと年齢別の性比を表示する（事前計算した表を参照）"""
+    st.header("人口ピラミッド")
+
+    codes = list(municipality_options.values())
+    target = st.selectbox(
+        "表示する市区町村",
+        [COMBINED_LABEL, *municipality_options.keys()],
+        key="pyramid_target"
+    )
+    as_share = st.radio("表示単位", ['人数', '構成比'], horizontal=True, key="pyramid_unit") == '構成比'
+
+    if target == COMBINED_LABEL:
+        male, female = pyramids.combined(codes)
+        included = without_covered_wards(codes)
+        title = f"{COMBINED_LABEL}（{len(included)}件）"
+        if len(included) < len(codes):
+            st.caption(f"政令指定都市と一緒に選択された区（{len(codes) - len(included)}件）は市に含まれるため、合計には加えていません。")
+    else:
+        male, female = pyramids.combined([municipality_options[target]])
+        title = target
+    if male.sum() + female.sum() == 0:
+        st.warning("男女別のデータがありません。")
+        return
+
+    st.plotly_chart(create_pyramid_chart(male, female, title, as_share), use_container_width=True)
+
+    ratio = male.sum() / female.sum() * 100 if female.sum() > 0 else float('nan')
+    col1, col2, col3 = st.columns(3)
+    col1.metric("男性", f"{male.sum():,.0f}人")
+    col2.metric("女性", f"{female.sum():,.0f}人")
+    col3.metric("性比（女性100人あたりの男性）", f"{ratio:.1f}")
+
+    # 市区町村ごとの年齢別の性比（読み込み時に計算済み）
+    if st.checkbox('年齢別の性比を表示'):
+        st.dataframe(pyramids.ratio_table(codes).style.format('{:.1f}', na_rep='-'))
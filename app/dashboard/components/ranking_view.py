@@ -0,0 +1,64 @@
+import streamlit as st
+from app.dashboard.utils.constants import (
+    PENDING_PREFECTURE_KEY,
+    PENDING_SELECTION_KEY,
+    SELECTION_KEY_PREFIX
+)
+from app.dashboard.utils.rankings import MUNICIPALITY_TYPES, SHARE_SUFFIX
+
+def display_rankings(rankings, prefectures):
+    """全国の市区町村を指標で順位付けし、選んだ市区町村を比較対象に追加する"""
+    st.header("全国ランキング")
+
+    indicators = rankings.indicators
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        default = f"70歳以上{SHARE_SUFFIX}"
+        indicator = st.selectbox(
+            "指標", indicators,
+            index=indicators.index(default) if default in indicators else 0,
+            key="ranking_indicator"
+        )
+    with col2:
+        ascending = st.radio("順序", ['高い順', '低い順'], horizontal=True, key="ranking_order") == '低い順'
+    with col3:
+        k = st.number_input("件数", min_value=5, max_value=200, value=20, step=5, key="ranking_k")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_prefectures = st.multiselect("都道府県で絞り込み（未選択は全国）", prefectures, key="ranking_prefectures")
+    with col2:
+        types = st.multiselect("種別で絞り込み（未選択はすべて）", MUNICIPALITY_TYPES, key="ranking_types")
+
+    result = rankings.top(indicator, int(k), ascending, selected_prefectures, types)
+    if result.empty:
+        st.info("条件に一致する市区町村がありません。")
+        return
+
+    unit = rankings.units[indicator]
+    event = st.dataframe(
+        result[['順位', '都道府県名', '市区町村名', '種別', '値']].rename(columns={'値': f"{indicator}（{unit}）"}),
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="ranking_table",
+        column_config={
+            f"{indicator}（{unit}）": st.column_config.NumberColumn(format="localized" if unit == '人' else "%.1f")
+        }
+    )
+    st.caption("行をクリックして選び、比較対象に追加できます。")
+
+    chosen = result.iloc[event.selection.rows] if event is not None else result.iloc[[]]
+    if chosen.empty:
+        return
+
+    # 比較対象は都道府県単位で選択するため、最初に選んだ市区町村の都道府県に切り替えて追加する
+    prefecture = chosen['都道府県名'].iloc[0]
+    names = chosen.loc[chosen['都道府県名'] == prefecture, '市区町村名'].tolist()
+    if chosen['都道府県名'].nunique() > 1:
+        st.caption(f"比較対象は都道府県ごとのため、{prefecture}の市区町村のみを追加します。")
+    if st.button(f"{prefecture}の{len(names)}件を比較対象に追加"):
+        current = st.session_state.get(f"{SELECTION_KEY_PREFIX}{prefecture}", [])
+        st.session_state[PENDING_PREFECTURE_KEY] = prefecture
+        st.session_state[PENDING_SELECTION_KEY] = [*current, *[name for name in names if name not in current]]
+        st.rerun()
@@ -0,0 +1,37 @@
+import pandas as pd
+import streamlit as st
+from app.dashboard.utils.aggregates import SHARE_PREFIX
+from app.dashboard.utils.constants import AGE_ANALYSIS_GROUPS
+
+# 階層比較で表示する列
+ROLLUP_COLUMNS = ['総人口'] + [f"{SHARE_PREFIX}{group}" for group in AGE_ANALYSIS_GROUPS]
+
+def format_rollup_table(table: pd.DataFrame) -> pd.DataFrame:
+    """階層比較の表を表示用に整える"""
+    table = table.rename(columns={f"{SHARE_PREFIX}{group}": f"{group}(%)" for group in AGE_ANALYSIS_GROUPS})
+    formats = {col: '{:.1f}' for col in table.columns if col.endswith('(%)')}
+    formats['総人口'] = '{:,.0f}'
+    return table.style.format(formats)
+
+def display_rollup_comparison(cube, municipality_options):
+    """選択した市区町村を、上位の階層（政令指定都市・都道府県・全国）と比較する"""
+    with st.sidebar.expander("上位の階層と比較", expanded=False):
+        if not municipality_options:
+            st.info("市区町村を選択してください。")
+            return
+        
+        label = st.selectbox("比較する市区町村", list(municipality_options.keys()), key="rollup_municipality")
+        sex = st.radio("性別", ['計', '男', '女'], horizontal=True, key="rollup_sex")
+        
+        node = cube.node_for_code(municipality_options[label])
+        if node is None:
+            st.warning("この市区町村は集計の対象外です。")
+            return
+        
+        # 区→政令指定都市→都道府県→全国（集計済みの値を参照するだけ）
+        st.dataframe(format_rollup_table(cube.compare(cube.path(node), sex, ROLLUP_COLUMNS)))
+        
+        # 政令指定都市の場合は区の内訳も表示
+        city = next((n for n in cube.path(node) if n[0] == '政令指定都市'), None)
+        if city is not None and st.checkbox(f"{cube.nodes[city]['名称']}の区を表示", key="rollup_wards"):
+            st.dataframe(format_rollup_table(cube.compare(cube.drill_down(city), sex, ROLLUP_COLUMNS)))
@@ -0,0 +1,42 @@
+import streamlit as st
+from app.dashboard.utils.constants import PENDING_SELECTION_KEY
+from app.dashboard.utils.similarity import SIMILARITY_METRICS
+
+SEARCH_SCOPES = ['全国', '同じ都道府県']
+
+def display_similar_search(index, prefecture, municipality_options, selected_labels):
+    """選択した市区町村と年齢構成が似た市区町村を探し、比較対象にする"""
+    with st.sidebar.expander("年齢構成が似た市区町村", expanded=False):
+        labels = list(municipality_options.keys())
+        if not labels:
+            st.info("市区町村がありません。")
+            return
+
+        default = labels.index(selected_labels[0]) if selected_labels else 0
+        base = st.selectbox("基準の市区町村", labels, index=default, key="similar_base")
+        metric = st.radio(
+            "類似度", list(SIMILARITY_METRICS), format_func=SIMILARITY_METRICS.get,
+            horizontal=True, key="similar_metric"
+        )
+        scope = st.radio("検索範囲", SEARCH_SCOPES, horizontal=True, key="similar_scope")
+        k = st.slider("件数", min_value=5, max_value=30, value=10, key="similar_k")
+
+        try:
+            result = index.query(
+                municipality_options[base], k, metric,
+                prefecture=prefecture if scope == '同じ都道府県' else None
+            )
+        except KeyError:
+            st.warning("この市区町村は類似検索の対象外です。")
+            return
+
+        st.dataframe(
+            result[['都道府県名', '市区町村名', '類似度']].style.format({'類似度': '{:.3f}'}),
+            hide_index=True
+        )
+
+        # 比較対象は都道府県単位で選択するため、同じ都道府県の市区町村のみを反映
+        in_prefecture = result.loc[result['都道府県名'] == prefecture, '市区町村名'].tolist()
+        if st.button(f"基準と似た{prefecture}の市区町村（{len(in_prefecture)}件）を比較対象にする"):
+            st.session_state[PENDING_SELECTION_KEY] = [base, *in_prefecture]
+            st.rerun()
@@ -0,0 +1,73 @@
+from branca.element import MacroElement
+from jinja2 import Template
+
+class BoundaryTileLayer(MacroElement):
+    """ローカルのタイルサーバーから境界タイルを読み込み、canvasに描画するLeafletレイヤー
+
+    表示中のタイルだけをブラウザが取得し、取得済みのタイルはHTTPキャッシュから再利用される。
+    colorsを渡すと団体コードごとに塗り分け、渡さない場合は境界線のみを描く。
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }}_colors = {{ this.colors|tojson }};
+        var {{ this.get_name() }}_class = L.GridLayer.extend({
+            createTile: function(coords, done) {
+                var tile = document.createElement('canvas');
+                var size = this.getTileSize();
+                tile.width = size.x;
+                tile.height = size.y;
+                var url = L.Util.template({{ this.url|tojson }}, coords);
+                fetch(url)
+                    .then(function(response) {
+                        return response.ok ? response.json() : {extent: 4096, features: []};
+                    })
+                    .then(function(data) {
+                        var ctx = tile.getContext('2d');
+                        var scale = size.x / data.extent;
+                        ctx.lineWidth = {{ this.weight }};
+                        ctx.strokeStyle = {{ this.line_color|tojson }};
+                        data.features.forEach(function(feature) {
+                            ctx.beginPath();
+                            feature.rings.forEach(function(ring) {
+                                ring.forEach(function(point, i) {
+                                    if (i === 0) {
+                                        ctx.moveTo(point[0] * scale, point[1] * scale);
+                                    } else {
+                                        ctx.lineTo(point[0] * scale, point[1] * scale);
+                                    }
+                                });
+                                ctx.closePath();
+                            });
+                            var color = {{ this.get_name() }}_colors[feature.code];
+                            if (color) {
+                                ctx.fillStyle = color;
+                                ctx.fill('evenodd');
+                            }
+                            ctx.stroke();
+                        });
+                        done(null, tile);
+                    })
+                    .catch(function(error) { done(error, tile); });
+                return tile;
+            }
+        });
+        var {{ this.get_name() }} = new {{ this.get_name() }}_class({
+            minNativeZoom: {{ this.min_native_zoom }},
+            maxNativeZoom: {{ this.max_native_zoom }},
+            opacity: {{ this.opacity }}
+        }).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, min_native_zoom, max_native_zoom, colors=None,
+                 line_color='#555555', weight=0.5, opacity=0.7):
+        super().__init__()
+        self._name = 'BoundaryTileLayer'
+        self.url = url
+        self.min_native_zoom = min_native_zoom
+        self.max_native_zoom = max_native_zoom
+        self.colors = colors or {}
+        self.line_color = line_color
+        self.weight = weight
+        self.opacity = opacity
@@ -1,25 +1,70 @@
 import streamlit as st
 import pandas as pd
 from app.dashboard.data.loader import load_population_data, get_municipalities_by_prefecture
-from app.dashboard.components.map_view import display_map_section
-from app.dashboard.components.charts import display_age_analysis, display_voting_trend
+from app.dashboard.utils.constants import (
+    PENDING_PREFECTURE_KEY,
+    PENDING_SELECTION_KEY,
+    PREFECTURE_KEY,
+    SELECTION_KEY_PREFIX
+)
+from app.dashboard.utils.coordinates_loader import get_coordinate_cache_stats
+from app.dashboard.utils.shared_dataset import load_shared_dataset
+from app.dashboard.components.rollup_view import display_rollup_comparison
+from app.dashboard.components.export_view import display_export_section
+from app.dashboard.components.similarity_view import display_similar_search
+from app.dashboard.components.cluster_view import display_cluster_filter
 
-def run_dashboard(excel_path: str):
+# 地図（folium）やグラフ（plotly）のコンポーネントは読み込みが重いため、
+# タブが選択されて初めて読み込む
+
+def display_warmup_status(warmup):
+    """起動時の読み込み状況をサイドバーに表示する"""
+    status = pd.DataFrame(warmup.status())
+    ready = (status['状態'] == '完了').sum()
+    with st.sidebar.expander(f"データの準備状況（{ready}/{len(status)}）", expanded=False):
+        st.dataframe(
+            status[['データ', '状態', '所要時間(秒)']].style.format({'所要時間(秒)': '{:.2f}'}, na_rep='-'),
+            hide_index=True
+        )
+        if warmup.is_ready('population'):
+            dataset = warmup.get('population')
+            st.caption(f"共有データ: {len(dataset):,}行（{dataset.nbytes / 1024 / 1024:.1f}MB、全セッション共通）")
+        stats = get_coordinate_cache_stats()
+        st.caption(
+            f"都道府県別の座標キャッシュ: {stats['保持数']}/{stats['上限']}県"
+            f"（ヒット {stats['ヒット']:,}件、ミス {stats['ミス']:,}件、破棄 {stats['破棄']:,}件）"
+        )
+        failed = status[status['状態'] == '失敗']
+        for _, row in failed.iterrows():
+            st.error(f"{row['データ']}: {row['メッセージ']}")
+
+def run_dashboard(excel_path: str, warmup=None):
     """メインのダッシュボード処理"""
     try:
-        # データの読み込み
-        df = load_population_data(excel_path)
+        # データの読み込み（全セッションで共有する読み取り専用データのビューを使う）
+        if warmup is not None:
+            dataset = warmup.get('population')
+        else:
+            dataset = load_shared_dataset(excel_path, load_population_data)
+        df = dataset.view()
         
         # タイトルの設定
         st.title("📊 統計データ分析ダッシュボード")
         
         # サイドバーの設定
         st.sidebar.header("データフィルター")
+        if warmup is not None:
+            display_warmup_status(warmup)
         
-        # 都道府県選択
+        # 都道府県選択（他のコンポーネントから切り替えが指定された場合は差し替える）
+        prefectures = sorted(df['都道府県名'].unique())
+        pending_prefecture = st.session_state.pop(PENDING_PREFECTURE_KEY, None)
+        if pending_prefecture in prefectures:
+            st.session_state[PREFECTURE_KEY] = pending_prefecture
         prefecture = st.sidebar.selectbox(
             "都道府県を選択してください",
-            sorted(df['都道府県名'].unique())
+            prefectures,
+            key=PREFECTURE_KEY
         )
         
         # 市区町村の取得
@@ -33,13 +78,28 @@ def run_dashboard(excel_path: str):
         
         # デフォルトの選択（最初の3つ）
         default_selection = list(municipality_options.keys())[:3] if municipality_options else []
+        selection_key = f"{SELECTION_KEY_PREFIX}{prefecture}"
+        if selection_key not in st.session_state:
+            st.session_state[selection_key] = default_selection
+        
+        # 他のコンポーネントから比較対象が指定された場合は選択を差し替える
+        pending_selection = st.session_state.pop(PENDING_SELECTION_KEY, None)
+        if pending_selection is not None:
+            st.session_state[selection_key] = [
+                label for label in pending_selection if label in municipality_options
+            ]
         
         # 市区町村の複数選択
         selected_municipality_labels = st.sidebar.multiselect(
             "市区町村を選択（複数選択可）",
             options=list(municipality_options.keys()),
-            default=default_selection,
-            key=f"municipalities_{prefecture}"
+            key=selection_key
+        )
+        
+        # 上位の階層との比較（事前に集計した値を参照）
+        display_rollup_comparison(
+            dataset.rollup,
+            {label: municipality_options[label] for label in selected_municipality_labels}
         )
         
         # 選択された市区町村の団体コードを取得
@@ -48,6 +108,15 @@ def run_dashboard(excel_path: str):
             for label in selected_municipality_labels
         ]
         
+        # 年齢構成が似た市区町村の検索（全国の構成比の行列は読み込み時に1度だけ作成）
+        display_similar_search(dataset.similarity, prefecture, municipality_options, selected_municipality_labels)
+        
+        # 年齢構成のクラスタ（データバージョン・クラスタ数・区切りごとにキャッシュ）
+        clusters = display_cluster_filter(dataset, prefecture)
+        
+        # データのダウンロード
+        display_export_section(dataset, prefecture, selected_codes)
+        
         # 選択された市区町村のデータを取得
         selected_data = df[
             (df['都道府県名'] == prefecture) & 
@@ -55,33 +124,59 @@ def run_dashboard(excel_path: str):
             (df['性別'] == '計')
         ]
         
-        # タブの作成
-        tab1, tab2, tab3 = st.tabs([
+        # タブの作成（選択中のタブだけを実行する）
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "🗺️ 地理的分布",
             "📊 年齢構成分析",
-            "🗳️ 投票傾向分析"
-        ])
+            "🗳️ 投票傾向分析",
+            "👫 人口ピラミッド",
+            "🏆 全国ランキング"
+        ], key="main_tab", on_change="rerun")
         
         # 地理的分布タブ
-        with tab1:
-            if selected_codes:
-                display_map_section(df, prefecture, selected_codes)
-            else:
-                st.warning("市区町村を選択してください。")
+        if tab1.open:
+            with tab1:
+                if selected_codes:
+                    from app.dashboard.components.map_view import display_map_section
+                    display_map_section(df, prefecture, selected_codes, clusters)
+                else:
+                    st.warning("市区町村を選択してください。")
         
         # 年齢構成分析タブ
-        with tab2:
-            if selected_codes:
-                display_age_analysis(selected_data, prefecture)
-            else:
-                st.warning("市区町村を選択してください。")
+        if tab2.open:
+            with tab2:
+                if selected_codes:
+                    from app.dashboard.components.charts import display_age_analysis
+                    display_age_analysis(selected_data, prefecture, dataset.aggregate_rows(selected_data))
+                else:
+                    st.warning("市区町村を選択してください。")
         
         # 投票傾向分析タブ
-        with tab3:
-            if selected_codes:
-                display_voting_trend(selected_data, prefecture)
-            else:
-                st.warning("市区町村を選択してください。")
+        if tab3.open:
+            with tab3:
+                if selected_codes:
+                    from app.dashboard.components.charts import display_voting_trend
+                    display_voting_trend(selected_data, prefecture, dataset.aggregate_rows(selected_data))
+                else:
+                    st.warning("市区町村を選択してください。")
+        
+        # 人口ピラミッドタブ（男女別の行から事前計算した表を参照）
+        if tab4.open:
+            with tab4:
+                if selected_codes:
+                    from app.dashboard.components.pyramid_view import display_population_pyramid
+                    display_population_pyramid(
+                        dataset.pyramids,
+                        {label: municipality_options[label] for label in selected_municipality_labels}
+                    )
+                else:
+                    st.warning("市区町村を選択してください。")
+        
+        # 全国ランキングタブ（都道府県の選択にかかわらず全国から検索する）
+        if tab5.open:
+            with tab5:
+                from app.dashboard.components.ranking_view import display_rankings
+                display_rankings(dataset.rankings, prefectures)
             
     except Exception as e:
         st.error(f"エラーが発生しました: {str(e)}")
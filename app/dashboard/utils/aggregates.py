@@ -0,0 +1,105 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.cache import compute_digest
+from app.dashboard.utils.constants import (
+    AGE_ANALYSIS_GROUPS,
+    AGE_GROUPS,
+    AGE_ORDER,
+    VALUE_COLUMNS,
+    VOTING_RATES
+)
+
+# 集計表の列名の接頭辞
+SHARE_PREFIX = '構成比:'
+ADULT_SHARE_PREFIX = '20歳以上構成比:'
+VOTING_PREFIX = '投票影響度:'
+ADULT_TOTAL = '20歳以上'
+
+def get_group_definitions() -> Dict[str, List[str]]:
+    """アプリ全体で使う年齢区分を、重複を除いて1つにまとめる関数
+
+    同じ名前の区分は同じ年齢列でなければならない（定義が食い違う場合はエラー）。
+    """
+    groups: Dict[str, List[str]] = {}
+    for definitions in (VALUE_COLUMNS, AGE_GROUPS, AGE_ANALYSIS_GROUPS):
+        for name, columns in definitions.items():
+            if name in groups and groups[name] != list(columns):
+                raise ValueError(f"年齢区分「{name}」の定義が一致しません")
+            groups[name] = list(columns)
+    groups[ADULT_TOTAL] = [col for name in AGE_ORDER for col in AGE_GROUPS[name]]
+    return groups
+
+def aggregate_definitions_digest() -> str:
+    """集計の定義のダイジェスト（定義を変えたら保存済みの集計表を作り直す）"""
+    return compute_digest(get_group_definitions(), VOTING_RATES, AGE_ORDER, list(AGE_ANALYSIS_GROUPS))
+
+def materialize_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """市区町村・性別の行ごとに、年齢区分の人口・構成比・投票影響度をまとめて計算する関数
+
+    年齢列×区分の0/1行列との行列積で全区分を1度に集計する。結果は元の行と同じインデックスを持つ。
+    """
+    groups = get_group_definitions()
+    bucket_columns = sorted({col for columns in groups.values() for col in columns}, key=list(df.columns).index)
+    membership = np.zeros((len(bucket_columns), len(groups)))
+    for j, columns in enumerate(groups.values()):
+        for col in columns:
+            membership[bucket_columns.index(col), j] = 1.0
+
+    buckets = df[bucket_columns].to_numpy(dtype=float)
+    totals = buckets @ membership
+    result = {name: totals[:, j] for j, name in enumerate(groups)}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 年齢構成分析：総数に対する構成比
+        population = df['総数'].to_numpy(dtype=float)
+        for name in AGE_ANALYSIS_GROUPS:
+            result[f"{SHARE_PREFIX}{name}"] = np.where(population > 0, result[name] / population * 100, 0.0)
+
+        # 投票傾向分析：20歳以上に対する構成比と、投票率を掛けて100%に正規化した影響度
+        adults = result[ADULT_TOTAL]
+        shares = np.column_stack([
+            np.where(adults > 0, result[name] / adults * 100, 0.0) for name in AGE_ORDER
+        ])
+        power = shares * np.array([VOTING_RATES[name] for name in AGE_ORDER])
+        power_total = power.sum(axis=1, keepdims=True)
+        power = np.where(power_total > 0, power / power_total * 100, power)
+        for j, name in enumerate(AGE_ORDER):
+            result[f"{ADULT_SHARE_PREFIX}{name}"] = shares[:, j]
+            result[f"{VOTING_PREFIX}{name}"] = power[:, j]
+
+    return pd.DataFrame(result, index=df.index)
+
+def melt_aggregates(
+    rows: pd.DataFrame,
+    aggregates: pd.DataFrame,
+    groups: List[str],
+    value_columns: Dict[str, str]
+) -> pd.DataFrame:
+    """集計表の選択行を、市区町村×年齢区分の縦長の表に変換する関数
+
+    value_columnsは出力列名と集計表の接頭辞（空文字は人口そのもの）の対応。
+    """
+    names = rows['市区町村名'].astype(str).to_numpy()
+    frames = []
+    for group in groups:
+        frame = {'市区町村名': names, '年齢区分': group}
+        for output, prefix in value_columns.items():
+            frame[output] = aggregates[f"{prefix}{group}"].to_numpy()
+        frames.append(pd.DataFrame(frame))
+    if not frames:
+        return pd.DataFrame(columns=['市区町村名', '年齢区分', *value_columns])
+    return pd.concat(frames, ignore_index=True)
+
+def pivot_aggregates(
+    rows: pd.DataFrame,
+    aggregates: pd.DataFrame,
+    groups: List[str],
+    prefix: str = ''
+) -> pd.DataFrame:
+    """集計表の選択行を、市区町村×年齢区分の表にする関数（集計表は横長なので列を選ぶだけ）"""
+    table = aggregates[[f"{prefix}{group}" for group in groups]].set_axis(groups, axis=1)
+    names = pd.Index(rows['市区町村名'].astype(str).to_numpy(), name='市区町村名')
+    return table.set_axis(names).sort_index()
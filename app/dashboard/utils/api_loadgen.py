@@ -0,0 +1,111 @@
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from app.dashboard.utils.api_server import DEFAULT_HOST, DEFAULT_PORT
+
+# 既定で送るクエリ（件数の多い都道府県を含める）
+# （URLに日本語をそのまま含めると送信できないため、クエリはエンコードする）
+DEFAULT_PATHS = [
+    f"{endpoint}?{urlencode({'prefecture': prefecture})}"
+    for endpoint, prefecture in [
+        ('/api/municipalities', '東京都'),
+        ('/api/age-groups', '北海道'),
+        ('/api/voting', '大阪府'),
+        ('/api/coordinates', '神奈川県'),
+    ]
+]
+# 接続できなかった・応答を読めなかったリクエストのステータス
+FAILED_STATUS = '失敗'
+
+def run_load(
+    base_url: str,
+    paths: List[str],
+    concurrency: int = 8,
+    requests_per_worker: int = 200,
+    revalidate: bool = False
+) -> Dict:
+    """複数スレッドから同時にリクエストを送り、スループットと応答時間を計測する関数
+
+    revalidate=Trueの場合は、受け取ったETagをIf-None-Matchで送り返す（304の計測）。
+    接続の失敗は応答時間に含めず、ステータスの「失敗」として数える。
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    received = [0]
+    lock = threading.Lock()
+
+    def worker(offset: int):
+        etags: Dict[str, str] = {}
+        local_latencies, local_statuses, local_bytes = [], Counter(), 0
+        for i in range(requests_per_worker):
+            path = paths[(offset + i) % len(paths)]
+            headers = {'Accept-Encoding': 'gzip'}
+            if revalidate and path in etags:
+                headers['If-None-Match'] = etags[path]
+            start = time.perf_counter()
+            try:
+                with urlopen(Request(base_url + path, headers=headers)) as response:
+                    body = response.read()
+                    status = response.status
+                    etag: Optional[str] = response.headers.get('ETag')
+            except HTTPError as e:
+                body, status, etag = b'', e.code, e.headers.get('ETag')
+            except (URLError, OSError):
+                local_statuses[FAILED_STATUS] += 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+            local_bytes += len(body)
+            if etag:
+                etags[path] = etag
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            received[0] += local_bytes
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # 全てのリクエストが失敗した場合は応答時間を計算しない
+    latency_ms = np.asarray(latencies) * 1000
+    return {
+        'リクエスト数': len(latencies) + statuses[FAILED_STATUS],
+        '所要時間(秒)': elapsed,
+        'スループット(件/秒)': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        '中央値(ms)': float(np.percentile(latency_ms, 50)) if len(latency_ms) else None,
+        '95パーセンタイル(ms)': float(np.percentile(latency_ms, 95)) if len(latency_ms) else None,
+        '受信量(KB)': received[0] / 1024,
+        'ステータス': dict(statuses),
+    }
+
+def main():
+    """起動中のAPIサーバーに負荷をかけ、結果を表示する
+
+    使い方: python -m app.dashboard.utils.api_loadgen [同時接続数] [1接続あたりのリクエスト数]
+    """
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requests_per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    base_url = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+    for revalidate in (False, True):
+        label = 'ETagで再検証' if revalidate else '通常'
+        result = run_load(base_url, DEFAULT_PATHS, concurrency, requests_per_worker, revalidate)
+        print(f"\n{label}（同時接続 {concurrency}）")
+        for key, value in result.items():
+            print(f"- {key}: {value:,.1f}" if isinstance(value, float) else f"- {key}: {'-' if value is None else value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+import gzip
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.aggregates import ADULT_SHARE_PREFIX, SHARE_PREFIX, VOTING_PREFIX
+from app.dashboard.utils.cache import compute_digest
+from app.dashboard.utils.constants import AGE_ANALYSIS_GROUPS, AGE_ORDER
+from app.dashboard.utils.export import (
+    CSV_ENCODINGS,
+    EXPORT_FORMATS,
+    export_file_name,
+    iter_export,
+    iter_export_chunks,
+    select_positions,
+    unencodable_values
+)
+from app.dashboard.utils.geo_join import normalize_municipality_code
+from app.dashboard.utils.shared_dataset import SharedDataset
+
+DEFAULT_HOST = os.environ.get('ESTAT_API_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('ESTAT_API_PORT', '8766'))
+# ファイルの出力（キャッシュせずに少しずつ送る）
+EXPORT_PATH = '/api/export'
+# 同じクエリへの応答を保持する件数
+RESPONSE_CACHE_SIZE = 1024
+# データが変われば ETag も変わるため、ブラウザ等には毎回確認させる
+CACHE_CONTROL = 'no-cache'
+
+class ApiError(Exception):
+    """クエリが不正な場合のエラー（400を返す）"""
+
+class ResponseCache:
+    """クエリごとの応答（gzip圧縮済み）を保持するLRUキャッシュ"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[str, Tuple[bytes, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, body: bytes) -> Tuple[bytes, bytes]:
+        entry = (body, gzip.compress(body, compresslevel=6))
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        return {'ヒット': self.hits, 'ミス': self.misses, '保持数': len(self._entries)}
+
+def to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """データフレームをJSONに変換できるレコードのリストにする関数（欠損値はnull）"""
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient='records')
+
+class PopulationApi:
+    """APIの各エンドポイントの応答を作成するクラス
+
+    共有データと、読み込み時に計算済みの集計表を参照するだけで、リクエストごとに集計し直さない。
+    """
+
+    def __init__(self, dataset: SharedDataset, join_table: Optional[pd.DataFrame] = None):
+        self.dataset = dataset
+        self.version = dataset.version
+        self.frame = dataset.view()
+        self._join_table = join_table
+        self._join_lock = threading.Lock()
+        # 入力の団体コードの表記揺れ（チェックディジットの有無等）を吸収するため正規化しておく
+        self.codes = self.frame['団体コード'].map(normalize_municipality_code).to_numpy()
+        self.routes: Dict[str, Callable[[Dict[str, str]], Any]] = {
+            '/api/version': self.version_info,
+            '/api/municipalities': self.municipalities,
+            '/api/age-groups': self.age_groups,
+            '/api/voting': self.voting,
+            '/api/coordinates': self.coordinates,
+        }
+
+    @property
+    def join_table(self) -> pd.DataFrame:
+        """座標の結合表（渡されていなければ最初に参照されたときに読み込む）"""
+        with self._join_lock:
+            if self._join_table is None:
+                from app.dashboard.utils.geo_join import load_geo_join_table
+                self._join_table, _ = load_geo_join_table(self.frame)
+            return self._join_table
+
+    def select_rows(self, params: Dict[str, str]) -> pd.DataFrame:
+        """prefecture・codes・sexで行を絞り込む関数（都道府県か団体コードの指定が必須）"""
+        prefecture = params.get('prefecture')
+        codes = [code for code in params.get('codes', '').split(',') if code]
+        if not prefecture and not codes:
+            raise ApiError("prefecture または codes を指定してください")
+
+        mask = self.frame['性別'] == params.get('sex', '計')
+        if prefecture:
+            mask = mask & (self.frame['都道府県名'] == prefecture)
+        if codes:
+            normalized = [normalize_municipality_code(code) for code in codes]
+            if None in normalized:
+                raise ApiError(f"不正な団体コードがあります: {codes[normalized.index(None)]}")
+            mask = mask & np.isin(self.codes, normalized)
+        return self.frame[mask]
+
+    def version_info(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {'version': self.version, 'rows': len(self.frame)}
+
+    def municipalities(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        mask = self.frame['性別'] == '計'
+        if params.get('prefecture'):
+            mask = mask & (self.frame['都道府県名'] == params['prefecture'])
+        return to_records(self.frame[mask][['団体コード', '都道府県名', '市区町村名']])
+
+    def _grouped(self, rows: pd.DataFrame, groups: List[str], values: Dict[str, str]) -> List[Dict[str, Any]]:
+        aggregates = self.dataset.aggregate_rows(rows)
+        records = to_records(rows[['団体コード', '都道府県名', '市区町村名', '性別']])
+        for i, record in enumerate(records):
+            record['年齢区分'] = [
+                {'年齢区分': group, **{name: float(aggregates[f"{prefix}{group}"].iat[i]) for name, prefix in values.items()}}
+                for group in groups
+            ]
+        return records
+
+    def age_groups(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """年齢区分ごとの人口と総数に対する構成比"""
+        return self._grouped(self.select_rows(params), list(AGE_ANALYSIS_GROUPS), {'人口': '', '構成比': SHARE_PREFIX})
+
+    def voting(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """20歳以上の年齢区分ごとの構成比と、100%に正規化した投票影響度"""
+        return self._grouped(self.select_rows(params), AGE_ORDER, {'人口構成比': ADULT_SHARE_PREFIX, '投票影響度': VOTING_PREFIX})
+
+    def coordinates(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        table = self.join_table
+        if params.get('prefecture'):
+            table = table[table['都道府県名'] == params['prefecture']]
+        if params.get('codes'):
+            codes = [normalize_municipality_code(code) for code in params['codes'].split(',') if code]
+            table = table[table['団体コード'].isin(codes)]
+        return to_records(table[['団体コード', '都道府県名', '市区町村名', 'lat', 'lng']])
+
+    def export(self, params: Dict[str, str]) -> Tuple[str, str, Any]:
+        """出力するファイルの名前・形式と、少しずつ変換したバイト列を返す関数
+
+        prefecture・codesを指定しなければ全国を出力する。sexを指定しなければ計・男・女の全ての行を出力する。
+        """
+        export_format = params.get('format', 'csv')
+        encoding = params.get('encoding', 'UTF-8')
+        if export_format not in EXPORT_FORMATS:
+            raise ApiError(f"formatは {', '.join(EXPORT_FORMATS)} のいずれかを指定してください")
+        if encoding not in CSV_ENCODINGS:
+            raise ApiError(f"encodingは {', '.join(CSV_ENCODINGS)} のいずれかを指定してください")
+
+        codes = [code for code in params.get('codes', '').split(',') if code]
+        positions = select_positions(self.frame, params.get('prefecture'), codes, params.get('sex'))
+        # 送り始めてからは失敗を伝えられないため、文字コードで表せない値は先に確認する
+        unencodable = unencodable_values(self.frame, positions, encoding)
+        if unencodable:
+            raise ApiError(f"{encoding}で表せない文字を含むため出力できません（UTF-8を指定してください）: {', '.join(unencodable[:5])}")
+        chunks = iter_export_chunks(self.frame, positions, self.dataset.aggregates)
+        label = params.get('prefecture') or ('選択' if codes else '全国')
+        return export_file_name(label, export_format, encoding), export_format, iter_export(chunks, export_format, encoding)
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """JSONを返すHTTPハンドラ（応答はクエリごとにキャッシュし、ETagはデータバージョンから作る）"""
+
+    def __init__(self, *args, api: PopulationApi, cache: ResponseCache, **kwargs):
+        self.api = api
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        handler = self.api.routes.get(url.path)
+        if handler is None and url.path != EXPORT_PATH:
+            self._send_json(404, {'error': 'Not Found'})
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == EXPORT_PATH:
+            self._send_export(params)
+            return
+
+        key = compute_digest(url.path, sorted(params.items()))
+        # 同じデータ・同じクエリなら応答も同じなので、応答を作らずにETagを決められる
+        etag = f'"{self.api.version[:12]}-{key[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self._send_common_headers(etag)
+            self.end_headers()
+            return
+
+        entry = self.cache.get(key)
+        if entry is None:
+            try:
+                payload = handler(params)
+            except ApiError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            entry = self.cache.put(key, body)
+
+        accepts_gzip = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        body = entry[1] if accepts_gzip else entry[0]
+        self.send_response(200)
+        self._send_common_headers(etag)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if accepts_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_export(self, params: Dict[str, str]):
+        """ファイルを少しずつ送る（全体を作ってから送らないため、大きなファイルでもすぐに始まる）"""
+        try:
+            file_name, export_format, body = self.api.export(params)
+        except ApiError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', EXPORT_FORMATS[export_format])
+        self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(file_name)}")
+        self.send_header('Access-Control-Allow-Origin', '*')
+        # 長さは送り終えるまで分からないため、接続を閉じて終わりを伝える
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for data in body:
+                if data:
+                    self.wfile.write(data)
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # ダウンロードが中断された
+            body.close()
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_common_headers(self, etag: str):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def log_message(self, format, *args):
+        # アクセスごとのログは出さない
+        pass
+
+def create_api_server(
+    api: PopulationApi,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    cache: Optional[ResponseCache] = None
+) -> ThreadingHTTPServer:
+    """APIサーバーを作成する関数"""
+    handler = partial(ApiRequestHandler, api=api, cache=cache or ResponseCache())
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_api_server(
+    api: PopulationApi,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """APIサーバーをバックグラウンドのスレッドで起動する関数"""
+    server = create_api_server(api, host, port)
+    thread = threading.Thread(target=server.serve_forever, name='api-server', daemon=True)
+    thread.start()
+    print(f"APIサーバーを起動しました: http://{host}:{server.server_address[1]}/api/")
+    return server
+
+def load_api(excel_path: str) -> PopulationApi:
+    """人口データを読み込み、APIを作成する関数（公開済みの共有配列があれば結合表も含めて利用）"""
+    from app.dashboard.data.loader import load_population_data
+    from app.dashboard.utils.cache import file_digest
+    from app.dashboard.utils.shared_arrays import attach_population_arrays
+    from app.dashboard.utils.shared_dataset import load_shared_dataset
+
+    attached = attach_population_arrays(file_digest(excel_path))
+    if attached:
+        dataset = load_shared_dataset(excel_path, lambda path: attached[0], lambda: attached[3])
+        return PopulationApi(dataset, attached[1])
+
+    return PopulationApi(load_shared_dataset(excel_path, load_population_data))
+
+def main():
+    """人口データのAPIサーバーを起動する"""
+    excel_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('data/24nsnen.xlsx')
+    if not excel_path.exists():
+        print(f"エラー: {excel_path} が見つかりません")
+        sys.exit(1)
+
+    api = load_api(str(excel_path))
+    server = create_api_server(api)
+    print(f"APIサーバーを起動しました: http://{DEFAULT_HOST}:{DEFAULT_PORT}/api/（データバージョン {api.version[:12]}）")
+    for route in [*api.routes, EXPORT_PATH]:
+        print(f"- {route}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("APIサーバーを停止しました")
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+BOUNDARIES_PATH = DATA_DIR / 'boundaries.json'
+
+# 簡略化の許容誤差（度）。粗いものから順に並べる
+SIMPLIFY_TOLERANCES = {
+    'low': 0.01,      # 約1km（全国表示）
+    'medium': 0.002,  # 約200m（都道府県表示）
+    'high': 0.0005    # 約50m（市区町村の拡大表示）
+}
+# 量子化の刻みは許容誤差のこの割合にする
+QUANTIZATION_RATIO = 0.25
+
+# 座標は（経度, 緯度）のタプルで扱う
+Point = Tuple[float, float]
+Ring = List[Point]
+Polygon = List[Ring]
+
+def geometry_to_polygons(geometry: Dict) -> List[Polygon]:
+    """GeoJSONのジオメトリをポリゴン（外周＋穴）のリストに変換する関数"""
+    coords = geometry.get('coordinates') or []
+    if geometry.get('type') == 'Polygon':
+        coords = [coords]
+    elif geometry.get('type') != 'MultiPolygon':
+        return []
+
+    polygons = []
+    for polygon in coords:
+        rings = []
+        for ring in polygon:
+            points = [(float(p[0]), float(p[1])) for p in ring]
+            # 閉じた点と連続する重複点を除去
+            if len(points) > 1 and points[0] == points[-1]:
+                points = points[:-1]
+            points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+            if len(points) >= 3:
+                rings.append(points)
+        if rings:
+            polygons.append(rings)
+    return polygons
+
+def ring_signed_area(points: Sequence[Point]) -> float:
+    """リングの符号付き面積（度^2、反時計回りが正）を計算する関数"""
+    xs = np.asarray([p[0] for p in points])
+    ys = np.asarray([p[1] for p in points])
+    return 0.5 * float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys))
+
+def point_in_ring(point: Point, ring: Sequence[Point]) -> bool:
+    """点がリングの内側にあるかを判定する関数（交差数判定）"""
+    x, y = point
+    xs = np.asarray([p[0] for p in ring])
+    ys = np.asarray([p[1] for p in ring])
+    xs2, ys2 = np.roll(xs, -1), np.roll(ys, -1)
+    crosses = (ys > y) != (ys2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at = xs + (y - ys) * (xs2 - xs) / (ys2 - ys)
+    return bool(np.count_nonzero(crosses & (x < x_at)) % 2)
+
+class Topology:
+    """隣接する市区町村で境界線（弧）を共有するトポロジー"""
+
+    def __init__(self):
+        self.arcs: List[List[Point]] = []
+        # 団体コード → ポリゴン → リング → 弧の参照（負の値 ~i は逆向き）
+        self.objects: Dict[str, List[List[List[int]]]] = {}
+        self.properties: Dict[str, Dict[str, str]] = {}
+        # 入力の外周リングの向き（符号付き面積の符号）
+        self.exterior_sign = 1.0
+
+    @classmethod
+    def from_polygons(
+        cls,
+        polygons_by_code: Dict[str, List[Polygon]],
+        properties: Optional[Dict[str, Dict[str, str]]] = None
+    ) -> 'Topology':
+        """団体コードごとのポリゴンからトポロジーを構築する関数"""
+        topology = cls()
+        topology.properties = dict(properties or {})
+
+        # 外周リングの向きを多数決で判定
+        signs = [np.sign(ring_signed_area(polygon[0])) for polygons in polygons_by_code.values() for polygon in polygons]
+        topology.exterior_sign = 1.0 if sum(signs) >= 0 else -1.0
+
+        # 隣接点が3種類以上ある点を結節点とする（境界線の分岐・合流点）
+        neighbors: Dict[Point, set] = defaultdict(set)
+        for polygons in polygons_by_code.values():
+            for polygon in polygons:
+                for ring in polygon:
+                    for i, point in enumerate(ring):
+                        neighbors[point].add(ring[i - 1])
+                        neighbors[point].add(ring[(i + 1) % len(ring)])
+        junctions = {point for point, adjacent in neighbors.items() if len(adjacent) > 2}
+        del neighbors
+
+        arc_index: Dict[Tuple[Point, ...], int] = {}
+        for code, polygons in polygons_by_code.items():
+            topology.objects[code] = [
+                [topology._cut_ring(ring, junctions, arc_index) for ring in polygon]
+                for polygon in polygons
+            ]
+            # 複数の地物からなる団体は隣接部分を融合する
+            if len(polygons) > 1:
+                topology.objects[code] = topology._stitch(
+                    [ref for polygon in topology.objects[code] for ring in polygon for ref in ring]
+                )
+        return topology
+
+    def _cut_ring(self, ring: Ring, junctions: set, arc_index: Dict[Tuple[Point, ...], int]) -> List[int]:
+        """リングを結節点で弧に分割し、既存の弧と共有する"""
+        cut_positions = [i for i, point in enumerate(ring) if point in junctions]
+        if cut_positions:
+            start = cut_positions[0]
+        else:
+            # 結節点がない閉じた弧は最小の点から始めて向きに依らず同じ弧にする
+            start = min(range(len(ring)), key=lambda i: ring[i])
+            cut_positions = [start]
+        rotated = ring[start:] + ring[:start]
+        cuts = [(i - start) % len(ring) for i in cut_positions] + [len(ring)]
+        rotated = rotated + [rotated[0]]
+
+        refs = []
+        for begin, end in zip(cuts[:-1], cuts[1:]):
+            refs.append(self._add_arc(tuple(rotated[begin:end + 1]), arc_index))
+        return refs
+
+    def _add_arc(self, points: Tuple[Point, ...], arc_index: Dict[Tuple[Point, ...], int]) -> int:
+        if points in arc_index:
+            return arc_index[points]
+        reversed_points = points[::-1]
+        if reversed_points in arc_index:
+            return ~arc_index[reversed_points]
+        arc_index[points] = len(self.arcs)
+        self.arcs.append(list(points))
+        return arc_index[points]
+
+    def arc_points(self, ref: int) -> List[Point]:
+        """弧の参照から点列を取得する関数"""
+        return self.arcs[ref] if ref >= 0 else self.arcs[~ref][::-1]
+
+    def ring_points(self, refs: Iterable[int]) -> List[Point]:
+        """弧の参照の列からリングの点列（閉じた形）を組み立てる関数"""
+        points: List[Point] = []
+        for ref in refs:
+            arc = self.arc_points(ref)
+            points.extend(arc if not points else arc[1:])
+        return points
+
+    def dissolve(self, groups: Dict[str, Iterable[str]]) -> Dict[str, List[List[List[int]]]]:
+        """複数の団体コードを1つに融合し、内部の境界線を除いたポリゴンを返す関数"""
+        dissolved = {}
+        for target, members in groups.items():
+            refs = [ref for code in members for polygon in self.objects.get(code, []) for ring in polygon for ref in ring]
+            dissolved[target] = self._stitch(refs)
+        return dissolved
+
+    def _stitch(self, refs: List[int]) -> List[List[List[int]]]:
+        """弧の参照から内部境界（逆向きで2回現れる弧）を除き、リングを組み直す"""
+        counts: Dict[int, int] = defaultdict(int)
+        for ref in refs:
+            counts[ref] += 1
+        boundary = [ref for ref in refs if counts.get(~ref, 0) == 0]
+
+        # 始点から出る弧の一覧を作り、終点から次の弧をたどる
+        outgoing: Dict[Point, List[int]] = defaultdict(list)
+        for ref in boundary:
+            outgoing[self.arc_points(ref)[0]].append(ref)
+
+        rings: List[List[int]] = []
+        for ref in boundary:
+            start_point = self.arc_points(ref)[0]
+            if ref not in outgoing[start_point]:
+                continue
+            outgoing[start_point].remove(ref)
+            ring = [ref]
+            end_point = self.arc_points(ref)[-1]
+            while end_point != start_point and outgoing.get(end_point):
+                next_ref = outgoing[end_point].pop()
+                ring.append(next_ref)
+                end_point = self.arc_points(next_ref)[-1]
+            if end_point == start_point:
+                rings.append(ring)
+
+        # 外周と穴を向きで判別し、穴は含まれる外周に割り当てる
+        exteriors, holes = [], []
+        for ring in rings:
+            points = self.ring_points(ring)
+            area = ring_signed_area(points)
+            (exteriors if np.sign(area) == self.exterior_sign else holes).append((ring, points, abs(area)))
+
+        polygons = [[ring] for ring, _, _ in exteriors]
+        for hole, hole_points, _ in holes:
+            containing = [
+                (area, i) for i, (_, points, area) in enumerate(exteriors)
+                if point_in_ring(hole_points[0], points)
+            ]
+            if containing:
+                polygons[min(containing)[1]].append(hole)
+        return polygons
+
+def simplify_arc(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker法で弧を簡略化する関数（端点は必ず残す）"""
+    n = len(points)
+    if n <= 2:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    closed = bool(np.array_equal(points[0], points[-1]))
+
+    if closed:
+        # 閉じた弧は始点から最も遠い点で2分割する
+        far = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+        keep[far] = True
+        stack = [(0, far), (far, n - 1)]
+    else:
+        stack = [(0, n - 1)]
+
+    sections = list(stack)
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = segment_distances(points[start + 1:end], points[start], points[end])
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            keep[start + 1 + i] = True
+            stack.extend([(start, start + 1 + i), (start + 1 + i, end)])
+
+    # 閉じた弧は三角形以上の形を保つ
+    if closed and keep.sum() < 4:
+        for start, end in sections:
+            if end - start >= 2:
+                distances = segment_distances(points[start + 1:end], points[start], points[end])
+                keep[start + 1 + int(np.argmax(distances))] = True
+    return points[keep]
+
+def segment_distances(points: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """点列から線分abへの距離を計算する関数"""
+    ab = b - a
+    length_sq = float(np.dot(ab, ab))
+    if length_sq == 0:
+        return np.sqrt(((points - a) ** 2).sum(axis=1))
+    t = np.clip(((points - a) @ ab) / length_sq, 0.0, 1.0)
+    projection = a + t[:, None] * ab
+    return np.sqrt(((points - projection) ** 2).sum(axis=1))
+
+def quantize_arc(points: np.ndarray, translate: Tuple[float, float], step: float) -> List[List[int]]:
+    """弧を量子化し、差分符号化した整数列に変換する関数"""
+    quantized = np.round((points - np.asarray(translate)) / step).astype(np.int64)
+    # 量子化で重なった連続点を除去（端点は残す）
+    if len(quantized) > 2:
+        moved = np.any(np.diff(quantized, axis=0) != 0, axis=1)
+        mask = np.r_[True, moved[:-1], True]
+        quantized = quantized[mask]
+    deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return deltas.tolist()
+
+def decode_arc(deltas: List[List[int]], translate: Sequence[float], step: float) -> List[Point]:
+    """差分符号化された弧を座標に戻す関数（量子化の刻みに見合った桁数に丸める）"""
+    if not deltas:
+        return []
+    quantized = np.cumsum(np.asarray(deltas, dtype=np.int64), axis=0)
+    coords = quantized * step + np.asarray(translate)
+    decimals = max(0, int(np.ceil(-np.log10(step))) + 1)
+    return [tuple(p) for p in np.round(coords, decimals).tolist()]
+
+def encode_topology(
+    topology: Topology,
+    tolerances: Dict[str, float] = SIMPLIFY_TOLERANCES,
+    objects: Optional[Dict[str, List[List[List[int]]]]] = None
+) -> Dict:
+    """トポロジーを解像度ごとに簡略化・量子化して保存用の辞書にする関数"""
+    all_points = np.concatenate([np.asarray(arc) for arc in topology.arcs]) if topology.arcs else np.zeros((1, 2))
+    translate = (float(all_points[:, 0].min()), float(all_points[:, 1].min()))
+
+    levels = {}
+    for level, tolerance in tolerances.items():
+        step = tolerance * QUANTIZATION_RATIO
+        arcs = [
+            quantize_arc(simplify_arc(np.asarray(arc, dtype=float), tolerance), translate, step)
+            for arc in topology.arcs
+        ]
+        levels[level] = {'tolerance': tolerance, 'step': step, 'arcs': arcs}
+
+    return {
+        'translate': list(translate),
+        'levels': levels,
+        'objects': {
+            code: {**topology.properties.get(code, {}), 'polygons': polygons}
+            for code, polygons in (objects if objects is not None else topology.objects).items()
+        }
+    }
+
+class BoundaryStore:
+    """保存済みの境界データから解像度ごとのGeoJSONを組み立てる"""
+
+    def __init__(self, encoded: Dict):
+        self.translate = encoded['translate']
+        self.levels = encoded['levels']
+        self.objects = encoded['objects']
+        self._decoded_arcs: Dict[str, List[List[Point]]] = {}
+
+    @classmethod
+    def load(cls, path: Path = BOUNDARIES_PATH) -> 'BoundaryStore':
+        """境界データファイルを読み込む関数"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @property
+    def level_names(self) -> List[str]:
+        return list(self.levels.keys())
+
+    def _arcs(self, level: str) -> List[List[Point]]:
+        if level not in self._decoded_arcs:
+            info = self.levels[level]
+            self._decoded_arcs[level] = [decode_arc(arc, self.translate, info['step']) for arc in info['arcs']]
+        return self._decoded_arcs[level]
+
+    def geometry(self, code: str, level: str) -> Optional[Dict]:
+        """団体コードのジオメトリ（MultiPolygon）を返す関数"""
+        obj = self.objects.get(code)
+        if obj is None:
+            return None
+
+        arcs = self._arcs(level)
+        polygons = []
+        for polygon in obj['polygons']:
+            rings = []
+            for refs in polygon:
+                points: List[Point] = []
+                for ref in refs:
+                    arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+                    points.extend(arc if not points else arc[1:])
+                # 簡略化で潰れたリングは描画しない
+                if len(set(points)) >= 3:
+                    rings.append([list(p) for p in points])
+            if rings:
+                polygons.append(rings)
+        if not polygons:
+            return None
+        return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+    def feature_collection(
+        self,
+        codes: Iterable[str],
+        level: str,
+        properties: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
+        """指定した団体コードのGeoJSON FeatureCollectionを返す関数"""
+        features = []
+        for code in codes:
+            geometry = self.geometry(code, level)
+            if geometry is None:
+                continue
+            props = {'code': code, 'name': self.objects[code].get('name')}
+            props.update((properties or {}).get(code, {}))
+            features.append({'type': 'Feature', 'properties': props, 'geometry': geometry})
+        return {'type': 'FeatureCollection', 'features': features}
+
+def level_for_zoom(zoom: int, level_names: Sequence[str]) -> str:
+    """ズームレベルに応じた解像度を選ぶ関数"""
+    if zoom >= 10 and 'high' in level_names:
+        return 'high'
+    if zoom >= 7 and 'medium' in level_names:
+        return 'medium'
+    return 'low' if 'low' in level_names else level_names[0]
@@ -0,0 +1,190 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from app.dashboard.utils.cache import CACHE_DIR, compute_digest, file_digest
+
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+# 各ステップの入力ダイジェストの記録
+BUILD_STATE_PATH = CACHE_DIR / 'build_state.json'
+
+def glob_paths(root_dir: Path, pattern: str) -> Iterator[Path]:
+    """ルートディレクトリからの相対パス（絶対パスも可）のglobのパターンに一致するパスを返す関数"""
+    path = Path(pattern)
+    if path.is_absolute():
+        return Path(path.anchor).glob(str(path.relative_to(path.anchor)))
+    return root_dir.glob(pattern)
+
+class BuildStep:
+    """ビルドの1ステップ（入力・出力のファイルと、依存するステップを宣言する）
+
+    inputs/outputsはルートディレクトリからの相対パス（または絶対パス）で、globのパターンも使える。
+    出力先が環境変数等で決まる場合は、outputsにパターンの一覧を返す関数を渡せば確認のたびに評価する。
+    runはプロセスプールで実行するため、モジュールの最上位で定義した関数を渡す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], None],
+        inputs: Sequence[str] = (),
+        outputs: Union[Sequence[str], Callable[[], Sequence[str]]] = (),
+        depends_on: Sequence[str] = (),
+        params: Optional[Dict] = None
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = outputs if callable(outputs) else list(outputs)
+        self.depends_on = list(depends_on)
+        # URL等、ファイル以外でステップの結果を左右する値
+        self.params = params or {}
+
+    def input_files(self, root_dir: Path = ROOT_DIR) -> List[Path]:
+        files = []
+        for pattern in self.inputs:
+            matches = sorted(glob_paths(root_dir, pattern))
+            if not matches:
+                raise FileNotFoundError(f"{self.name}: 入力ファイルが見つかりません（{pattern}）")
+            files.extend(path for path in matches if path.is_file())
+        return files
+
+    def output_patterns(self) -> List[str]:
+        return list(self.outputs() if callable(self.outputs) else self.outputs)
+
+    def outputs_exist(self, root_dir: Path = ROOT_DIR) -> bool:
+        return all(any(glob_paths(root_dir, pattern)) for pattern in self.output_patterns())
+
+    def input_digest(self, root_dir: Path = ROOT_DIR) -> str:
+        """入力ファイルの内容とパラメータから、ステップのダイジェストを計算する関数"""
+        files = self.input_files(root_dir)
+        names = [str(path.relative_to(root_dir) if path.is_relative_to(root_dir) else path) for path in files]
+        return compute_digest(self.name, names, file_digest(files), self.params)
+
+def sort_steps(steps: Sequence[BuildStep]) -> List[BuildStep]:
+    """依存関係の順に並べる関数（循環や未定義の依存があればエラー）"""
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"{step.name}: 未定義のステップに依存しています（{dependency}）")
+
+    ordered, visiting, done = [], set(), set()
+
+    def visit(step: BuildStep):
+        if step.name in done:
+            return
+        if step.name in visiting:
+            raise ValueError(f"ステップの依存関係が循環しています（{step.name}）")
+        visiting.add(step.name)
+        for dependency in step.depends_on:
+            visit(by_name[dependency])
+        visiting.discard(step.name)
+        done.add(step.name)
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+def select_steps(steps: Sequence[BuildStep], targets: Sequence[str]) -> List[BuildStep]:
+    """指定したステップと、その依存先だけを取り出す関数"""
+    by_name = {step.name: step for step in steps}
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise ValueError(f"未定義のステップです: {name}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].depends_on)
+    return [step for step in sort_steps(steps) if step.name in selected]
+
+def load_build_state(path: Path = BUILD_STATE_PATH) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_build_state(state: Dict[str, str], path: Path = BUILD_STATE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+def run_pipeline(
+    steps: Sequence[BuildStep],
+    force: bool = False,
+    max_workers: Optional[int] = None,
+    root_dir: Path = ROOT_DIR,
+    state_path: Path = BUILD_STATE_PATH
+) -> Dict[str, Dict]:
+    """依存関係に従ってステップを実行する関数
+
+    依存先がすべて完了したステップから並行して実行し、入力のダイジェストが前回と同じで
+    出力も揃っているステップはスキップする。依存先が失敗したステップは実行しない。
+    """
+    ordered = sort_steps(steps)
+    state = {} if force else load_build_state(state_path)
+    results: Dict[str, Dict] = {}
+    running: Dict[Future, BuildStep] = {}
+    started_at: Dict[str, float] = {}
+    digests: Dict[str, str] = {}
+
+    def finish(step: BuildStep, status: str, message: str = '', elapsed: float = 0.0):
+        results[step.name] = {'状態': status, '所要時間(秒)': elapsed, 'メッセージ': message}
+        print(f"[{status}] {step.name}" + (f"（{elapsed:.1f}秒）" if elapsed else '') + (f": {message}" if message else ''))
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        while len(results) < len(ordered):
+            # 依存先が終わったステップを判定・投入する
+            for step in ordered:
+                if step.name in results or step.name in started_at:
+                    continue
+                dependency_states = [results.get(name, {}).get('状態') for name in step.depends_on]
+                if any(status is None for status in dependency_states):
+                    continue
+                if any(status in ('失敗', '中止') for status in dependency_states):
+                    finish(step, '中止', '依存するステップが失敗しました')
+                    continue
+
+                try:
+                    digest = step.input_digest(root_dir)
+                except FileNotFoundError as e:
+                    finish(step, '失敗', str(e))
+                    continue
+
+                if state.get(step.name) == digest and step.outputs_exist(root_dir):
+                    finish(step, 'スキップ', '入力に変更はありません')
+                    continue
+
+                digests[step.name] = digest
+                started_at[step.name] = time.perf_counter()
+                running[executor.submit(step.run)] = step
+
+            if not running:
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                elapsed = time.perf_counter() - started_at[step.name]
+                error = future.exception()
+                if error is not None:
+                    finish(step, '失敗', str(error), elapsed)
+                    state.pop(step.name, None)
+                elif not step.outputs_exist(root_dir):
+                    finish(step, '失敗', '出力ファイルが作成されませんでした', elapsed)
+                    state.pop(step.name, None)
+                else:
+                    finish(step, '実行', '', elapsed)
+                    state[step.name] = digests[step.name]
+                # 途中で中断しても完了分はスキップできるよう、ステップごとに記録する
+                save_build_state(state, state_path)
+
+    return results
@@ -0,0 +1,64 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+# 派生データのキャッシュ保存先
+CACHE_DIR = Path(__file__).parent.parent / 'data' / 'cache'
+
+def compute_digest(*parts: Any) -> str:
+    """任意の値（JSON化可能なもの）からダイジェストを計算する関数"""
+    hasher = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, bytes):
+            hasher.update(part)
+        else:
+            hasher.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+def file_digest(paths: Union[Path, str, Iterable[Union[Path, str]]]) -> str:
+    """ファイル内容からダイジェストを計算する関数（存在しないファイルは名前のみ反映）"""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    hasher = hashlib.sha1()
+    for path in sorted(Path(p) for p in paths):
+        hasher.update(str(path.name).encode('utf-8'))
+        if not path.exists():
+            hasher.update(b'<missing>')
+            continue
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_json_cache(name: str, digest: str, cache_dir: Optional[Path] = None) -> Optional[Any]:
+    """ダイジェストが一致する場合のみキャッシュ済みJSONを返す関数"""
+    cache_path = (cache_dir or CACHE_DIR) / f"{name}.json"
+    if not cache_path.exists():
+        return None
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"キャッシュの読み込みに失敗しました ({cache_path.name}): {str(e)}")
+        return None
+
+    if cached.get('digest') != digest:
+        return None
+    return cached.get('payload')
+
+def save_json_cache(name: str, digest: str, payload: Any, cache_dir: Optional[Path] = None) -> Path:
+    """ダイジェスト付きでJSONキャッシュを保存する関数"""
+    cache_dir = cache_dir or CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / f"{name}.json"
+
+    # 書き込み途中のファイルを読ませないよう一時ファイル経由で置き換える
+    tmp_path = cache_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'digest': digest, 'payload': payload}, f, ensure_ascii=False)
+    tmp_path.replace(cache_path)
+    return cache_path
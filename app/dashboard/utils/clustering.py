@@ -0,0 +1,152 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.cache import compute_digest, load_json_cache, save_json_cache
+from app.dashboard.utils.constants import AGE_ANALYSIS_GROUPS, AGE_GROUPS
+from app.dashboard.utils.similarity import SIMILARITY_COLUMNS
+
+# 年齢構成のベクトルの作り方（年齢区分ごとに合計する5歳階級の列）
+CLUSTER_GROUPINGS: Dict[str, Dict[str, List[str]]] = {
+    '5歳階級': {col: [col] for col in SIMILARITY_COLUMNS},
+    '年齢区分': {'20歳未満': AGE_ANALYSIS_GROUPS['20歳未満'], **AGE_GROUPS},
+}
+DEFAULT_CLUSTER_COUNT = 6
+# 地図の色分けに使う色（クラスタ番号順）
+CLUSTER_COLORS = [
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+    '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#393b79', '#637939'
+]
+MAX_CLUSTER_COUNT = len(CLUSTER_COLORS)
+# 5歳階級の代表年齢（平均年齢の計算用、100歳以上は102.5歳とする）
+BUCKET_MIDPOINTS = np.arange(len(SIMILARITY_COLUMNS)) * 5 + 2.5
+
+def squared_distances(X: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """各行と各中心の二乗距離（行×中心の行列）"""
+    distances = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0.0)
+
+def kmeans_plus_plus(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++で初期の中心を選ぶ関数（既存の中心から遠い点ほど選ばれやすい）"""
+    centers = [X[rng.integers(len(X))]]
+    nearest = squared_distances(X, np.array(centers))[:, 0]
+    for _ in range(1, k):
+        total = nearest.sum()
+        index = rng.choice(len(X), p=nearest / total) if total > 0 else rng.integers(len(X))
+        centers.append(X[index])
+        nearest = np.minimum(nearest, squared_distances(X, X[index][None, :])[:, 0])
+    return np.array(centers)
+
+def mini_batch_kmeans(
+    X: np.ndarray,
+    k: int,
+    batch_size: int = 256,
+    max_iter: int = 100,
+    n_init: int = 3,
+    tol: float = 1e-6,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """ミニバッチk-meansでクラスタに分ける関数
+
+    ミニバッチごとに、割り当てられた点の平均へ各中心を学習率（1/割り当て回数）で近づける。
+    n_init回の初期値のうち、全点の二乗誤差が最小のものを返す。
+    """
+    rng = np.random.default_rng(seed)
+    best: Optional[Tuple[np.ndarray, np.ndarray, float]] = None
+    for _ in range(n_init):
+        centers = kmeans_plus_plus(X, k, rng)
+        counts = np.zeros(k)
+        for _ in range(max_iter):
+            batch = X[rng.choice(len(X), min(batch_size, len(X)), replace=False)]
+            nearest = squared_distances(batch, centers).argmin(axis=1)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, nearest, batch)
+            assigned = np.bincount(nearest, minlength=k).astype(float)
+            counts += assigned
+            moved = assigned > 0
+            shift = (sums[moved] - assigned[moved, None] * centers[moved]) / counts[moved, None]
+            centers[moved] += shift
+            if (shift ** 2).sum() < tol:
+                break
+
+        distances = squared_distances(X, centers)
+        labels = distances.argmin(axis=1)
+        inertia = float(distances[np.arange(len(X)), labels].sum())
+        if best is None or inertia < best[2]:
+            best = (labels, centers, inertia)
+    return best
+
+def profile_matrix(shares: np.ndarray, grouping: str) -> Tuple[np.ndarray, List[str]]:
+    """5歳階級の構成比を、指定した年齢区分の構成比の行列にする関数"""
+    groups = CLUSTER_GROUPINGS[grouping]
+    membership = np.zeros((len(SIMILARITY_COLUMNS), len(groups)))
+    for j, columns in enumerate(groups.values()):
+        for col in columns:
+            membership[SIMILARITY_COLUMNS.index(col), j] = 1.0
+    return shares @ membership, list(groups)
+
+class AgeProfileClusters:
+    """全国の市区町村を年齢構成で分けた結果
+
+    クラスタ番号は平均年齢の低い順に1から振る（同じデータ・同じ条件なら番号は変わらない）。
+    """
+
+    def __init__(self, index, grouping: str, labels: np.ndarray, inertia: float):
+        self.grouping = grouping
+        self.inertia = inertia
+        profiles, groups = profile_matrix(index.shares, grouping)
+        mean_age = index.shares @ BUCKET_MIDPOINTS
+
+        # 平均年齢の低い順に番号を振り直す
+        k = int(labels.max()) + 1 if len(labels) else 0
+        order = np.argsort([mean_age[labels == j].mean() if (labels == j).any() else np.inf for j in range(k)])
+        renumber = np.empty(k, dtype=int)
+        renumber[order] = np.arange(1, k + 1)
+        self.labels = renumber[labels]
+
+        self.table = index.table.assign(クラスタ=self.labels)
+        frame = pd.DataFrame(profiles * 100, columns=groups).assign(クラスタ=self.labels, 平均年齢=mean_age)
+        summary = frame.groupby('クラスタ').mean()
+        summary.insert(0, '件数', frame.groupby('クラスタ').size())
+        self.summary = summary[['件数', '平均年齢', *groups]]
+        self._by_code = pd.Series(self.labels, index=self.table['団体コード'])
+
+    def labels_for(self, codes) -> np.ndarray:
+        """団体コード（正規化済み）のクラスタ番号（対象外は0）"""
+        return self._by_code.reindex(list(codes)).fillna(0).to_numpy(dtype=int)
+
+    def color_of(self, label: int) -> str:
+        return CLUSTER_COLORS[(label - 1) % len(CLUSTER_COLORS)] if label > 0 else '#999999'
+
+# 計算済みのクラスタ（データバージョン・クラスタ数・年齢区分ごと）
+_clusters: Dict[Tuple[str, int, str], AgeProfileClusters] = {}
+_clusters_lock = threading.Lock()
+
+def get_age_profile_clusters(dataset, k: int = DEFAULT_CLUSTER_COUNT, grouping: str = '年齢区分') -> AgeProfileClusters:
+    """年齢構成のクラスタを返す関数
+
+    データバージョン・クラスタ数・年齢区分ごとにメモリ上に保持し、ラベルはJSONキャッシュにも保存する。
+    """
+    key = (dataset.version, k, grouping)
+    with _clusters_lock:
+        if key in _clusters:
+            return _clusters[key]
+
+        index = dataset.similarity
+        digest = compute_digest(dataset.version, k, grouping, CLUSTER_GROUPINGS[grouping], 'mini_batch_kmeans')
+        cache_name = f"clusters_{compute_digest(grouping)[:8]}_k{k}"
+        cached = load_json_cache(cache_name, digest)
+        if cached is not None and len(cached['labels']) == len(index):
+            labels, inertia = np.asarray(cached['labels'], dtype=int), cached['inertia']
+        else:
+            profiles, _ = profile_matrix(index.shares, grouping)
+            labels, _, inertia = mini_batch_kmeans(profiles, min(k, len(index)))
+            try:
+                save_json_cache(cache_name, digest, {'labels': labels.tolist(), 'inertia': inertia})
+            except OSError as e:
+                print(f"クラスタのキャッシュを保存できませんでした: {str(e)}")
+
+        _clusters[key] = AgeProfileClusters(index, grouping, labels, inertia)
+        return _clusters[key]
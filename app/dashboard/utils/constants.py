@@ -32,6 +32,29 @@ GRAPH_COLORS = {
     '70歳以上': '#20B2AA'    # ターコイズ
 }
 
+# 比較グラフをヒートマップ等に切り替える選択数（これを超えると積み上げ棒グラフは読めない）
+LARGE_SELECTION_THRESHOLD = 30
+
+# 年齢構成分析の年齢区分（20歳未満を含む）
+AGE_ANALYSIS_GROUPS = {
+    '20歳未満': ['0歳～4歳', '5歳～9歳', '10歳～14歳', '15歳～19歳'],
+    '30代': ['30歳～34歳', '35歳～39歳'],
+    '40代': ['40歳～44歳', '45歳～49歳'],
+    '50代': ['50歳～54歳', '55歳～59歳'],
+    '60代': ['60歳～64歳', '65歳～69歳'],
+    '70歳以上': ['70歳～74歳', '75歳～79歳', '80歳～84歳', '85歳～89歳', '90歳～94歳', '95歳～99歳', '100歳以上']
+}
+
+# 地図に表示する指標の定義
+VALUE_COLUMNS = {
+    '総人口': ['総数'],
+    '20歳未満': ['0歳～4歳', '5歳～9歳', '10歳～14歳', '15歳～19歳'],
+    '30-60代': ['30歳～34歳', '35歳～39歳', '40歳～44歳', '45歳～49歳', 
+              '50歳～54歳', '55歳～59歳', '60歳～64歳', '65歳～69歳'],
+    '70歳以上': ['70歳～74歳', '75歳～79歳', '80歳～84歳', '85歳～89歳', 
+              '90歳～94歳', '95歳～99歳', '100歳以上']
+}
+
 # データ列定義
 POPULATION_COLUMNS = [
     '総数',
@@ -44,4 +67,37 @@ POPULATION_COLUMNS = [
 ]
 
 # 必要なカラム
-REQUIRED_COLUMNS = ['団体コード', '都道府県名', '市区町村名', '性別'] + POPULATION_COLUMNS
\ No newline at end of file
+REQUIRED_COLUMNS = ['団体コード', '都道府県名', '市区町村名', '性別'] + POPULATION_COLUMNS
+
+# 都道府県コード（団体コードの上2桁）
+PREFECTURE_CODES = {
+    '01': '北海道', '02': '青森県', '03': '岩手県', '04': '宮城県',
+    '05': '秋田県', '06': '山形県', '07': '福島県', '08': '茨城県',
+    '09': '栃木県', '10': '群馬県', '11': '埼玉県', '12': '千葉県',
+    '13': '東京都', '14': '神奈川県', '15': '新潟県', '16': '富山県',
+    '17': '石川県', '18': '福井県', '19': '山梨県', '20': '長野県',
+    '21': '岐阜県', '22': '静岡県', '23': '愛知県', '24': '三重県',
+    '25': '滋賀県', '26': '京都府', '27': '大阪府', '28': '兵庫県',
+    '29': '奈良県', '30': '和歌山県', '31': '鳥取県', '32': '島根県',
+    '33': '岡山県', '34': '広島県', '35': '山口県', '36': '徳島県',
+    '37': '香川県', '38': '愛媛県', '39': '高知県', '40': '福岡県',
+    '41': '佐賀県', '42': '長崎県', '43': '熊本県', '44': '大分県',
+    '45': '宮崎県', '46': '鹿児島県', '47': '沖縄県'
+}
+
+# 政令指定都市のコードリスト（2023年1月時点）
+DESIGNATED_CITIES = {
+    "札幌市": "01100", "仙台市": "04100", "さいたま市": "11100", "千葉市": "12100",
+    "横浜市": "14100", "川崎市": "14130", "相模原市": "14150", "新潟市": "15100",
+    "静岡市": "22100", "浜松市": "22130", "名古屋市": "23100", "京都市": "26100",
+    "大阪市": "27100", "堺市": "27140", "神戸市": "28100", "岡山市": "33100",
+    "広島市": "34100", "北九州市": "40100", "福岡市": "40130", "熊本市": "43100"
+}
+
+# 比較対象の市区町村を他のコンポーネントから差し替えるためのセッションキー
+PENDING_SELECTION_KEY = 'pending_municipality_selection'
+# 比較対象の都道府県を他のコンポーネントから切り替えるためのセッションキー
+PENDING_PREFECTURE_KEY = 'pending_prefecture_selection'
+# 都道府県選択と、都道府県ごとの市区町村選択のセッションキー
+PREFECTURE_KEY = 'prefecture'
+SELECTION_KEY_PREFIX = 'municipalities_'
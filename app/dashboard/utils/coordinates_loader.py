@@ -1,90 +1,156 @@
-import json
+from collections import OrderedDict
 from pathlib import Path
+import threading
 import zipfile
-import xml.etree.ElementTree as ET
 import re
+from typing import Dict, Iterable, List, Optional
 
-def parse_gml_coordinates(gml_content):
-    """GMLファイルから座標データを抽出"""
-    try:
-        # XMLの名前空間を定義
-        namespaces = {
-            'gml': 'http://www.opengis.net/gml/3.2',
-            'ksj': 'http://nlftp.mlit.go.jp/ksj/schemas/ksj-app',
-            'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-        }
-        
-        root = ET.fromstring(gml_content)
-        coordinates = {}
+from app.dashboard.utils.constants import PREFECTURE_CODES
+from app.dashboard.utils.create_coordinates_json import extract_coordinates_from_xml
+
+GEOCODE_DIR = Path(__file__).parent.parent / 'data' / 'geocode'
+# 同時に保持する都道府県数（1セッションで見るのは通常1〜数県）
+DEFAULT_CACHE_SIZE = 8
+
+def find_prefecture_archives(geocode_dir: Path = GEOCODE_DIR) -> Dict[str, Path]:
+    """都道府県名とZIPファイルの対応を返す関数（ファイル名のみ参照し、中身は読まない）"""
+    archives = {}
+    for zip_path in sorted(geocode_dir.glob('P34-14_*_GML.zip')):
+        match = re.search(r'P34-14_(\d{2})_', zip_path.name)
+        prefecture = PREFECTURE_CODES.get(match.group(1)) if match else None
+        if prefecture:
+            archives[prefecture] = zip_path
+    return archives
+
+def load_prefecture_coordinates(zip_path: Path) -> Dict[str, Dict[str, float]]:
+    """1都道府県分のZIPファイルから座標データを読み込む関数（展開せずにZIP内のXMLを直接解析する）"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        # KS-META-P34_14-XX.xmlを除外
+        xml_files = [
+            f for f in zip_ref.namelist()
+            if f.endswith('.xml') and not Path(f).name.startswith('KS-META')
+        ]
+        if not xml_files:
+            return {}
         
-        # 市区町村ごとのデータを抽出
-        for member in root.findall('.//ksj:POS', namespaces):
-            try:
-                # 市区町村名を取得
-                city_name = member.find('.//ksj:cityName', namespaces).text
-                # 座標を取得
-                point = member.find('.//gml:pos', namespaces).text
-                lat, lon = map(float, point.split())
-                coordinates[city_name] = {'lat': lat, 'lng': lon}
-            except Exception as e:
-                print(f"市区町村データの解析エラー: {str(e)}")
-                continue
+        with zip_ref.open(xml_files[0]) as f:
+            return extract_coordinates_from_xml(f, verbose=False)
+
+class PrefectureCoordinateCache:
+    """都道府県ごとの座標データを、初めて参照された時点で読み込むLRUキャッシュ
+    
+    上限を超えた場合は、最も長く参照されていない都道府県を破棄する。
+    読み込みは都道府県ごとのロックで行い、他の都道府県の参照を待たせない。
+    ZIPファイルがない・読み込みに失敗した都道府県も空の辞書としてキャッシュし、参照のたびに読み直さない。
+    """
+    
+    def __init__(self, geocode_dir: Path = GEOCODE_DIR, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.geocode_dir = geocode_dir
+        self.maxsize = maxsize
+        self._archives: Optional[Dict[str, Path]] = None
+        self._entries: 'OrderedDict[str, Dict[str, Dict[str, float]]]' = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def archives(self) -> Dict[str, Path]:
+        with self._lock:
+            if self._archives is None:
+                self._archives = find_prefecture_archives(self.geocode_dir)
+            return self._archives
+    
+    def get(self, prefecture: str) -> Dict[str, Dict[str, float]]:
+        """都道府県の座標データを返す関数（データがない場合は空の辞書）"""
+        with self._lock:
+            if prefecture in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(prefecture)
+                return self._entries[prefecture]
+            self.misses += 1
+            loading = self._loading.setdefault(prefecture, threading.Lock())
         
-        return coordinates
-    except Exception as e:
-        print(f"GML解析エラー: {str(e)}")
-        return {}
+        # 同じ都道府県を同時に参照した場合は、最初の読み込みの完了を待つ
+        with loading:
+            with self._lock:
+                if prefecture in self._entries:
+                    self._entries.move_to_end(prefecture)
+                    return self._entries[prefecture]
+            
+            zip_path = self.archives.get(prefecture)
+            coordinates = {}
+            if zip_path is not None:
+                try:
+                    coordinates = load_prefecture_coordinates(zip_path)
+                except Exception as e:
+                    print(f"ファイル処理エラー ({zip_path.name}): {str(e)}")
+            
+            with self._lock:
+                self._entries[prefecture] = coordinates
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return coordinates
+    
+    def get_many(self, prefectures: Iterable[str]) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """複数の都道府県の座標データを返す関数（都道府県名 → 名称 → 座標、データのない都道府県は除く）"""
+        coordinates = {prefecture: self.get(prefecture) for prefecture in prefectures}
+        return {prefecture: cities for prefecture, cities in coordinates.items() if cities}
+    
+    def stats(self) -> Dict[str, int]:
+        """キャッシュの利用状況を返す関数"""
+        return {
+            'ヒット': self.hits,
+            'ミス': self.misses,
+            '破棄': self.evictions,
+            '保持数': len(self._entries),
+            '上限': self.maxsize
+        }
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._archives = None
+
+# プロセス全体で共有するキャッシュ
+_coordinate_cache = PrefectureCoordinateCache()
+
+def get_prefecture_coordinates(prefecture: str) -> Dict[str, Dict[str, float]]:
+    """都道府県の座標データを必要な時だけ読み込んで返す関数"""
+    return _coordinate_cache.get(prefecture)
+
+def get_name_coordinates(prefectures: Iterable[str]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """名称で引く座標データ（都道府県名 → 名称 → 座標）を、指定した都道府県の分だけ読み込んで返す関数"""
+    return _coordinate_cache.get_many(prefectures)
+
+def prefecture_archive_paths() -> List[Path]:
+    """共有キャッシュが読み込むZIPファイルの一覧（結合表のキャッシュの判定に使う）"""
+    return sorted(_coordinate_cache.archives.values())
+
+def get_coordinate_cache_stats() -> Dict[str, int]:
+    """共有キャッシュのヒット・ミス数を返す関数"""
+    return _coordinate_cache.stats()
 
 def load_city_coordinates():
     """
-    保存された市区町村の座標データを読み込む関数
+    保存された市区町村の座標データを読み込む関数（全都道府県分）
+    
+    1都道府県分だけ必要な場合は get_prefecture_coordinates を使う。
     """
-    geocode_dir = Path(__file__).parent.parent / 'data' / 'geocode'
+    geocode_dir = GEOCODE_DIR
     
     if not geocode_dir.exists():
         print(f"エラー: {geocode_dir} が見つかりません")
         return {}
     
     coordinates = {}
-    prefecture_codes = {
-        '01': '北海道', '02': '青森県', '03': '岩手県', '04': '宮城県',
-        '05': '秋田県', '06': '山形県', '07': '福島県', '08': '茨城県',
-        '09': '栃木県', '10': '群馬県', '11': '埼玉県', '12': '千葉県',
-        '13': '東京都', '14': '神奈川県', '15': '新潟県', '16': '富山県',
-        '17': '石川県', '18': '福井県', '19': '山梨県', '20': '長野県',
-        '21': '岐阜県', '22': '静岡県', '23': '愛知県', '24': '三重県',
-        '25': '滋賀県', '26': '京都府', '27': '大阪府', '28': '兵庫県',
-        '29': '奈良県', '30': '和歌山県', '31': '鳥取県', '32': '島根県',
-        '33': '岡山県', '34': '広島県', '35': '山口県', '36': '徳島県',
-        '37': '香川県', '38': '愛媛県', '39': '高知県', '40': '福岡県',
-        '41': '佐賀県', '42': '長崎県', '43': '熊本県', '44': '大分県',
-        '45': '宮崎県', '46': '鹿児島県', '47': '沖縄県'
-    }
-    
-    # 各ZIPファイルを処理
-    for zip_path in geocode_dir.glob('P34-14_*_GML.zip'):
+    for prefecture, zip_path in find_prefecture_archives(geocode_dir).items():
         try:
-            # ファイル名から都道府県コードを抽出
-            pref_code = re.search(r'P34-14_(\d{2})_', zip_path.name).group(1)
-            prefecture = prefecture_codes.get(pref_code)
-            
-            if not prefecture:
-                continue
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # GMLファイルを探す
-                gml_files = [f for f in zip_ref.namelist() if f.endswith('.gml')]
-                if not gml_files:
-                    continue
-                
-                # 最初のGMLファイルを読み込む
-                with zip_ref.open(gml_files[0]) as f:
-                    gml_content = f.read().decode('utf-8')
-                    prefecture_coords = parse_gml_coordinates(gml_content)
-                    coordinates[prefecture] = prefecture_coords
-        
+            coordinates[prefecture] = load_prefecture_coordinates(zip_path)
         except Exception as e:
             print(f"ファイル処理エラー ({zip_path.name}): {str(e)}")
             continue
     
-    return coordinates 
\ No newline at end of file
+    return coordinates
@@ -6,8 +6,8 @@ import shutil
 import re
 import xml.etree.ElementTree as ET
 
-def extract_coordinates_from_xml(xml_file):
-    """XMLファイルから座標データを抽出"""
+def extract_coordinates_from_xml(xml_file, verbose=True):
+    """XMLファイル（パスまたはファイルオブジェクト）から座標データを抽出（verbose=Falseなら市区町村ごとの表示を省く）"""
     try:
         # XMLファイルを読み込む
         tree = ET.parse(xml_file)
@@ -47,7 +47,8 @@ def extract_coordinates_from_xml(xml_file):
                 
                 if point_id in points:
                     coordinates[city_name] = points[point_id]
-                    print(f"Found coordinates for {city_name}: {points[point_id]}")
+                    if verbose:
+                        print(f"Found coordinates for {city_name}: {points[point_id]}")
             except Exception as e:
                 print(f"市区町村データの解析エラー: {str(e)}")
                 continue
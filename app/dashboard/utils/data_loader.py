@@ -1,9 +1,15 @@
 import pandas as pd
 from pathlib import Path
 from typing import Optional, Dict, Any
+from app.dashboard.utils.validation import DataValidationError, check_population_data
 
-def load_excel_data(file_path: Path) -> pd.DataFrame:
-    """Excelファイルを読み込む関数"""
+def load_excel_data(file_path: Path, validate: bool = True, strict: Optional[bool] = None) -> pd.DataFrame:
+    """Excelファイルを読み込む関数
+
+    validate=Trueの場合は読み込み時にデータを検証し、問題があれば件数を表示する
+    （clean_dataで除く注記・欠損の行は検証しない）。
+    strict（未指定は環境変数ESTAT_STRICT_VALIDATION）がTrueの場合は、問題があればDataValidationErrorを送出する。
+    """
     try:
         # データの読み込み（2行目をヘッダーとして使用）
         df = pd.read_excel(file_path, skiprows=1)
@@ -27,7 +33,12 @@ def load_excel_data(file_path: Path) -> pd.DataFrame:
         # 団体コードの正規化
         df['団体コード'] = df['団体コード'].astype(str).str.replace('-', '').str.zfill(6)
         
+        if validate:
+            check_population_data(clean_data(df), strict)
+        
         return df
+    except DataValidationError:
+        raise
     except Exception as e:
         raise Exception(f"データの読み込みに失敗しました: {str(e)}")
 
@@ -45,14 +56,14 @@ def filter_data(
     df: pd.DataFrame,
     filters: Dict[str, Any]
 ) -> pd.DataFrame:
-    """データのフィルタリングを行う関数"""
-    filtered_df = df.copy()
+    """データのフィルタリングを行う関数（元のデータはコピーせず、条件をまとめて1度だけ抽出する）"""
+    mask = pd.Series(True, index=df.index)
     
     for column, value in filters.items():
         if value is not None:
-            filtered_df = filtered_df[filtered_df[column] == value]
+            mask = mask & (df[column] == value)
     
-    return filtered_df
+    return df[mask]
 
 def get_numerical_columns(df: pd.DataFrame) -> list:
     """数値型のカラムリストを取得する関数"""
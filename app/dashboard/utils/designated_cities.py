@@ -0,0 +1,173 @@
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.boundaries import Polygon, Topology, geometry_to_polygons
+from app.dashboard.utils.cache import compute_digest, file_digest, load_json_cache, save_json_cache
+from app.dashboard.utils.constants import DESIGNATED_CITIES, PREFECTURE_CODES
+from app.dashboard.utils.geo_join import compute_check_digit, normalize_municipality_code
+from app.dashboard.utils.rollup import DESIGNATED_CITY_NAMES, designated_city_of
+from app.dashboard.utils.spatial_index import KM_PER_DEGREE
+
+# 地図で政令指定都市を表示する単位
+CITY_GRANULARITIES = ['区', '市']
+DISSOLVE_CACHE_PREFIX = 'designated_cities'
+
+def ward_groups(codes: Iterable[str]) -> Dict[str, List[str]]:
+    """区の団体コード（6桁）を、所属する政令指定都市のコード（6桁）ごとにまとめる関数"""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for code in sorted(codes):
+        city = designated_city_of(code[:5])
+        if city is not None:
+            groups[city + compute_check_digit(city)].append(code)
+    return dict(groups)
+
+def polygon_moments(polygons: List[Polygon]) -> Tuple[float, float, float]:
+    """ポリゴン（外周＋穴）の面積（度^2）と、面積で重み付けした経度・緯度の合計を返す関数
+
+    リングごとに靴ひも公式で面積と1次モーメントを求め、穴はリングの向きに依らず差し引く。
+    合計を面積で割れば重心になり、複数の区を足し合わせれば市全体の重心になる。
+    """
+    area = moment_x = moment_y = 0.0
+    for polygon in polygons:
+        for i, ring in enumerate(polygon):
+            points = np.asarray(ring, dtype=float)
+            x, y = points[:, 0], points[:, 1]
+            x2, y2 = np.roll(x, -1), np.roll(y, -1)
+            cross = x * y2 - x2 * y
+            signed = cross.sum() / 2
+            if signed == 0:
+                continue
+            # 外周は正、穴は負の面積として足し合わせる
+            factor = (1.0 if i == 0 else -1.0) * np.sign(signed)
+            area += factor * signed
+            moment_x += factor * ((x + x2) * cross).sum() / 6
+            moment_y += factor * ((y + y2) * cross).sum() / 6
+    return area, moment_x, moment_y
+
+def area_km2(area: float, lat: float) -> float:
+    """度^2の面積を、重心の緯度での近似的な面積（km^2）に換算する関数"""
+    return area * KM_PER_DEGREE ** 2 * float(np.cos(np.radians(lat)))
+
+def n03_vintage(path: Union[Path, str]) -> str:
+    """N03のファイル名から版（基準日）を取り出す関数（例: N03-20230101_GML → 20230101）"""
+    name = Path(path).name
+    match = re.search(r'N03-(\d{8})', name) or re.search(r'N03-\d{2}_(\d{6})', name)
+    if match is None:
+        return Path(path).stem
+    vintage = match.group(1)
+    return vintage if len(vintage) == 8 else f"20{vintage}"
+
+def dissolve_designated_cities(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """N03の地物から、政令指定都市の区を市の形状に融合し、市・区の重心を計算する関数
+
+    区のポリゴンだけで境界線を共有するトポロジーを作り、全市を1度の呼び出しで融合する
+    （区どうしの境界線は逆向きで2回現れるため、弧の参照を数えるだけで取り除ける）。
+    重心は面積で重み付けし、市の重心は区の面積・1次モーメントの合計から求める。
+    """
+    polygons_by_code: Dict[str, List[Polygon]] = defaultdict(list)
+    names: Dict[str, str] = {}
+    for feature in features:
+        props = feature.get('properties') or {}
+        code = normalize_municipality_code(props.get('N03_007'))
+        if code is None or designated_city_of(code[:5]) is None:
+            continue
+        polygons_by_code[code].extend(geometry_to_polygons(feature.get('geometry') or {}))
+        names.setdefault(code, f"{props.get('N03_003') or ''}{props.get('N03_004') or ''}")
+
+    groups = ward_groups(polygons_by_code)
+    topology = Topology.from_polygons(polygons_by_code)
+    dissolved = topology.dissolve(groups)
+
+    cities, wards = {}, {}
+    for city, members in groups.items():
+        totals = np.zeros(3)
+        for code in members:
+            moments = np.asarray(polygon_moments(polygons_by_code[code]))
+            totals += moments
+            if moments[0] > 0:
+                lng, lat = moments[1] / moments[0], moments[2] / moments[0]
+                wards[code] = {
+                    'name': names[code], 'prefecture': PREFECTURE_CODES.get(code[:2]), 'city': city,
+                    'lat': lat, 'lng': lng, 'area_km2': area_km2(moments[0], lat)
+                }
+        if totals[0] <= 0:
+            continue
+        lng, lat = totals[1] / totals[0], totals[2] / totals[0]
+        cities[city] = {
+            'name': DESIGNATED_CITY_NAMES[city[:5]], 'prefecture': PREFECTURE_CODES.get(city[:2]), 'wards': members,
+            'lat': lat, 'lng': lng, 'area_km2': area_km2(totals[0], lat),
+            'geometry': {
+                'type': 'MultiPolygon',
+                'coordinates': [
+                    [[list(point) for point in topology.ring_points(ring)] for ring in polygon]
+                    for polygon in dissolved[city]
+                ]
+            }
+        }
+    return {'cities': cities, 'wards': wards}
+
+def load_designated_cities(
+    geojson_path: Union[Path, str],
+    features: Optional[List[Dict[str, Any]]] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """政令指定都市の融合結果を返す関数（N03の版ごとにキャッシュし、ファイルが変わらない限り再利用）"""
+    vintage = n03_vintage(geojson_path)
+    digest = compute_digest(file_digest(geojson_path), DESIGNATED_CITIES)
+    cache_name = f"{DISSOLVE_CACHE_PREFIX}_{vintage}"
+    if use_cache:
+        cached = load_json_cache(cache_name, digest)
+        if cached is not None:
+            return cached
+
+    if features is None:
+        with open(geojson_path, 'r', encoding='utf-8') as f:
+            features = json.load(f).get('features', [])
+    result = {'vintage': vintage, **dissolve_designated_cities(features)}
+    if use_cache:
+        try:
+            save_json_cache(cache_name, digest, result)
+        except OSError as e:
+            print(f"政令指定都市のキャッシュを保存できませんでした: {str(e)}")
+    return result
+
+def city_granularity_mask(
+    rows: pd.DataFrame,
+    granularity: str,
+    available: Optional[Iterable[str]] = None
+) -> np.ndarray:
+    """結合表の行のうち、政令指定都市を指定した単位（市・区）で表示する行のマスク
+
+    「市」の場合は市の行を残して区の行を除く（表示できない市の区は残す）。
+    「区」の場合は区の行を残して市の行を除く。
+    表示できる市は、availableを渡せばその団体コード（6桁）、渡さなければ座標のある市の行とする。
+    """
+    codes = rows['団体コード'].astype(str)
+    is_city = codes.str[:5].isin(DESIGNATED_CITY_NAMES.keys()).to_numpy()
+    if granularity == '区':
+        return ~is_city
+    if available is None:
+        available = codes[is_city & rows['lat'].notna().to_numpy()]
+    located = {code[:5] for code in available}
+    cities = codes.str[:5].map(lambda code: designated_city_of(code) or '')
+    return ~cities.isin(located).to_numpy()
+
+def to_city_granularity(codes: Iterable[str], granularity: str, ward_codes: Dict[str, List[str]]) -> List[str]:
+    """団体コード（6桁）の一覧を、政令指定都市の表示単位にそろえる関数（市は区に展開、区は市にまとめる）"""
+    result: List[str] = []
+    for code in codes:
+        if granularity == '区' and code in ward_codes:
+            converted = ward_codes[code]
+        elif granularity == '市' and designated_city_of(code[:5]):
+            city = designated_city_of(code[:5])
+            converted = [city + compute_check_digit(city)]
+        else:
+            converted = [code]
+        result.extend(c for c in converted if c not in result)
+    return result
@@ -0,0 +1,362 @@
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from app.dashboard.utils.cache import CACHE_DIR, compute_digest
+from app.dashboard.utils.constants import POPULATION_COLUMNS, PREFECTURE_CODES
+from app.dashboard.utils.geo_join import compute_check_digit
+from app.dashboard.utils.validation import check_population_data
+
+# e-Stat API（統計データ取得はgetStatsData）
+ESTAT_API_BASE = os.environ.get('ESTAT_API_BASE', 'https://api.e-stat.go.jp/rest/3.0/app/json')
+ESTAT_APP_ID = os.environ.get('ESTAT_APP_ID', '')
+# 1回のリクエストで取得する件数（APIの上限は100,000件）
+PAGE_SIZE = 100000
+# 同時に送るリクエスト数と、1秒あたりのリクエスト数の上限
+MAX_CONCURRENCY = 4
+REQUESTS_PER_SECOND = float(os.environ.get('ESTAT_RATE_LIMIT', '2'))
+# 再試行するHTTPステータスと回数・待ち時間（秒、回数ごとに倍にする）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1.0
+# 応答のキャッシュ保存先と、確認せずに使う期間（秒、過ぎたら条件付きリクエストで確認する）
+HTTP_CACHE_DIR = CACHE_DIR / 'estat'
+CACHE_MAX_AGE = float(os.environ.get('ESTAT_CACHE_MAX_AGE', str(24 * 60 * 60)))
+# 結果のステータス（0: 正常、1: 該当データなし、2: 一部のみ正常）以外はエラー
+SUCCESS_STATUSES = {0, 1, 2}
+
+SEX_LABELS = {'総数': '計', '計': '計', '男': '男', '女': '女', '男性': '男', '女性': '女'}
+SEX_ORDER = ['計', '男', '女']
+AGE_TOTAL_LABELS = {'総数', '計', '総計', '年齢計'}
+
+class EstatApiError(Exception):
+    """e-Stat APIの呼び出しに失敗した場合のエラー"""
+
+def request_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """リクエストを識別するキー（アプリケーションIDは含めない）"""
+    return compute_digest(endpoint, sorted((k, str(v)) for k, v in params.items() if k != 'appId'))
+
+def save_recording(record_dir: Path, endpoint: str, params: Dict[str, Any], body: str) -> Path:
+    """応答を記録する関数（スタブサーバーで再生できる形式）"""
+    record_dir.mkdir(parents=True, exist_ok=True)
+    path = record_dir / f"{request_key(endpoint, params)}.json"
+    public = {k: str(v) for k, v in params.items() if k != 'appId'}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'endpoint': endpoint, 'params': public, 'body': body}, f, ensure_ascii=False)
+    return path
+
+def as_list(value: Any) -> List[Any]:
+    """1件の場合に配列ではなくオブジェクトで返る項目を、配列にそろえる関数"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+class RateLimiter:
+    """リクエストの開始間隔をそろえ、1秒あたりの件数を上限以下にする（スレッド間で共有）"""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def defer(self, seconds: float) -> None:
+        """サーバーから待つよう指示された場合に、以降のリクエストを遅らせる関数"""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+class HttpCache:
+    """APIの応答を検証子（ETag・Last-Modified）と一緒に保存するディスクキャッシュ"""
+
+    def __init__(self, cache_dir: Path = HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"キャッシュの読み込みに失敗しました ({path.name}): {str(e)}")
+            return None
+
+    def save(self, key: str, entry: Dict[str, Any]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # 書き込み途中のファイルを読ませないよう一時ファイル経由で置き換える
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+class EstatClient:
+    """e-Stat APIのクライアント
+
+    大きな表は1ページ目で総件数を確認し、残りのページをstartPositionを指定して並行して取得する。
+    応答はディスクにキャッシュし、期限切れの応答はIf-None-Match/If-Modified-Sinceで確認してから使う。
+    """
+
+    def __init__(
+        self,
+        app_id: str = ESTAT_APP_ID,
+        base_url: str = ESTAT_API_BASE,
+        page_size: int = PAGE_SIZE,
+        concurrency: int = MAX_CONCURRENCY,
+        rate: float = REQUESTS_PER_SECOND,
+        cache: Optional[HttpCache] = None,
+        max_age: float = CACHE_MAX_AGE,
+        record_dir: Optional[Path] = None,
+        timeout: float = 60.0
+    ):
+        self.app_id = app_id
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.cache = cache or HttpCache()
+        self.max_age = max_age
+        self.record_dir = record_dir
+        self.timeout = timeout
+        self.counts = {'リクエスト': 0, 'キャッシュ': 0, '再検証': 0, '再試行': 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def fetch(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """APIを呼び出して応答のJSONを返す関数（キャッシュ・再検証・再試行を含む）"""
+        key = request_key(endpoint, params)
+        cached = self.cache.load(key)
+        if cached is not None and time.time() - cached['fetched_at'] < self.max_age:
+            self._count('キャッシュ')
+            return json.loads(cached['body'])
+
+        url = f"{self.base_url}/{endpoint}?{urlencode({**params, 'appId': self.app_id})}"
+        headers = {'Accept-Encoding': 'gzip'}
+        if cached is not None and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached is not None and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        for attempt in range(MAX_RETRIES + 1):
+            self.limiter.acquire()
+            self._count('リクエスト')
+            try:
+                with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
+                    raw = response.read()
+                    if response.headers.get('Content-Encoding') == 'gzip':
+                        raw = gzip.decompress(raw)
+                    body = raw.decode('utf-8')
+                    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            except HTTPError as e:
+                if e.code == 304 and cached is not None:
+                    # 変更がなければ保存済みの応答を使い、確認した時刻だけ更新する
+                    self._count('再検証')
+                    self.cache.save(key, {**cached, 'fetched_at': time.time()})
+                    return json.loads(cached['body'])
+                if e.code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    retry_after = e.headers.get('Retry-After', '')
+                    self._count('再試行')
+                    self.limiter.defer(float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt)
+                    continue
+                raise EstatApiError(f"{endpoint}の呼び出しに失敗しました: HTTP {e.code}")
+            except (URLError, TimeoutError) as e:
+                # 応答の読み込み中のタイムアウトはURLErrorにならないため、接続の失敗と同様に扱う
+                reason = e.reason if isinstance(e, URLError) else e
+                if attempt < MAX_RETRIES:
+                    self._count('再試行')
+                    self.limiter.defer(RETRY_BACKOFF * 2 ** attempt)
+                    continue
+                if cached is not None:
+                    print(f"e-Stat APIに接続できないため、保存済みの応答を使います: {str(reason)}")
+                    return json.loads(cached['body'])
+                raise EstatApiError(f"{endpoint}の呼び出しに失敗しました: {str(reason)}")
+
+            payload = json.loads(body)
+            result = next(iter(payload.values()), {}).get('RESULT', {})
+            status = int(result.get('STATUS', 0))
+            if status not in SUCCESS_STATUSES:
+                raise EstatApiError(f"{endpoint}の呼び出しに失敗しました（{status}）: {result.get('ERROR_MSG', '')}")
+
+            self.cache.save(key, {'body': body, 'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()})
+            if self.record_dir is not None:
+                save_recording(self.record_dir, endpoint, params, body)
+            return payload
+        raise EstatApiError(f"{endpoint}の呼び出しに失敗しました")
+
+    def get_stats_data(self, stats_data_id: str, **params: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """統計表の全件を取得する関数（分類の定義と、値の一覧を返す）"""
+        base = {'statsDataId': stats_data_id, 'limit': self.page_size, **params}
+        first = self.fetch('getStatsData', {**base, 'startPosition': 1})
+        data = first['GET_STATS_DATA'].get('STATISTICAL_DATA', {})
+        class_objs = as_list(data.get('CLASS_INF', {}).get('CLASS_OBJ'))
+        values = as_list(data.get('DATA_INF', {}).get('VALUE'))
+        total = int(data.get('RESULT_INF', {}).get('TOTAL_NUMBER', 0))
+
+        # 2ページ目以降は分類の定義（メタ情報）を省いて並行して取得する
+        def fetch_page(start: int) -> List[Dict[str, Any]]:
+            page = self.fetch('getStatsData', {**base, 'startPosition': start, 'metaGetFlg': 'N'})
+            return as_list(page['GET_STATS_DATA'].get('STATISTICAL_DATA', {}).get('DATA_INF', {}).get('VALUE'))
+
+        starts = range(1 + self.page_size, total + 1, self.page_size)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='estat') as executor:
+            for page in executor.map(fetch_page, starts):
+                values.extend(page)
+        return class_objs, values
+
+def normalize_age_label(name: str) -> Optional[str]:
+    """年齢の分類名を人口データの列名（例: 0歳～4歳、100歳以上、総数）にそろえる関数"""
+    name = unicodedata.normalize('NFKC', name).replace(' ', '')
+    if name in AGE_TOTAL_LABELS:
+        return '総数'
+    match = re.fullmatch(r'(\d+)歳?[~〜\-](\d+)歳', name)
+    if match:
+        return f"{match.group(1)}歳～{match.group(2)}歳"
+    match = re.fullmatch(r'(\d+)歳以上', name)
+    if match:
+        return f"{match.group(1)}歳以上"
+    return None
+
+def find_class(class_objs: List[Dict[str, Any]], keywords: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """名前にキーワードを含む分類を返す関数"""
+    return next((obj for obj in class_objs if any(keyword in obj.get('@name', '') for keyword in keywords)), None)
+
+def normalize_stats_data(
+    class_objs: List[Dict[str, Any]],
+    values: List[Dict[str, Any]],
+    time_code: Optional[str] = None
+) -> pd.DataFrame:
+    """getStatsDataの結果を、load_excel_dataと同じ列の人口データにする関数
+
+    地域（area）・男女・年齢の分類を使い、時間軸が複数ある場合は最新（またはtime_code）の値のみ使う。
+    団体コードは5桁の地域コードに検査数字を付けた6桁、都道府県の行の市区町村名は都道府県名とする。
+    """
+    area = next((obj for obj in class_objs if obj.get('@id') == 'area'), None)
+    sex = find_class(class_objs, ('男女', '性別'))
+    age = find_class(class_objs, ('年齢',))
+    if area is None or sex is None or age is None:
+        raise EstatApiError("地域・男女・年齢の分類が見つかりません")
+
+    frame = pd.DataFrame(values)
+    if frame.empty:
+        return pd.DataFrame(columns=['団体コード', '都道府県名', '市区町村名', '性別', *POPULATION_COLUMNS])
+    if '@time' in frame.columns:
+        frame = frame[frame['@time'] == (time_code or frame['@time'].max())]
+
+    sex_labels = {c['@code']: SEX_LABELS.get(unicodedata.normalize('NFKC', c['@name']).strip()) for c in as_list(sex['CLASS'])}
+    age_labels = {c['@code']: normalize_age_label(c['@name']) for c in as_list(age['CLASS'])}
+    long = pd.DataFrame({
+        'area': frame[f"@{area['@id']}"].to_numpy(),
+        'sex': frame[f"@{sex['@id']}"].map(sex_labels).to_numpy(),
+        'age': frame[f"@{age['@id']}"].map(age_labels).to_numpy(),
+        # 秘匿・該当なし（'-'、'***'等）は欠損値にする
+        'value': pd.to_numeric(frame['$'], errors='coerce').to_numpy()
+    }).dropna(subset=['sex', 'age'])
+    long = long[long['age'].isin(POPULATION_COLUMNS)].drop_duplicates(['area', 'sex', 'age'])
+
+    wide = long.set_index(['area', 'sex', 'age'])['value'].unstack('age').reindex(columns=POPULATION_COLUMNS)
+    if long['age'].ne('総数').all():
+        wide['総数'] = wide[POPULATION_COLUMNS[1:]].sum(axis=1, min_count=1)
+    wide = wide.reset_index()
+
+    codes = wide['area'].astype(str)
+    wide = wide[codes.str.fullmatch(r'\d{5}') & codes.str[:2].isin(PREFECTURE_CODES.keys())]
+    codes = wide['area'].astype(str)
+    prefectures = codes.str[:2].map(PREFECTURE_CODES)
+    area_names = {c['@code']: unicodedata.normalize('NFKC', c['@name']) for c in as_list(area['CLASS'])}
+    names = [
+        prefecture if code[2:] == '000'
+        else re.sub(r'\s+', '', area_names.get(code, '').removeprefix(prefecture)) or area_names.get(code, '')
+        for code, prefecture in zip(codes, prefectures)
+    ]
+
+    df = pd.DataFrame({
+        '団体コード': [code + compute_check_digit(code) for code in codes],
+        '都道府県名': prefectures.to_numpy(),
+        '市区町村名': names,
+        '性別': wide['sex'].to_numpy(),
+        **{col: wide[col].to_numpy() for col in POPULATION_COLUMNS}
+    })
+    df['性別順'] = df['性別'].map(SEX_ORDER.index)
+    df = df.sort_values(['団体コード', '性別順'], kind='stable').drop(columns='性別順').reset_index(drop=True)
+    # 欠損値のない列はExcelから読み込んだ場合と同じく整数にする
+    for col in POPULATION_COLUMNS:
+        if df[col].notna().all():
+            df[col] = df[col].astype('int64')
+    return df
+
+def load_estat_data(
+    stats_data_id: str,
+    client: Optional[EstatClient] = None,
+    validate: bool = True,
+    strict: Optional[bool] = None,
+    time_code: Optional[str] = None,
+    **params: Any
+) -> pd.DataFrame:
+    """e-Stat APIから統計表を取得し、load_excel_dataと同じ形式の人口データにする関数"""
+    client = client or EstatClient()
+    class_objs, values = client.get_stats_data(stats_data_id, **params)
+    df = normalize_stats_data(class_objs, values, time_code)
+    if validate:
+        check_population_data(df, strict)
+    return df
+
+def main():
+    """e-Stat APIから統計表を取得し、件数と取得状況を表示する
+
+    使い方: python -m app.dashboard.utils.estat_client [統計表ID] [--record=記録先] [--output=出力先.parquet]
+    アプリケーションIDは環境変数ESTAT_APP_IDで指定する。
+    """
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    if not args:
+        print("エラー: 統計表IDを指定してください")
+        sys.exit(1)
+    if not ESTAT_APP_ID and ESTAT_API_BASE.startswith('https://api.e-stat.go.jp'):
+        print("エラー: 環境変数ESTAT_APP_IDにアプリケーションIDを設定してください")
+        sys.exit(1)
+
+    client = EstatClient(record_dir=Path(options['record']) if 'record' in options else None)
+    started = time.perf_counter()
+    try:
+        df = load_estat_data(args[0], client)
+    except EstatApiError as e:
+        print(f"エラー: {str(e)}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    print(f"統計表 {args[0]} を取得しました（{elapsed:.1f}秒、{len(df):,}行）")
+    for name, count in client.counts.items():
+        print(f"- {name}: {count:,}件")
+    if 'output' in options:
+        df.to_parquet(options['output'], index=False)
+        print(f"保存しました: {options['output']}")
+
+if __name__ == '__main__':
+    main()
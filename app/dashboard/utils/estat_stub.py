@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from app.dashboard.utils.estat_client import request_key
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8767
+# クライアントに指定するベースURLのパス（e-Stat APIと同じ）
+API_PATH = '/rest/3.0/app/json'
+
+class RecordedResponses:
+    """記録した応答（save_recordingの形式）をリクエストのキーごとに保持する"""
+
+    def __init__(self, record_dir: Optional[Path] = None):
+        self.bodies: Dict[str, bytes] = {}
+        if record_dir is not None:
+            for path in sorted(Path(record_dir).glob('*.json')):
+                with open(path, 'r', encoding='utf-8') as f:
+                    recording = json.load(f)
+                self.add(recording['endpoint'], recording['params'], recording['body'])
+
+    def add(self, endpoint: str, params: Dict[str, str], body: str) -> None:
+        self.bodies[request_key(endpoint, params)] = body.encode('utf-8')
+
+    def get(self, endpoint: str, params: Dict[str, str]) -> Optional[bytes]:
+        return self.bodies.get(request_key(endpoint, params))
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """記録した応答を返すハンドラ（ETagによる304、1秒あたりの件数を超えた場合の429に対応）"""
+
+    def __init__(self, *args, server_state: 'StubState', **kwargs):
+        self.state = server_state
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        endpoint = parts.path.rsplit('/', 1)[-1]
+        params = dict(parse_qsl(parts.query))
+
+        if not self.state.admit():
+            self._send(429, b'', {'Retry-After': '1'})
+            return
+
+        body = self.state.responses.get(endpoint, params)
+        if body is None:
+            # e-Stat APIと同様に、エラーは結果のステータスで返す
+            payload = {'GET_STATS_DATA': {'RESULT': {'STATUS': 100, 'ERROR_MSG': '記録された応答がありません。'}}}
+            self._send(200, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+            return
+
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', {'ETag': etag})
+            return
+        self._send(200, body, {'ETag': etag})
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.state.record(status)
+        if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 再生のたびにログを出さない
+        pass
+
+class StubState:
+    """スタブサーバーの応答と、直近1秒のリクエスト数・ステータスごとの件数"""
+
+    def __init__(self, responses: RecordedResponses, rate_limit: Optional[int] = None):
+        self.responses = responses
+        self.rate_limit = rate_limit
+        self.statuses: Counter = Counter()
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return False
+            self._recent.append(now)
+            return True
+
+    def record(self, status: int) -> None:
+        with self._lock:
+            self.statuses[status] += 1
+
+def create_stub_server(
+    responses: RecordedResponses,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    rate_limit: Optional[int] = None
+) -> ThreadingHTTPServer:
+    """記録した応答を返すスタブサーバーを作成する関数（port=0なら空いているポートを使う）"""
+    state = StubState(responses, rate_limit)
+    server = ThreadingHTTPServer((host, port), partial(StubRequestHandler, server_state=state))
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+def start_stub_server(
+    responses: RecordedResponses,
+    host: str = DEFAULT_HOST,
+    port: int = 0,
+    rate_limit: Optional[int] = None
+) -> ThreadingHTTPServer:
+    """スタブサーバーをバックグラウンドのスレッドで起動する関数"""
+    server = create_stub_server(responses, host, port, rate_limit)
+    thread = threading.Thread(target=server.serve_forever, name='estat-stub', daemon=True)
+    thread.start()
+    return server
+
+def stub_base_url(server: ThreadingHTTPServer) -> str:
+    """EstatClientのbase_urlに指定するURL"""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{API_PATH}"
+
+def main():
+    """記録した応答を返すe-Stat APIのスタブサーバーを起動する
+
+    使い方: python -m app.dashboard.utils.estat_stub [記録先] [--rate-limit=N]
+    クライアントは ESTAT_API_BASE=http://127.0.0.1:8767/rest/3.0/app/json を指定して接続する。
+    """
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    rate_limit = next((int(arg.split('=', 1)[1]) for arg in sys.argv[1:] if arg.startswith('--rate-limit=')), None)
+    record_dir = Path(args[0]) if args else Path('app/dashboard/data/estat_recordings')
+    if not record_dir.exists():
+        print(f"エラー: {record_dir} が見つかりません")
+        sys.exit(1)
+
+    responses = RecordedResponses(record_dir)
+    server = create_stub_server(responses, rate_limit=rate_limit)
+    print(f"スタブサーバーを起動しました: {stub_base_url(server)}（{len(responses):,}件の応答）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("スタブサーバーを停止しました")
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
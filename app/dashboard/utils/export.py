@@ -0,0 +1,144 @@
+import io
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.geo_join import normalize_municipality_code
+
+# 1度に変換する行数（出力中に保持するのはこの行数分だけ）
+EXPORT_CHUNK_ROWS = 2000
+# 画面・APIで指定する文字コード名と、実際に使うコーデック
+CSV_ENCODINGS = {
+    'UTF-8': 'utf-8',
+    'Shift_JIS': 'cp932',
+}
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+EXPORT_SCOPES = ['選択中の市区町村', '都道府県', '全国']
+
+def select_positions(
+    frame: pd.DataFrame,
+    prefecture: Optional[str] = None,
+    codes: Optional[List[str]] = None,
+    sex: Optional[str] = None
+) -> np.ndarray:
+    """出力する行の位置を返す関数（行そのものはコピーしない）"""
+    mask = np.ones(len(frame), dtype=bool)
+    if prefecture:
+        mask &= (frame['都道府県名'] == prefecture).to_numpy()
+    if codes:
+        normalized = {normalize_municipality_code(code) for code in codes}
+        mask &= frame['団体コード'].map(normalize_municipality_code).isin(normalized).to_numpy()
+    if sex:
+        mask &= (frame['性別'] == sex).to_numpy()
+    return np.flatnonzero(mask)
+
+def unencodable_values(frame: pd.DataFrame, positions: np.ndarray, encoding: str = 'UTF-8') -> List[str]:
+    """出力する行のうち、指定した文字コードで表せない文字を含む値（文字列の列）を返す関数"""
+    codec = CSV_ENCODINGS[encoding]
+    if codec == 'utf-8':
+        return []
+    found = []
+    for col in frame.columns:
+        if frame[col].dtype.kind in 'iufb':
+            continue
+        for value in pd.unique(frame[col].iloc[positions].dropna().astype(str)):
+            try:
+                value.encode(codec)
+            except UnicodeEncodeError:
+                found.append(value)
+    return found
+
+def iter_export_chunks(
+    frame: pd.DataFrame,
+    positions: np.ndarray,
+    aggregates: Optional[pd.DataFrame] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """出力する行を一定の行数ずつ取り出す関数（集計表があれば同じ行の集計値を右に並べる）"""
+    for start in range(0, len(positions), chunk_rows):
+        block = positions[start:start + chunk_rows]
+        chunk = frame.iloc[block].reset_index(drop=True)
+        if aggregates is not None:
+            extra = aggregates.iloc[block].reset_index(drop=True)
+            chunk = pd.concat([chunk, extra.drop(columns=chunk.columns.intersection(extra.columns))], axis=1)
+        yield chunk
+
+def iter_csv(chunks: Iterable[pd.DataFrame], encoding: str = 'UTF-8') -> Iterator[bytes]:
+    """データを少しずつCSVに変換する関数
+
+    UTF-8はExcelで文字化けしないようにBOMを付ける。Shift_JISで表せない文字があればUnicodeEncodeErrorになるため、
+    事前にunencodable_valuesで確認する（市区町村名を「?」に置き換えて出力しない）。
+    """
+    codec = CSV_ENCODINGS[encoding]
+    first = True
+    for chunk in chunks:
+        text = chunk.to_csv(index=False, header=first, lineterminator='\r\n')
+        if first and codec == 'utf-8':
+            yield '\ufeff'.encode('utf-8')
+        yield text.encode(codec)
+        first = False
+
+class _ChunkSink(io.RawIOBase):
+    """書き込まれたバイト列を溜めておき、取り出したら捨てる出力先"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def iter_parquet(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """データを少しずつParquetに変換する関数（1チャンクを1つの行グループとして書き出す）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+def iter_export(
+    chunks: Iterable[pd.DataFrame],
+    export_format: str = 'csv',
+    encoding: str = 'UTF-8'
+) -> Iterator[bytes]:
+    """指定した形式でデータを少しずつ出力する関数"""
+    if export_format == 'csv':
+        return iter_csv(chunks, encoding)
+    if export_format == 'parquet':
+        return iter_parquet(chunks)
+    raise ValueError(f"対応していない形式です: {export_format}")
+
+def export_file_name(label: str, export_format: str, encoding: str = 'UTF-8') -> str:
+    """出力するファイルの名前"""
+    suffix = '_sjis' if export_format == 'csv' and encoding == 'Shift_JIS' else ''
+    return f"人口_{label}{suffix}.{export_format}"
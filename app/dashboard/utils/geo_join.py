@@ -0,0 +1,209 @@
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.cache import compute_digest, file_digest, load_json_cache, save_json_cache
+from app.dashboard.utils.constants import PREFECTURE_CODES
+from app.dashboard.utils.coordinates_loader import get_name_coordinates, prefecture_archive_paths
+from app.dashboard.utils.name_matcher import load_name_crosswalk
+from app.dashboard.utils.shared_dataset import DATASET_VERSION_ATTR
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+ROOT_DIR = DATA_DIR.parent.parent.parent
+
+# 座標データの入力元（先に書いたものほど優先）
+CODE_COORDINATE_SOURCES = {
+    'codes': DATA_DIR / 'city_coordinates_with_codes.json',  # 団体コード付き座標
+    'n03': ROOT_DIR / 'city_coordinates.json',               # N03の重心（5桁コード）
+}
+JOIN_CACHE_NAME = 'geo_join'
+JOIN_COLUMNS = ['団体コード', '都道府県名', '市区町村名', 'lat', 'lng', '座標ソース', '行番号']
+# 結合に使う統計データの列
+JOIN_KEY_COLUMNS = ['団体コード', '都道府県名', '市区町村名', '性別']
+
+# 団体コードの検査数字の重み（上5桁）
+CHECK_DIGIT_WEIGHTS = (6, 5, 4, 3, 2)
+
+def compute_check_digit(code5: str) -> str:
+    """5桁の団体コードから検査数字を計算する関数"""
+    total = sum(int(digit) * weight for digit, weight in zip(code5, CHECK_DIGIT_WEIGHTS))
+    return str((11 - total % 11) % 10)
+
+def is_valid_municipality_code(code: str) -> bool:
+    """6桁の団体コードの検査数字が正しいかを判定する関数"""
+    return bool(re.fullmatch(r'\d{6}', code or '')) and compute_check_digit(code[:5]) == code[5]
+
+def normalize_municipality_code(code: Any) -> Optional[str]:
+    """団体コードを検査数字付きの6桁に正規化する関数（正規化できない場合はNone）"""
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return None
+    if isinstance(code, float) and code.is_integer():
+        code = int(code)
+
+    digits = re.sub(r'\D', '', str(code))
+    if not digits or len(digits) > 6:
+        return None
+
+    # 6桁で検査数字が一致すればそのまま採用（数値として読まれ先頭の0が落ちたものも含む）
+    candidate = digits.zfill(6)
+    if (len(digits) == 6 or isinstance(code, (int, np.integer))) and is_valid_municipality_code(candidate):
+        return candidate
+
+    # 検査数字なしの5桁コード（ゼロ埋めで6桁になったものを含む）
+    if len(digits) == 6:
+        if not digits.startswith('0'):
+            return None
+        digits = digits[1:]
+    base = digits.zfill(5)
+    return base + compute_check_digit(base)
+
+def load_code_coordinates(sources: Optional[Dict[str, Path]] = None) -> pd.DataFrame:
+    """団体コード付きの座標データを読み込み、正規化したコードで1つの表にまとめる関数"""
+    records = []
+    for source, path in (sources or CODE_COORDINATE_SOURCES).items():
+        if not path.exists():
+            print(f"座標データが見つかりません（{source}）: {path}")
+            continue
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        for raw_code, item in data.items():
+            code = normalize_municipality_code(raw_code)
+            if code is None:
+                continue
+            records.append({
+                '団体コード': code,
+                '都道府県名': item.get('prefecture') or PREFECTURE_CODES.get(code[:2]),
+                '地理名称': item.get('city') or item.get('name'),
+                'lat': item.get('lat'),
+                'lng': item.get('lng'),
+                '座標ソース': source
+            })
+
+    coords = pd.DataFrame(records, columns=['団体コード', '都道府県名', '地理名称', 'lat', 'lng', '座標ソース'])
+    # 優先度の高い入力元を残す
+    return coords.drop_duplicates(subset='団体コード', keep='first').reset_index(drop=True)
+
+NameCoordinateLoader = Callable[[Iterable[str]], Dict[str, Dict[str, Dict[str, float]]]]
+
+def build_geo_join_table(
+    df: pd.DataFrame,
+    code_coordinates: pd.DataFrame,
+    name_coordinates: Optional[NameCoordinateLoader] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """統計データの行位置と座標を結合した表と、未照合のレポートを作成する関数
+
+    name_coordinatesは都道府県名の一覧を受け取り、名称で引く座標データ（都道府県名 → 名称 → 座標）を返す関数で、
+    団体コードで座標が見つからない行のある都道府県の分だけ呼び出す。
+    """
+    # 座標を付与する統計側の行（性別計・郡のみの名称を除く）
+    mask = df['市区町村名'].notna() & ~df['市区町村名'].astype(str).str.match(r'^.+郡$')
+    if '性別' in df.columns:
+        mask &= df['性別'] == '計'
+    positions = np.flatnonzero(mask.to_numpy())
+
+    stats = df.iloc[positions][['団体コード', '都道府県名', '市区町村名']].copy()
+    stats['行番号'] = positions
+    unique_codes = stats['団体コード'].unique()
+    code_map = {code: normalize_municipality_code(code) for code in unique_codes}
+    stats['団体コード'] = stats['団体コード'].map(code_map)
+
+    invalid = stats[stats['団体コード'].isna()]
+    stats = stats[stats['団体コード'].notna()]
+
+    # 団体コードで結合
+    table = stats.merge(
+        code_coordinates[['団体コード', 'lat', 'lng', '座標ソース']],
+        on='団体コード',
+        how='left'
+    )
+
+    # コードで見つからない行は、その都道府県の役場位置（P34）だけを読み込み、名称対応表で補完
+    missing_prefectures = sorted(table.loc[table['lat'].isna(), '都道府県名'].dropna().unique())
+    coordinates = name_coordinates(missing_prefectures) if name_coordinates and missing_prefectures else {}
+    if coordinates:
+        crosswalk = load_name_crosswalk(df, coordinates)
+        crosswalk = crosswalk[crosswalk['地理名称'].notna()]
+        p34 = pd.DataFrame({
+            '都道府県名': crosswalk['都道府県名'],
+            '市区町村名': crosswalk['市区町村名'],
+            'p34_lat': [coordinates[p][n]['lat'] for p, n in zip(crosswalk['都道府県名'], crosswalk['地理名称'])],
+            'p34_lng': [coordinates[p][n]['lng'] for p, n in zip(crosswalk['都道府県名'], crosswalk['地理名称'])]
+        })
+        table = table.merge(p34, on=['都道府県名', '市区町村名'], how='left')
+        fill = table['lat'].isna() & table['p34_lat'].notna()
+        table.loc[fill, 'lat'] = table.loc[fill, 'p34_lat']
+        table.loc[fill, 'lng'] = table.loc[fill, 'p34_lng']
+        table.loc[fill, '座標ソース'] = 'p34'
+
+    table = table[JOIN_COLUMNS].sort_values('行番号').reset_index(drop=True)
+
+    matched_codes = set(table['団体コード'])
+    unmatched = table[table['lat'].isna()]
+    unused = code_coordinates[~code_coordinates['団体コード'].isin(matched_codes)]
+    report = {
+        '統計側件数': int(len(stats)),
+        '座標付与件数': int(table['lat'].notna().sum()),
+        '未照合（統計側）': unmatched[['団体コード', '都道府県名', '市区町村名']].to_dict(orient='records'),
+        '未使用（座標側）': unused[['団体コード', '地理名称']].to_dict(orient='records'),
+        '不正な団体コード': invalid[['都道府県名', '市区町村名']].to_dict(orient='records')
+    }
+    return table, report
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """データフレームの値全体のダイジェスト（行ごとのハッシュを1度にまとめて計算する）"""
+    return compute_digest(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+def statistics_version(df: pd.DataFrame) -> str:
+    """統計データのバージョン（共有データのビューは元ファイルのダイジェスト、それ以外は値を含めたダイジェスト）"""
+    return df.attrs.get(DATASET_VERSION_ATTR) or frame_digest(df)
+
+def load_geo_join_table(df: pd.DataFrame, use_cache: bool = True) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """結合表を取得する関数（統計データと座標データが変わらない限りキャッシュを再利用）
+
+    結合表のキャッシュは結合に使う列だけで判定する。レポートの「データバージョン」は人口の値を含む
+    統計データのバージョンと座標データのダイジェストで、派生する索引・地図のキャッシュキーに使う。
+    """
+    source_digest = file_digest(list(CODE_COORDINATE_SOURCES.values()) + prefecture_archive_paths())
+    key_columns = [col for col in JOIN_KEY_COLUMNS if col in df.columns]
+    digest = compute_digest(frame_digest(df[key_columns].astype(str)), source_digest)
+    version = compute_digest(statistics_version(df), source_digest)
+
+    if use_cache:
+        cached = load_json_cache(JOIN_CACHE_NAME, digest)
+        if cached is not None:
+            table = pd.DataFrame(cached['table'], columns=JOIN_COLUMNS)
+            table[['lat', 'lng']] = table[['lat', 'lng']].apply(pd.to_numeric)
+            return table, {**cached['report'], 'データバージョン': version}
+
+    table, report = build_geo_join_table(df, load_code_coordinates(), get_name_coordinates)
+    if use_cache:
+        payload = {'table': table.astype(object).where(table.notna(), None).to_dict(orient='records'), 'report': report}
+        save_json_cache(JOIN_CACHE_NAME, digest, payload)
+    return table, {**report, 'データバージョン': version}
+
+def print_join_report(report: Dict[str, Any]) -> None:
+    """結合結果のレポートを表示する関数"""
+    print(f"統計側件数: {report['統計側件数']:,}件")
+    print(f"座標付与件数: {report['座標付与件数']:,}件")
+    print(f"未照合（統計側）: {len(report['未照合（統計側）']):,}件")
+    for item in report['未照合（統計側）'][:20]:
+        print(f"  - {item['都道府県名']} {item['市区町村名']} ({item['団体コード']})")
+    print(f"未使用（座標側）: {len(report['未使用（座標側）']):,}件")
+    print(f"不正な団体コード: {len(report['不正な団体コード']):,}件")
+
+def main():
+    """結合表を作成してレポートを表示する"""
+    from app.dashboard.utils.data_loader import load_excel_data, clean_data
+
+    df = clean_data(load_excel_data(ROOT_DIR / 'data' / '24nsnen.xlsx'))
+    _, report = load_geo_join_table(df)
+    print_join_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+
+# モジュールごとの読み込み時間の上限（ミリ秒、Python本体の起動は含まない）
+IMPORT_BUDGETS_MS = {
+    'app.dashboard.main': 1500,
+    'app.dashboard.utils.geo_join': 800,
+    'app.dashboard.utils.tile_server': 300,
+    'app.dashboard.utils.warmup': 100,
+    # データ作成用のコマンド（ルートディレクトリのスクリプト）
+    'build_data': 200,
+    'create_coordinates_json': 100,
+    'create_boundaries_json': 100,
+    'download_gml': 100,
+}
+
+# 起動時に読み込んではいけないライブラリ（タブを開いた時点で読み込む）
+# plotly本体はstreamlitが読み込むため、plotly.expressのみを対象にする
+DEFERRED_MODULES = {
+    'app.dashboard.main': ['folium', 'streamlit_folium', 'branca', 'plotly.express'],
+    'app.dashboard.utils.warmup': ['pandas', 'folium', 'plotly.express'],
+    # コマンドは引数の確認や--helpの表示を待たせないよう、重い処理を実行時に読み込む
+    'build_data': ['numpy', 'pandas', 'tqdm'],
+    'create_coordinates_json': ['numpy', 'pandas', 'tqdm'],
+    'create_boundaries_json': ['numpy', 'pandas', 'tqdm'],
+    'download_gml': ['requests', 'tqdm'],
+}
+
+IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+def profile_import(module: str) -> Dict:
+    """新しいプロセスで -X importtime を使ってモジュールの読み込み時間を計測する関数"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                'モジュール': name,
+                '単体(ms)': int(self_us) / 1000,
+                '累計(ms)': int(cumulative_us) / 1000,
+                '階層': (len(indent) - 1) // 2
+            })
+
+    # 子モジュールは親より先に出力されるため、対象モジュールの直前の深い階層を遡る
+    # （site等の起動処理で読み込まれたものは除く）
+    total_ms = None
+    subtree = []
+    for index, row in enumerate(imports):
+        if row['モジュール'] == module and row['階層'] == 0:
+            total_ms = row['累計(ms)']
+            start = index
+            while start > 0 and imports[start - 1]['階層'] > 0:
+                start -= 1
+            subtree = imports[start:index]
+            break
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else '読み込みに失敗しました'
+    return {'モジュール': module, '累計(ms)': total_ms, '読み込み一覧': imports, '依存': subtree, 'エラー': error}
+
+def top_level_imports(profile: Dict, limit: int = 10) -> List[Dict]:
+    """対象モジュールが直接読み込んだもののうち、時間のかかる順に返す関数"""
+    direct = [row for row in profile['依存'] if row['階層'] == 1]
+    return sorted(direct, key=lambda row: row['累計(ms)'], reverse=True)[:limit]
+
+def check_import_budget(module: str, budget_ms: float, deferred: Optional[List[str]] = None) -> List[str]:
+    """読み込み時間の上限と、遅延読み込みすべきライブラリの有無を確認する関数"""
+    profile = profile_import(module)
+    if profile['エラー']:
+        return [f"{module}: 読み込みに失敗しました（{profile['エラー']}）"]
+
+    problems = []
+    if profile['累計(ms)'] is not None and profile['累計(ms)'] > budget_ms:
+        problems.append(f"{module}: {profile['累計(ms)']:.0f}ms（上限 {budget_ms:.0f}ms）")
+
+    loaded = {row['モジュール'] for row in profile['読み込み一覧']}
+    for name in deferred or []:
+        if name in loaded:
+            problems.append(f"{module}: {name} を起動時に読み込んでいます")
+
+    print(f"\n{module}: {profile['累計(ms)'] or 0:.0f}ms（上限 {budget_ms:.0f}ms）")
+    for row in top_level_imports(profile, limit=5):
+        print(f"  {row['累計(ms)']:8.1f}ms  {row['モジュール']}")
+    return problems
+
+def main():
+    """起動時の読み込み時間を計測し、上限を超えた場合は終了コード1で終了する"""
+    problems = []
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        problems.extend(check_import_budget(module, budget_ms, DEFERRED_MODULES.get(module)))
+
+    if problems:
+        print("\n読み込み時間の確認に失敗しました:")
+        for problem in problems:
+            print(f"- {problem}")
+        sys.exit(1)
+    print("\nすべてのモジュールが上限内で読み込まれました")
+
+if __name__ == '__main__':
+    main()
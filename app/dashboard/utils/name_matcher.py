@@ -0,0 +1,209 @@
+import json
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from app.dashboard.utils.cache import compute_digest, load_json_cache, save_json_cache
+
+# 照合結果の信頼度
+CONFIDENCE_EXACT = 1.0
+CONFIDENCE_NORMALIZED = 0.95
+# n-gram照合の最大信頼度（完全一致より必ず低くする）
+CONFIDENCE_NGRAM_MAX = 0.9
+# これ未満のn-gram類似度は未照合とする
+MIN_NGRAM_SCORE = 0.5
+
+# 庁舎名の接尾辞
+OFFICE_SUFFIXES = ('役場', '役所')
+
+# 表記揺れの正規化（ヶ・ヵ・ケなど）
+VARIANT_CHARS = str.maketrans({
+    'ヶ': 'ケ', 'ヵ': 'ケ',
+    '澤': '沢', '邊': '辺', '邉': '辺', '嶋': '島', '檮': '梼', '龍': '竜',
+})
+
+CROSSWALK_CACHE_NAME = 'name_crosswalk'
+CROSSWALK_COLUMNS = ['都道府県名', '市区町村名', '地理名称', '信頼度', '照合方法']
+
+def normalize_municipality_name(name: str) -> str:
+    """市区町村名を照合用に正規化する関数"""
+    if not isinstance(name, str):
+        return ''
+
+    # 全角・半角の統一と空白の除去
+    normalized = unicodedata.normalize('NFKC', name)
+    normalized = re.sub(r'\s+', '', normalized)
+
+    # 役場・役所の接尾辞を除去
+    for suffix in OFFICE_SUFFIXES:
+        if normalized.endswith(suffix):
+            normalized = normalized[:-len(suffix)]
+            break
+
+    # 郡名を含む町村は郡名を除去（例：〇〇郡△△町 → △△町）
+    match = re.match(r'^.+?郡(.+[町村])$', normalized)
+    if match:
+        normalized = match.group(1)
+
+    return normalized.translate(VARIANT_CHARS)
+
+def name_variants(name: str) -> List[str]:
+    """照合に使う名称の候補を返す関数（政令指定都市の区は区名単独も候補にする）"""
+    normalized = normalize_municipality_name(name)
+    variants = [normalized]
+    ward_match = re.match(r'^.+?市(.+区)$', normalized)
+    if ward_match:
+        variants.append(ward_match.group(1))
+    return variants
+
+def char_ngrams(text: str, n: int = 2) -> List[str]:
+    """境界記号付きの文字n-gramを生成する関数"""
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return [padded]
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+class NameMatcher:
+    """地理データ側の名称に対する文字n-gram索引"""
+
+    def __init__(self, geo_names: Dict[str, Iterable[str]], n: int = 2):
+        self.n = n
+        self.names: List[Tuple[str, str]] = []
+        self.grams: List[set] = []
+        # (都道府県名, 名称) → 名称ID
+        self.raw_index: Dict[Tuple[str, str], int] = {}
+        # (都道府県名, 正規化名) → 名称ID
+        self.exact_index: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        # (都道府県名, n-gram) → 名称IDのポスティングリスト
+        self.gram_index: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+
+        for prefecture, names in geo_names.items():
+            for name in names:
+                name_id = len(self.names)
+                normalized = normalize_municipality_name(name)
+                grams = set(char_ngrams(normalized, n))
+                self.names.append((prefecture, name))
+                self.grams.append(grams)
+                self.raw_index[(prefecture, name)] = name_id
+                self.exact_index[(prefecture, normalized)].append(name_id)
+                for gram in grams:
+                    self.gram_index[(prefecture, gram)].append(name_id)
+
+    def match(self, prefecture: str, name: str) -> Dict[str, object]:
+        """1件の統計側名称を地理側名称に照合する関数"""
+        # 正規化前の完全一致
+        if (prefecture, name) in self.raw_index:
+            return self._result(self.raw_index[(prefecture, name)], CONFIDENCE_EXACT, 'exact')
+
+        # 正規化後の一致（同名が複数ある場合はn-gramに回す）
+        variants = name_variants(name)
+        for variant in variants:
+            candidates = self.exact_index.get((prefecture, variant), [])
+            if len(candidates) == 1:
+                return self._result(candidates[0], CONFIDENCE_NORMALIZED, 'normalized')
+
+        # n-gram索引で候補を絞り込み、Dice係数で採点
+        scores: Dict[int, float] = defaultdict(float)
+        for variant in variants:
+            query_grams = set(char_ngrams(variant, self.n))
+            shared_counts: Dict[int, int] = defaultdict(int)
+            for gram in query_grams:
+                for name_id in self.gram_index.get((prefecture, gram), []):
+                    shared_counts[name_id] += 1
+            for name_id, shared in shared_counts.items():
+                score = 2.0 * shared / (len(query_grams) + len(self.grams[name_id]))
+                scores[name_id] = max(scores[name_id], score)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < MIN_NGRAM_SCORE:
+            return {'地理名称': None, '信頼度': 0.0, '照合方法': 'unmatched'}
+
+        best_id, best_score = ranked[0]
+        confidence = best_score * CONFIDENCE_NGRAM_MAX
+        # 同点の候補が残る場合（例：同一県内の同名の区）は曖昧として信頼度を下げる
+        if len(ranked) > 1 and ranked[1][1] == best_score:
+            return self._result(best_id, round(confidence / 2, 4), 'ambiguous')
+        return self._result(best_id, round(confidence, 4), 'ngram')
+
+    def match_all(self, records: Iterable[Tuple[str, str]]) -> List[Dict[str, object]]:
+        """統計側名称をまとめて照合する関数"""
+        results = []
+        for prefecture, name in records:
+            result = self.match(prefecture, name)
+            results.append({'都道府県名': prefecture, '市区町村名': name, **result})
+        return results
+
+    def _result(self, name_id: int, confidence: float, method: str) -> Dict[str, object]:
+        return {'地理名称': self.names[name_id][1], '信頼度': confidence, '照合方法': method}
+
+def get_statistical_names(df: pd.DataFrame) -> List[Tuple[str, str]]:
+    """統計データから照合対象の（都道府県名, 市区町村名）を取得する関数"""
+    mask = df['市区町村名'].notna()
+    if '性別' in df.columns:
+        mask &= df['性別'] == '計'
+    names = df.loc[mask, ['都道府県名', '市区町村名']].astype(str)
+    # 郡のみの名称は地理データに対応しないため除外
+    names = names[~names['市区町村名'].str.match(r'^.+郡$')]
+    return list(names.drop_duplicates().itertuples(index=False, name=None))
+
+def build_name_crosswalk(
+    df: pd.DataFrame,
+    coordinates: Dict[str, Dict[str, Dict[str, float]]]
+) -> pd.DataFrame:
+    """統計データと地理データの名称対応表を作成する関数"""
+    matcher = NameMatcher({pref: cities.keys() for pref, cities in coordinates.items()})
+    results = matcher.match_all(get_statistical_names(df))
+    return pd.DataFrame(results, columns=CROSSWALK_COLUMNS)
+
+def load_name_crosswalk(
+    df: pd.DataFrame,
+    coordinates: Dict[str, Dict[str, Dict[str, float]]],
+    use_cache: bool = True
+) -> pd.DataFrame:
+    """名称対応表を取得する関数（入力が変わらない限りキャッシュを再利用）"""
+    stat_names = get_statistical_names(df)
+    geo_names = {pref: sorted(cities.keys()) for pref, cities in coordinates.items()}
+    digest = compute_digest(stat_names, geo_names)
+
+    if use_cache:
+        cached = load_json_cache(CROSSWALK_CACHE_NAME, digest)
+        if cached is not None:
+            return pd.DataFrame(cached, columns=CROSSWALK_COLUMNS)
+
+    crosswalk = build_name_crosswalk(df, coordinates)
+    if use_cache:
+        save_json_cache(CROSSWALK_CACHE_NAME, digest, crosswalk.to_dict(orient='records'))
+    return crosswalk
+
+def summarize_crosswalk(crosswalk: pd.DataFrame) -> Dict[str, int]:
+    """照合方法ごとの件数を集計する関数"""
+    return crosswalk['照合方法'].value_counts().to_dict()
+
+def main():
+    """名称対応表を作成して結果を表示する"""
+    from app.dashboard.utils.data_loader import load_excel_data, clean_data
+
+    root_dir = Path(__file__).parent.parent.parent.parent
+    excel_path = root_dir / 'data' / '24nsnen.xlsx'
+    coordinates_path = root_dir / 'app' / 'dashboard' / 'data' / 'city_coordinates.json'
+
+    df = clean_data(load_excel_data(excel_path))
+    with open(coordinates_path, 'r', encoding='utf-8') as f:
+        coordinates = json.load(f)
+
+    crosswalk = load_name_crosswalk(df, coordinates)
+    print(f"照合対象: {len(crosswalk):,}件")
+    for method, count in summarize_crosswalk(crosswalk).items():
+        print(f"- {method}: {count:,}件")
+
+    unmatched = crosswalk[crosswalk['照合方法'] == 'unmatched']
+    if not unmatched.empty:
+        print("\n未照合の市区町村:")
+        print(unmatched[['都道府県名', '市区町村名']].to_string(index=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.constants import POPULATION_COLUMNS
+from app.dashboard.utils.rollup import DESIGNATED_CITY_NAMES, designated_city_of
+
+# 人口ピラミッドの年齢（5歳階級、総数を除く）
+PYRAMID_AGES = POPULATION_COLUMNS[1:]
+# 性比（女性100人に対する男性の人数）の列名の接頭辞
+SEX_RATIO_PREFIX = '性比:'
+
+def without_covered_wards(codes: List[str]) -> List[str]:
+    """政令指定都市と区が両方選択されている場合に、市に含まれる区を除いた団体コードの一覧（合計の二重計上を防ぐ）"""
+    cities = {str(code)[:5] for code in codes if str(code)[:5] in DESIGNATED_CITY_NAMES}
+    if not cities:
+        return list(codes)
+    return [code for code in codes if designated_city_of(str(code)[:5]) not in cities]
+
+class PopulationPyramids:
+    """市区町村ごとの男女別・年齢別の人口と、年齢別の性比を事前計算した表
+
+    男・女の行を1度だけ市区町村×年齢の行列に並べ替え、以降は行の選択と合計のみで人口ピラミッドを作る。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        rows = df[df['性別'].isin(['男', '女'])].drop_duplicates(['団体コード', '性別'])
+        table = (
+            rows.set_index(['団体コード', '性別'])[POPULATION_COLUMNS]
+            .apply(pd.to_numeric, errors='coerce')
+            .unstack('性別')
+        )
+        self.codes = pd.Index(table.index.astype(str), name='団体コード')
+        self.names = (
+            rows.drop_duplicates('団体コード').set_index('団体コード')['市区町村名']
+            .reindex(table.index).astype(str).set_axis(self.codes)
+        )
+        # 市区町村×年齢の行列（男・女）
+        self.male = np.nan_to_num(table.xs('男', axis=1, level='性別')[PYRAMID_AGES].to_numpy(dtype=float))
+        self.female = np.nan_to_num(table.xs('女', axis=1, level='性別')[PYRAMID_AGES].to_numpy(dtype=float))
+        self._positions = pd.Series(np.arange(len(self.codes)), index=self.codes)
+
+        # 年齢別と総数の性比
+        male = np.column_stack([self.male, self.male.sum(axis=1)])
+        female = np.column_stack([self.female, self.female.sum(axis=1)])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(female > 0, male / female * 100, np.nan)
+        self.sex_ratios = pd.DataFrame(
+            ratios,
+            index=self.codes,
+            columns=[f"{SEX_RATIO_PREFIX}{age}" for age in [*PYRAMID_AGES, '総数']]
+        )
+
+    def positions(self, codes: List[str]) -> np.ndarray:
+        """団体コードの行の位置（男女別の行がない市区町村は除く）"""
+        return self._positions.reindex([str(code) for code in codes]).dropna().to_numpy(dtype=int)
+
+    def counts(self, codes: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """市区町村ごとの男女別・年齢別の人口（市区町村×年齢の行列）"""
+        positions = self.positions(codes)
+        return self.male[positions], self.female[positions]
+
+    def combined(self, codes: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """選択した市区町村を合計した男女別・年齢別の人口（市と一緒に選択された区は市に含まれるため数えない）"""
+        male, female = self.counts(without_covered_wards(codes))
+        return male.sum(axis=0), female.sum(axis=0)
+
+    def ratio_table(self, codes: List[str]) -> pd.DataFrame:
+        """選択した市区町村の年齢別の性比（行は市区町村名）"""
+        positions = self.positions(codes)
+        table = self.sex_ratios.iloc[positions]
+        return table.set_axis(self.names.iloc[positions].to_numpy()).rename(
+            columns=lambda col: col[len(SEX_RATIO_PREFIX):]
+        )
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.aggregates import ADULT_TOTAL, VOTING_PREFIX, get_group_definitions
+from app.dashboard.utils.constants import AGE_ORDER
+from app.dashboard.utils.geo_join import normalize_municipality_code
+from app.dashboard.utils.rollup import DESIGNATED_CITY_NAMES, designated_city_of
+
+# 市区町村の種別
+MUNICIPALITY_TYPES = ['政令指定都市', '区', '特別区', '市', '町', '村']
+# 割合の指標の接尾辞（総数に対する割合）
+SHARE_SUFFIX = 'の割合'
+
+def municipality_type(code5: str, name: str) -> str:
+    """団体コード（5桁）と名称から市区町村の種別を返す関数"""
+    if code5 in DESIGNATED_CITY_NAMES:
+        return '政令指定都市'
+    if designated_city_of(code5):
+        return '区'
+    if code5[:2] == '13' and name.endswith('区'):
+        return '特別区'
+    for suffix in ('市', '町', '村'):
+        if name.endswith(suffix):
+            return suffix
+    return 'その他'
+
+class RankingTable:
+    """全国の市区町村の指標を並べた表（上位・下位k件の検索用）
+
+    指標は読み込み時の集計表から1度だけ作り、検索は絞り込みのマスクとargpartitionによる部分ソートのみで行う。
+    都道府県計・郡計の行は対象外とする。
+    """
+
+    def __init__(self, df: pd.DataFrame, aggregates: pd.DataFrame):
+        rows = (df['性別'] == '計').to_numpy()
+        codes = df['団体コード'].map(normalize_municipality_code)
+        names = df['市区町村名'].astype(str)
+        # 重複は「計」の行どうしで判定する（男・女の行が先にあっても「計」の行を除かない）
+        duplicated = np.zeros(len(df), dtype=bool)
+        duplicated[rows] = codes[rows].duplicated().to_numpy()
+        valid = rows & (
+            codes.notna() & (codes.str[2:5] != '000') & ~names.str.endswith('郡')
+        ).to_numpy() & ~duplicated
+
+        codes = codes[valid].to_numpy()
+        names = names[valid].to_numpy()
+        self.table = pd.DataFrame({
+            '団体コード': codes,
+            '都道府県名': df['都道府県名'].to_numpy()[valid],
+            '市区町村名': names,
+            '種別': [municipality_type(code[:5], name) for code, name in zip(codes, names)],
+        })
+        self.units: Dict[str, str] = {}
+        self.values: Dict[str, np.ndarray] = {}
+
+        selected = aggregates[valid]
+        population = selected['総人口'].to_numpy(dtype=float)
+        self._add('総人口', population, '人')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for group in get_group_definitions():
+                if group == '総人口':
+                    continue
+                share = np.where(population > 0, selected[group].to_numpy(dtype=float) / population * 100, np.nan)
+                self._add(f"{group}{SHARE_SUFFIX}", share, '%')
+        for age in AGE_ORDER:
+            self._add(f"{VOTING_PREFIX}{age}", selected[f"{VOTING_PREFIX}{age}"].to_numpy(dtype=float), '%')
+        self._add(f"{ADULT_TOTAL}人口", selected[ADULT_TOTAL].to_numpy(dtype=float), '人')
+
+    def _add(self, name: str, values: np.ndarray, unit: str) -> None:
+        self.values[name] = values
+        self.units[name] = unit
+
+    @property
+    def indicators(self) -> List[str]:
+        return list(self.values)
+
+    def top(
+        self,
+        indicator: str,
+        k: int = 20,
+        ascending: bool = False,
+        prefectures: Optional[List[str]] = None,
+        types: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """指標の上位（ascending=Trueなら下位）k件を返す関数（都道府県・種別で絞り込み可）"""
+        values = self.values[indicator]
+        mask = ~np.isnan(values)
+        if prefectures:
+            mask &= self.table['都道府県名'].isin(prefectures).to_numpy()
+        if types:
+            mask &= self.table['種別'].isin(types).to_numpy()
+
+        candidates = np.flatnonzero(mask)
+        keys = values[candidates] if ascending else -values[candidates]
+        k = min(k, len(candidates))
+        if k <= 0:
+            return self.table.iloc[[]].assign(順位=[], 値=[])
+
+        # 上位k件だけを部分ソートで取り出してから並べ替える
+        top = np.argpartition(keys, k - 1)[:k]
+        top = top[np.argsort(keys[top], kind='stable')]
+        positions = candidates[top]
+        result = self.table.iloc[positions].reset_index(drop=True)
+        result.insert(0, '順位', np.arange(1, k + 1))
+        return result.assign(値=values[positions])
@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.aggregates import materialize_aggregates
+from app.dashboard.utils.constants import DESIGNATED_CITIES, POPULATION_COLUMNS
+from app.dashboard.utils.geo_join import compute_check_digit, normalize_municipality_code
+
+# 集計の階層（上位から）
+LEVELS = ['全国', '都道府県', '政令指定都市', '区', '市区町村']
+NATION_KEY = ('全国', '全国')
+SEXES = ['計', '男', '女']
+
+# 団体コード（5桁）から政令指定都市名
+DESIGNATED_CITY_NAMES = {code: name for name, code in DESIGNATED_CITIES.items()}
+
+NodeId = Tuple[str, str]
+
+def designated_city_of(code5: str) -> Optional[str]:
+    """区の団体コード（5桁）から、所属する政令指定都市のコード（5桁）を返す関数
+
+    区のコードは市のコードの直後（下3桁が101〜199）に振られるため、
+    同じ都道府県で市のコード以下の最大のものを所属先とする。
+    """
+    if code5 in DESIGNATED_CITY_NAMES or not 101 <= int(code5[2:]) <= 199:
+        return None
+    candidates = [city for city in DESIGNATED_CITY_NAMES if city[:2] == code5[:2] and city < code5]
+    return max(candidates) if candidates else None
+
+def classify_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """統計データの行を階層の末端（区・市区町村）に分類する関数
+
+    都道府県計・郡計・政令指定都市の市計の行は、下位の行から積み上げるため末端に含めない。
+    """
+    codes = df['団体コード'].map(normalize_municipality_code)
+    names = df['市区町村名'].astype(str)
+    rows = []
+    for position, (code, name, prefecture, sex) in enumerate(zip(codes, names, df['都道府県名'], df['性別'])):
+        if code is None or sex not in SEXES or name.endswith('郡'):
+            continue
+        code5 = code[:5]
+        if code5[2:] == '000' or code5 in DESIGNATED_CITY_NAMES:
+            continue
+        city = designated_city_of(code5)
+        rows.append({
+            '行番号': position,
+            '団体コード': code,
+            '市区町村名': name,
+            '都道府県名': prefecture,
+            '性別': sex,
+            '階層': '区' if city else '市区町村',
+            '政令指定都市': city or ''
+        })
+    return pd.DataFrame(rows, columns=['行番号', '団体コード', '市区町村名', '都道府県名', '性別', '階層', '政令指定都市'])
+
+class RollupCube:
+    """全国→都道府県→政令指定都市→区の各階層で、人口と年齢区分の集計を事前計算した表
+
+    構築時に末端の行を各階層へ1度だけ積み上げ、以降の参照・上位/下位の移動は辞書の参照のみで行う。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        leaves = classify_rows(df)
+        self.nodes: Dict[NodeId, Dict] = {}
+        self.children: Dict[NodeId, List[NodeId]] = {}
+        self.parents: Dict[NodeId, Optional[NodeId]] = {}
+        self._code_index: Dict[str, NodeId] = {}
+
+        self._add_node(NATION_KEY, '全国', None)
+        leaf_nodes = []
+        for row in leaves.drop_duplicates('団体コード').itertuples(index=False):
+            prefecture = ('都道府県', row.都道府県名)
+            self._add_node(prefecture, row.都道府県名, NATION_KEY)
+            parent = prefecture
+            if row.政令指定都市:
+                city_code = row.政令指定都市 + compute_check_digit(row.政令指定都市)
+                parent = ('政令指定都市', city_code)
+                self._add_node(parent, DESIGNATED_CITY_NAMES[row.政令指定都市], prefecture)
+                self._code_index[city_code] = parent
+            node = (row.階層, row.団体コード)
+            self._add_node(node, row.市区町村名, parent)
+            self._code_index[row.団体コード] = node
+            leaf_nodes.append(node)
+
+        # 末端の行を、自身と全ての上位の階層に積み上げる（階層数×行数の加算のみ）
+        node_ids = list(self.nodes)
+        self._positions = {node: i for i, node in enumerate(node_ids)}
+        ancestors = {node: [self._positions[n] for n in self.path(node)] for node in leaf_nodes}
+        row_index, sex_index, target_index = [], [], []
+        for i, (code, sex) in enumerate(zip(leaves['団体コード'], leaves['性別'])):
+            targets = ancestors[self._code_index[code]]
+            row_index.extend([i] * len(targets))
+            sex_index.extend([SEXES.index(sex)] * len(targets))
+            target_index.extend(targets)
+
+        buckets = np.nan_to_num(df[POPULATION_COLUMNS].to_numpy(dtype=float)[leaves['行番号'].to_numpy(dtype=int)])
+        totals = np.zeros((len(SEXES), len(node_ids), len(POPULATION_COLUMNS)))
+        np.add.at(totals, (np.asarray(sex_index, dtype=int), np.asarray(target_index, dtype=int)), buckets[row_index])
+
+        # 積み上げた人口から、年齢区分の集計を各階層・性別ごとに計算する
+        self.tables: Dict[str, pd.DataFrame] = {}
+        for s, sex in enumerate(SEXES):
+            frame = pd.DataFrame(totals[s], columns=POPULATION_COLUMNS)
+            self.tables[sex] = materialize_aggregates(frame)
+
+    def _add_node(self, node: NodeId, name: str, parent: Optional[NodeId]) -> None:
+        if node in self.nodes:
+            return
+        self.nodes[node] = {'階層': node[0], 'キー': node[1], '名称': name}
+        self.parents[node] = parent
+        self.children[node] = []
+        if parent is not None:
+            self.children[parent].append(node)
+
+    def node_for_code(self, code: str) -> Optional[NodeId]:
+        """団体コードから、区・市区町村・政令指定都市の階層を返す関数"""
+        normalized = normalize_municipality_code(code)
+        return self._code_index.get(normalized) if normalized else None
+
+    def path(self, node: NodeId) -> List[NodeId]:
+        """自身から全国までの上位の階層を返す関数（ロールアップ）"""
+        path = []
+        while node is not None:
+            path.append(node)
+            node = self.parents[node]
+        return path
+
+    def values(self, node: NodeId, sex: str = '計') -> pd.Series:
+        """階層の集計値を返す関数"""
+        return self.tables[sex].iloc[self._positions[node]]
+
+    def compare(self, nodes: List[NodeId], sex: str = '計', columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """複数の階層の集計値を並べた表を返す関数"""
+        positions = [self._positions[node] for node in nodes]
+        table = self.tables[sex].iloc[positions]
+        if columns is not None:
+            table = table[columns]
+        labels = [f"{self.nodes[node]['名称']}（{node[0]}）" for node in nodes]
+        return table.set_axis(labels)
+
+    def drill_down(self, node: NodeId) -> List[NodeId]:
+        """1つ下の階層を返す関数"""
+        return self.children[node]
@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from app.dashboard.utils.aggregates import aggregate_definitions_digest, materialize_aggregates
+from app.dashboard.utils.cache import file_digest
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+# 複数のサーバープロセスで共有する配列の保存先（/dev/shm等のメモリ上のディレクトリも指定可能）
+SHARED_DIR = Path(os.environ.get('ESTAT_SHARED_DIR', DATA_DIR / 'shared'))
+MANIFEST_NAME = 'manifest.json'
+# 公開と同時に古いディレクトリが削除された場合に、マニフェストを読み直す回数
+ATTACH_RETRIES = 3
+# 文字列の列は、読み込み時と同じpyarrowの文字列型にする
+STRING_DTYPE = pd.StringDtype('pyarrow', na_value=np.nan)
+
+def is_numpy_column(values: pd.Series) -> bool:
+    """numpyの数値・真偽値の配列をそのまま保存できる列かどうかを返す関数"""
+    return isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iufb'
+
+def frame_to_arrays(df: pd.DataFrame, prefix: str) -> Tuple[Dict[str, np.ndarray], pa.Table, Dict[str, Any]]:
+    """データフレームを列ごとの数値配列（元の型のまま）と、文字列等の列のArrowの表に分解する関数"""
+    numeric_columns = [col for col in df.columns if is_numpy_column(df[col])]
+    text_columns = [col for col in df.columns if col not in numeric_columns]
+
+    # 列ごとに1ファイルとし、読み込み側で型変換やコピーをせずにメモリマップできるようにする
+    arrays = {
+        f"{prefix}_column_{i}": np.ascontiguousarray(df[col].to_numpy())
+        for i, col in enumerate(numeric_columns)
+    }
+    # 文字列の列は欠損値を保ったままArrowの形式で保存する（pandasの文字列の列と同じlarge_string型）
+    text_table = pa.table({
+        str(i): pa.array(df[col].astype(STRING_DTYPE), type=pa.large_string(), from_pandas=True)
+        for i, col in enumerate(text_columns)
+    })
+
+    layout = {
+        'columns': df.columns.tolist(),
+        'numeric_columns': numeric_columns,
+        'text_columns': text_columns,
+        'rows': len(df)
+    }
+    return arrays, text_table, layout
+
+def arrays_to_frame(directory: Path, prefix: str, layout: Dict[str, Any]) -> pd.DataFrame:
+    """メモリマップした配列からデータフレームを組み立てる関数（数値・文字列ともコピーしない）"""
+    columns = {}
+    for i, col in enumerate(layout['numeric_columns']):
+        # 保存時の型のまま読み込むため、ページキャッシュ上の配列をそのまま参照する
+        columns[col] = np.load(directory / f"{prefix}_column_{i}.npy", mmap_mode='r')
+
+    if layout['text_columns']:
+        source = pa.memory_map(str(directory / f"{prefix}_text.arrow"), 'r')
+        text_table = pa.ipc.open_file(source).read_all()
+        for i, col in enumerate(layout['text_columns']):
+            columns[col] = STRING_DTYPE.__from_arrow__(text_table.column(str(i)))
+
+    # 列ごとに渡し、結合によるコピーが起きないようにする
+    return pd.DataFrame({col: columns[col] for col in layout['columns']}, copy=False)
+
+def write_arrays(directory: Path, prefix: str, arrays: Dict[str, np.ndarray], text_table: pa.Table) -> None:
+    """列ごとの数値配列とArrowの表をディレクトリに書き出す関数"""
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", array)
+    if text_table.num_columns:
+        with pa.OSFile(str(directory / f"{prefix}_text.arrow"), 'wb') as sink:
+            with pa.ipc.new_file(sink, text_table.schema) as writer:
+                writer.write_table(text_table)
+
+def publish_population_arrays(
+    df: pd.DataFrame,
+    join_table: pd.DataFrame,
+    join_report: Dict[str, Any],
+    source_version: str,
+    output_dir: Path = SHARED_DIR
+) -> Path:
+    """人口データ・年齢区分の集計表・結合表を.npy・.arrowファイルとして公開する関数
+
+    配列は一時ディレクトリに書き出してから公開ごとに新しい名前のディレクトリに移し、最後にマニフェストを差し替える。
+    公開済みのディレクトリは書き換えないため、差し替え前の配列を開いているプロセスはそのまま読み続けられる。
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    temp_dir = Path(tempfile.mkdtemp(prefix='.publish-', dir=output_dir))
+    try:
+        layouts = {}
+        frames = {
+            'population': df,
+            'aggregates': materialize_aggregates(df),
+            'join': join_table
+        }
+        for prefix, frame in frames.items():
+            arrays, text_table, layouts[prefix] = frame_to_arrays(frame, prefix)
+            write_arrays(temp_dir, prefix, arrays, text_table)
+        version_dir = output_dir / f"{source_version}-{time.time_ns()}"
+        os.replace(temp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        'version': source_version,
+        'directory': version_dir.name,
+        'population': layouts['population'],
+        'aggregates': layouts['aggregates'],
+        'aggregate_definitions': aggregate_definitions_digest(),
+        'join': layouts['join'],
+        'join_report': join_report
+    }
+    temp_path = output_dir / f"{MANIFEST_NAME}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, default=str)
+    os.replace(temp_path, output_dir / MANIFEST_NAME)
+
+    # 古い公開のディレクトリを削除（開いているプロセスのメモリマップは削除後も有効）
+    for path in stale_directories(output_dir, version_dir.name):
+        shutil.rmtree(path, ignore_errors=True)
+    return version_dir
+
+def stale_directories(output_dir: Path, current: str) -> List[Path]:
+    """現在の公開以外の公開済みディレクトリ（書き込み中の一時ディレクトリは除く）"""
+    return [path for path in output_dir.iterdir() if path.is_dir() and path.name != current and not path.name.startswith('.')]
+
+def attach_population_arrays(
+    source_version: Optional[str] = None,
+    shared_dir: Path = SHARED_DIR
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any], Optional[pd.DataFrame]]]:
+    """公開済みの配列を読み取り専用でメモリマップする関数
+
+    公開されていない場合や、元データのバージョンと一致しない場合はNoneを返す。
+    集計の定義が公開時から変わっている場合、集計表はNone（読み込み側で計算し直す）。
+    """
+    manifest_path = shared_dir / MANIFEST_NAME
+    for attempt in range(ATTACH_RETRIES):
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if source_version is not None and manifest['version'] != source_version:
+            return None
+
+        version_dir = shared_dir / manifest['directory']
+        try:
+            df = arrays_to_frame(version_dir, 'population', manifest['population'])
+            join_table = arrays_to_frame(version_dir, 'join', manifest['join'])
+            aggregates = None
+            if manifest.get('aggregate_definitions') == aggregate_definitions_digest():
+                aggregates = arrays_to_frame(version_dir, 'aggregates', manifest['aggregates'])
+        except FileNotFoundError:
+            # マニフェストを読んだ直後に次の公開で削除された場合は、新しいマニフェストを読み直す
+            if attempt == ATTACH_RETRIES - 1:
+                raise
+            continue
+        return df, join_table, manifest['join_report'], aggregates
+    return None
+
+def main():
+    """Excelファイルを読み込み、サーバープロセス間で共有する配列を公開する"""
+    from app.dashboard.utils.data_loader import clean_data, load_excel_data
+    from app.dashboard.utils.geo_join import load_geo_join_table
+
+    excel_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('data/24nsnen.xlsx')
+    if not excel_path.exists():
+        print(f"エラー: {excel_path} が見つかりません")
+        sys.exit(1)
+
+    df = clean_data(load_excel_data(excel_path))
+    join_table, report = load_geo_join_table(df)
+    version_dir = publish_population_arrays(df, join_table, report, file_digest(excel_path))
+
+    size_mb = sum(path.stat().st_size for path in version_dir.iterdir()) / 1024 / 1024
+    print(f"共有配列を公開しました: {version_dir}（{len(df):,}行、{size_mb:.1f}MB）")
+
+if __name__ == '__main__':
+    main()
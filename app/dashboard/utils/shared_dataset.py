@@ -0,0 +1,166 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.aggregates import materialize_aggregates
+from app.dashboard.utils.cache import file_digest
+
+# ビューの元データを識別するための属性名
+DATASET_VERSION_ATTR = 'データバージョン'
+
+def read_only_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """列データを書き込み不可にしたデータフレームを返す関数（列データはコピーしない）
+
+    numpyの配列を持つ列は配列を書き込み不可にする（メモリマップした配列はそのまま使う）。
+    Arrow等の拡張配列は書き込み時に新しい配列を作るため、そのまま共有する。
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(values, pd.arrays.NumpyExtensionArray):
+            values = values.to_numpy().view()
+            values.flags.writeable = False
+        columns[col] = values
+    frame = pd.DataFrame(columns, index=df.index, copy=False)
+    frame.attrs.update(df.attrs)
+    return frame
+
+class SharedDataset:
+    """プロセス内の全セッションで共有する、読み取り専用の人口データ
+
+    データ本体は1度だけ読み込み、各セッションには列データを共有する軽量なビューを渡す。
+    列データ（集計表を含む）は書き込み不可の配列で持つため、共有データを直接変更することはできない。
+    ビューに書き込むと（pandasのCopy-on-Writeにより）書き込んだ列だけがコピーされる。
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str, aggregates: Optional[pd.DataFrame] = None):
+        if '出典' in df.columns:
+            # 複数のワークブックを結合した表は、団体コードごとの集計・索引が重複するため受け付けない
+            from app.dashboard.utils.workbooks import ensure_single_source
+            ensure_single_source(df)
+        self.version = version
+        self._frame = read_only_frame(df)
+        self._frame.attrs[DATASET_VERSION_ATTR] = version
+        # 年齢区分の集計は読み込み時に1度だけ計算し、データと同じバージョンで保持する
+        if aggregates is None:
+            aggregates = materialize_aggregates(self._frame)
+        self.aggregates = read_only_frame(aggregates.set_axis(self._frame.index))
+        self._rollup = None
+        self._rollup_lock = threading.Lock()
+        self._pyramids = None
+        self._pyramids_lock = threading.Lock()
+        self._similarity = None
+        self._similarity_lock = threading.Lock()
+        self._rankings = None
+        self._rankings_lock = threading.Lock()
+
+    def view(self) -> pd.DataFrame:
+        """共有データのビューを返す関数（列データはコピーしない）"""
+        view = self._frame.copy(deep=False)
+        # 共有データのビューかどうかをインデックスの同一性で判定できるよう、同じインデックスを使う
+        view.index = self._frame.index
+        return view
+
+    def filter(self, filters: Dict[str, Any]) -> pd.DataFrame:
+        """条件に一致する行だけを取り出す関数"""
+        mask = np.ones(len(self._frame), dtype=bool)
+        for column, value in filters.items():
+            if value is not None:
+                mask &= (self._frame[column] == value).to_numpy()
+        return self._frame[mask]
+
+    def aggregate_rows(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """共有データから取り出した行に対応する集計行を返す関数"""
+        return self.aggregates.loc[rows.index]
+
+    @property
+    def rollup(self):
+        """全国・都道府県・政令指定都市・区の集計（初めて参照された時に1度だけ構築）"""
+        with self._rollup_lock:
+            if self._rollup is None:
+                from app.dashboard.utils.rollup import RollupCube
+                self._rollup = RollupCube(self._frame)
+            return self._rollup
+
+    @property
+    def pyramids(self):
+        """市区町村ごとの男女別・年齢別の人口と性比（初めて参照された時に1度だけ構築）"""
+        with self._pyramids_lock:
+            if self._pyramids is None:
+                from app.dashboard.utils.pyramid import PopulationPyramids
+                self._pyramids = PopulationPyramids(self._frame)
+            return self._pyramids
+
+    @property
+    def similarity(self):
+        """年齢構成が似た市区町村の検索用の索引（初めて参照された時に1度だけ構築）"""
+        with self._similarity_lock:
+            if self._similarity is None:
+                from app.dashboard.utils.similarity import SimilarityIndex
+                self._similarity = SimilarityIndex(self._frame)
+            return self._similarity
+
+    @property
+    def rankings(self):
+        """全国の市区町村の指標のランキング用の表（初めて参照された時に1度だけ構築）"""
+        with self._rankings_lock:
+            if self._rankings is None:
+                from app.dashboard.utils.rankings import RankingTable
+                self._rankings = RankingTable(self._frame, self.aggregates)
+            return self._rankings
+
+    def owns(self, df: pd.DataFrame) -> bool:
+        """データフレームがこの共有データのビュー（行を絞り込んでいないもの）かどうかを返す関数
+
+        絞り込みや並べ替えをしたデータフレームは新しいインデックスを持つため、同じ行数でも一致しない。
+        """
+        return df.index is self._frame.index and df.attrs.get(DATASET_VERSION_ATTR) == self.version
+
+    @property
+    def nbytes(self) -> int:
+        """共有データのメモリ使用量（バイト）"""
+        return int(self._frame.memory_usage(deep=True).sum())
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+# 読み込み済みの共有データ（ファイルパスごと）
+_datasets: Dict[str, SharedDataset] = {}
+_signatures: Dict[str, Tuple[int, int]] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+def load_shared_dataset(
+    path: Union[Path, str],
+    loader: Callable[[str], pd.DataFrame],
+    aggregates_loader: Optional[Callable[[], Optional[pd.DataFrame]]] = None
+) -> SharedDataset:
+    """ファイルを1度だけ読み込み、プロセス内で共有する関数
+
+    ファイルが更新されていれば読み込み直す。同時に呼ばれた場合は最初の読み込みの完了を待つ。
+    """
+    key = str(Path(path).resolve())
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+
+    with lock:
+        # 再実行のたびにファイル全体を読まないよう、更新の有無は更新日時とサイズで判定する
+        stat = Path(key).stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        dataset = _datasets.get(key)
+        if dataset is None or _signatures.get(key) != signature:
+            aggregates = aggregates_loader() if aggregates_loader else None
+            dataset = SharedDataset(loader(str(path)), file_digest(key), aggregates)
+            _datasets[key] = dataset
+            _signatures[key] = signature
+        return dataset
+
+def get_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """データフレームに対応する集計表を返す関数（共有データのビューなら計算済みの表を使う）"""
+    for dataset in list(_datasets.values()):
+        if dataset.owns(df):
+            return dataset.aggregates
+    return materialize_aggregates(df)
@@ -0,0 +1,94 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.constants import POPULATION_COLUMNS
+from app.dashboard.utils.geo_join import normalize_municipality_code
+
+# 年齢構成のベクトルに使う列（5歳階級、総数を除く）
+SIMILARITY_COLUMNS = POPULATION_COLUMNS[1:]
+SIMILARITY_METRICS = {
+    'cosine': 'コサイン類似度',
+    'jensen_shannon': 'Jensen-Shannon（1-距離）',
+}
+
+def _entropy(p: np.ndarray) -> np.ndarray:
+    """行ごとのエントロピー（底2、0log0=0）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=-1)
+
+class SimilarityIndex:
+    """全国の市区町村の年齢構成（構成比のベクトル）から、似た市区町村を探す索引
+
+    構成比の行列・単位ベクトル・エントロピーを構築時に1度だけ計算し、検索は行列演算と部分ソートのみで行う。
+    都道府県計・郡計の行は対象外とし、同じ団体コードの行は最初の行のみを使う。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        rows = df[df['性別'] == '計']
+        codes = rows['団体コード'].map(normalize_municipality_code)
+        names = rows['市区町村名'].astype(str)
+        valid = (
+            codes.notna() & (codes.str[2:5] != '000') & ~names.str.endswith('郡') & ~codes.duplicated()
+        ).to_numpy()
+        rows = rows[valid]
+
+        counts = np.nan_to_num(rows[SIMILARITY_COLUMNS].to_numpy(dtype=float)).clip(min=0)
+        totals = counts.sum(axis=1)
+        keep = totals > 0
+        self.table = pd.DataFrame({
+            '団体コード': codes[valid].to_numpy()[keep],
+            '都道府県名': rows['都道府県名'].to_numpy()[keep],
+            '市区町村名': names[valid].to_numpy()[keep],
+        })
+        # 構成比（各行の合計が1）と、コサイン類似度用の単位ベクトル
+        self.shares = counts[keep] / totals[keep, None]
+        self.unit = self.shares / np.linalg.norm(self.shares, axis=1, keepdims=True)
+        self.entropy = _entropy(self.shares)
+        self._positions = pd.Series(np.arange(len(self.table)), index=self.table['団体コード'])
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def position(self, code: str) -> Optional[int]:
+        """団体コードの行の位置（対象外の場合はNone）"""
+        normalized = normalize_municipality_code(code)
+        position = self._positions.get(normalized) if normalized else None
+        return None if position is None else int(position)
+
+    def scores(self, position: int, metric: str = 'cosine') -> np.ndarray:
+        """全市区町村との類似度（大きいほど似ている、1が同一）"""
+        if metric == 'cosine':
+            return self.unit @ self.unit[position]
+        if metric == 'jensen_shannon':
+            # JS = H((P+Q)/2) - (H(P)+H(Q))/2 を全行まとめて計算し、距離（平方根）を類似度に変換する
+            mixture = (self.shares + self.shares[position]) / 2
+            divergence = _entropy(mixture) - (self.entropy + self.entropy[position]) / 2
+            return 1.0 - np.sqrt(np.clip(divergence, 0.0, 1.0))
+        raise ValueError(f"対応していない類似度です: {metric}")
+
+    def query(
+        self,
+        code: str,
+        k: int = 10,
+        metric: str = 'cosine',
+        prefecture: Optional[str] = None
+    ) -> pd.DataFrame:
+        """指定した市区町村に年齢構成が似た上位k件を返す関数（自身は除く、prefectureで絞り込み可）"""
+        position = self.position(code)
+        if position is None:
+            raise KeyError(f"類似検索の対象外の団体コードです: {code}")
+
+        scores = self.scores(position, metric)
+        scores[position] = -np.inf
+        if prefecture:
+            scores = np.where(self.table['都道府県名'].to_numpy() == prefecture, scores, -np.inf)
+
+        # 上位k件だけを部分ソートで取り出してから並べ替える
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return self.table.iloc[[]].assign(類似度=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self.table.iloc[top].assign(類似度=scores[top]).reset_index(drop=True)
@@ -0,0 +1,127 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 地球の平均半径（km）
+EARTH_RADIUS_KM = 6371.0088
+# 緯度1度あたりの距離（km）
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """2点間の大円距離（km）をベクトル化して計算する関数"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class GridSpatialIndex:
+    """緯度経度の格子による空間索引"""
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, cell_deg: float = 0.25):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.cell_deg = cell_deg
+
+        # 各点の格子番号で並べ替え、格子ごとの添字配列を作成
+        rows = np.floor(self.lats / cell_deg).astype(np.int64)
+        cols = np.floor(self.lngs / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        rows, cols = rows[order], cols[order]
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if len(order):
+            changes = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            for start, end in zip(np.r_[0, changes], np.r_[changes, len(order)]):
+                self.cells[(int(rows[start]), int(cols[start]))] = order[start:end]
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """範囲と重なる格子に含まれる点の添字を返す"""
+        row_range = range(int(np.floor(south / self.cell_deg)), int(np.floor(north / self.cell_deg)) + 1)
+        col_range = range(int(np.floor(west / self.cell_deg)), int(np.floor(east / self.cell_deg)) + 1)
+        # 範囲が格子数より広い場合は存在する格子だけを走査
+        if len(row_range) * len(col_range) > len(self.cells):
+            found = [
+                indices for (row, col), indices in self.cells.items()
+                if row in row_range and col in col_range
+            ]
+        else:
+            found = [
+                self.cells[(row, col)] for row in row_range for col in col_range
+                if (row, col) in self.cells
+            ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def query_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """矩形範囲内の点の添字を返す関数"""
+        candidates = self._candidates(south, west, north, east)
+        inside = (
+            (self.lats[candidates] >= south) & (self.lats[candidates] <= north)
+            & (self.lngs[candidates] >= west) & (self.lngs[candidates] <= east)
+        )
+        return np.sort(candidates[inside])
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """中心から半径内の点の添字と距離（近い順）を返す関数"""
+        dlat = radius_km / KM_PER_DEGREE
+        # 経度方向は高緯度側の縮みに合わせて広げる
+        max_lat = min(abs(lat) + dlat, 89.9)
+        dlng = min(dlat / np.cos(np.radians(max_lat)), 180.0)
+
+        candidates = self._candidates(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+
+    def query_knn(self, lat: float, lng: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """中心に近い順にk件の点の添字と距離を返す関数"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # 格子1つ分から始めて、k件見つかるまで半径を倍にする（半径検索は厳密なので結果も厳密）
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        while True:
+            indices, distances = self.query_radius(lat, lng, radius_km)
+            if len(indices) >= k or radius_km > np.pi * EARTH_RADIUS_KM:
+                return indices[:k], distances[:k]
+            radius_km *= 2
+
+class MunicipalitySpatialIndex:
+    """座標付きの市区町村（結合表の行）に対する空間索引"""
+
+    def __init__(self, join_table: pd.DataFrame, cell_deg: float = 0.25):
+        self.rows = join_table[join_table['lat'].notna() & join_table['lng'].notna()].reset_index(drop=True)
+        self.grid = GridSpatialIndex(self.rows['lat'].to_numpy(), self.rows['lng'].to_numpy(), cell_deg)
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> pd.DataFrame:
+        """半径内の市区町村を距離付きで返す関数"""
+        indices, distances = self.grid.query_radius(lat, lng, radius_km)
+        return self._with_distance(indices, distances)
+
+    def nearest(self, lat: float, lng: float, k: int) -> pd.DataFrame:
+        """最寄りのk市区町村を距離付きで返す関数"""
+        indices, distances = self.grid.query_knn(lat, lng, k)
+        return self._with_distance(indices, distances)
+
+    def nearest_to_code(self, code: str, k: int) -> pd.DataFrame:
+        """指定した市区町村に近いk市区町村（自身を除く）を返す関数"""
+        match = self.rows.index[self.rows['団体コード'] == code]
+        if len(match) == 0:
+            return self._with_distance(np.empty(0, dtype=np.int64), np.empty(0))
+        origin = self.rows.loc[match[0]]
+        result = self.nearest(origin['lat'], origin['lng'], k + 1)
+        return result[result['団体コード'] != code].head(k)
+
+    def within_bbox(self, south: float, west: float, north: float, east: float) -> pd.DataFrame:
+        """矩形範囲内の市区町村を返す関数"""
+        return self.rows.iloc[self.grid.query_bbox(south, west, north, east)]
+
+    def _with_distance(self, indices: np.ndarray, distances: np.ndarray) -> pd.DataFrame:
+        result = self.rows.iloc[indices].copy()
+        result['距離(km)'] = distances
+        return result
@@ -3,6 +3,8 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, Any
 from app.dashboard.utils.constants import AGE_ORDER, GRAPH_COLORS
+from app.dashboard.utils.data_loader import clean_data
+from app.dashboard.utils.validation import print_validation_report, validate_population_data
 from app.dashboard.data.loader import (
     load_population_data,
     get_municipalities_by_prefecture,
@@ -107,20 +109,18 @@ def test_data_filtering(df: pd.DataFrame) -> None:
         print(f"エラーが発生しました: {str(e)}")
 
 def test_data_cleaning(df: pd.DataFrame) -> None:
-    """データクリーニング処理をテストする関数"""
+    """データクリーニング処理をテストする関数（品質の検証は全行まとめてvalidate_population_dataで行う）"""
     print("\n=== データクリーニングテスト ===")
     try:
         # クリーニング前の状態
         print("クリーニング前:")
         print(f"- 総行数: {len(df)}")
-        print(f"- 欠損値を含む行数: {len(df[df.isnull().any(axis=1)])}")
-        
-        # 団体コードの形式チェック
-        invalid_codes = df[~df['団体コード'].str.match(r'^\d{6}$')]
-        print(f"- 不正な形式の団体コード数: {len(invalid_codes)}")
-        if len(invalid_codes) > 0:
-            print("不正な団体コードの例:")
-            print(invalid_codes['団体コード'].head())
+        print(f"- 欠損値を含む行数: {int(df.isnull().any(axis=1).sum())}")
+        
+        # 団体コードの形式・検査数字、合計の整合性、重複、負の値、欠損値の検証
+        report = validate_population_data(clean_data(df))
+        print("\nクリーニング後の検証:")
+        print_validation_report(report)
         
     except Exception as e:
         print(f"エラーが発生しました: {str(e)}")
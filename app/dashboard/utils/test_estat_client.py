@@ -0,0 +1,128 @@
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.dashboard.utils.constants import POPULATION_COLUMNS
+from app.dashboard.utils.estat_client import EstatClient, HttpCache, normalize_stats_data
+from app.dashboard.utils.estat_stub import RecordedResponses, start_stub_server, stub_base_url
+
+STATS_DATA_ID = '0000000001'
+# 地域（三重県・津市）×男女（総数・男・女）×年齢（総数＋21区分）の132件
+AREAS = {'24000': '三重県', '24201': '三重県 津市'}
+SEXES = {'100': '総数', '110': '男', '120': '女'}
+AGES = {f"{i:03d}": '総数' if i == 0 else column.replace('～', '-') for i, column in enumerate(POPULATION_COLUMNS)}
+
+def recorded_table() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """記録した統計表（分類の定義と値の一覧）を作る関数（男+女=総数、年齢の合計=総数になる値）"""
+    class_objs = [
+        {'@id': 'area', '@name': '地域', 'CLASS': [{'@code': c, '@name': n} for c, n in AREAS.items()]},
+        {'@id': 'cat01', '@name': '男女別', 'CLASS': [{'@code': c, '@name': n} for c, n in SEXES.items()]},
+        {'@id': 'cat02', '@name': '年齢5歳階級', 'CLASS': [{'@code': c, '@name': n} for c, n in AGES.items()]},
+    ]
+    values = []
+    for i, area in enumerate(AREAS):
+        buckets = {
+            '110': [(i + 1) * 100 + j for j in range(1, len(AGES))],
+            '120': [(i + 1) * 110 + j for j in range(1, len(AGES))],
+        }
+        buckets['100'] = [male + female for male, female in zip(buckets['110'], buckets['120'])]
+        for sex in SEXES:
+            counts = [sum(buckets[sex]), *buckets[sex]]
+            for age, count in zip(AGES, counts):
+                values.append({'@area': area, '@cat01': sex, '@cat02': age, '@time': '2024000000', '$': str(count)})
+    return class_objs, values
+
+def record_pages(responses: RecordedResponses, page_size: int) -> None:
+    """統計表をpage_size件ずつのページに分けて、EstatClientが送るリクエストの応答として記録する関数"""
+    class_objs, values = recorded_table()
+    for start in range(1, len(values) + 1, page_size):
+        params = {'statsDataId': STATS_DATA_ID, 'limit': page_size, 'startPosition': start}
+        data: Dict[str, Any] = {
+            'RESULT_INF': {'TOTAL_NUMBER': len(values)},
+            'DATA_INF': {'VALUE': values[start - 1:start - 1 + page_size]},
+        }
+        if start == 1:
+            data['CLASS_INF'] = {'CLASS_OBJ': class_objs}
+        else:
+            params['metaGetFlg'] = 'N'
+        body = {'GET_STATS_DATA': {'RESULT': {'STATUS': 0}, 'STATISTICAL_DATA': data}}
+        responses.add('getStatsData', {k: str(v) for k, v in params.items()}, json.dumps(body, ensure_ascii=False))
+
+def create_client(server, cache_dir: str, **kwargs: Any) -> EstatClient:
+    """スタブサーバーに接続し、一時ディレクトリにキャッシュするクライアントを作る関数"""
+    return EstatClient(app_id='test', base_url=stub_base_url(server), cache=HttpCache(Path(cache_dir)), **kwargs)
+
+def test_paging() -> None:
+    """startPositionを指定して複数ページに分けて取得できることをテストする関数"""
+    responses = RecordedResponses()
+    record_pages(responses, 50)
+    server = start_stub_server(responses, port=0)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = create_client(server, cache_dir, page_size=50, rate=0)
+            class_objs, values = client.get_stats_data(STATS_DATA_ID)
+        assert len(class_objs) == 3
+        assert values == recorded_table()[1]
+        assert client.counts['リクエスト'] == 3
+        assert server.state.statuses[200] == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_retry_after() -> None:
+    """429（Retry-After）を受けた場合に、待ってから再試行することをテストする関数"""
+    responses = RecordedResponses()
+    record_pages(responses, 66)
+    # 1秒あたり1件を超えると429を返す
+    server = start_stub_server(responses, port=0, rate_limit=1)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = create_client(server, cache_dir, page_size=66, rate=0)
+            _, values = client.get_stats_data(STATS_DATA_ID)
+        assert len(values) == len(recorded_table()[1])
+        assert server.state.statuses[429] >= 1
+        assert client.counts['再試行'] == server.state.statuses[429]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_revalidation() -> None:
+    """期限切れのキャッシュをETagで確認し、304なら保存済みの応答を使うことをテストする関数"""
+    responses = RecordedResponses()
+    record_pages(responses, 200)
+    server = start_stub_server(responses, port=0)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = create_client(server, cache_dir, page_size=200, rate=0, max_age=0)
+            _, first = client.get_stats_data(STATS_DATA_ID)
+            _, second = client.get_stats_data(STATS_DATA_ID)
+        assert first == second
+        assert client.counts['再検証'] == 1
+        assert server.state.statuses[200] == 1
+        assert server.state.statuses[304] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_normalize_stats_data() -> None:
+    """記録した統計表を、load_excel_dataと同じ列・型の人口データにできることをテストする関数"""
+    df = normalize_stats_data(*recorded_table())
+    assert df.columns.tolist() == ['団体コード', '都道府県名', '市区町村名', '性別', *POPULATION_COLUMNS]
+    assert all(str(df[col].dtype) == 'int64' for col in POPULATION_COLUMNS)
+    # 団体コードは5桁の地域コードに検査数字を付けた6桁
+    assert df['団体コード'].tolist() == ['240001'] * 3 + ['242012'] * 3
+    assert df['市区町村名'].tolist() == ['三重県'] * 3 + ['津市'] * 3
+    assert df['性別'].tolist() == ['計', '男', '女'] * 2
+    assert (df['総数'] == df[POPULATION_COLUMNS[1:]].sum(axis=1)).all()
+
+def run_all_tests() -> None:
+    """全てのテストを実行する関数"""
+    test_paging()
+    test_retry_after()
+    test_revalidation()
+    test_normalize_stats_data()
+    print("\n=== 全てのテストが完了しました ===")
+
+if __name__ == "__main__":
+    run_all_tests()
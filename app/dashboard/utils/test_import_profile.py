@@ -0,0 +1,39 @@
+from importlib.util import find_spec
+
+import pytest
+
+from app.dashboard.utils.import_profile import DEFERRED_MODULES, IMPORT_BUDGETS_MS, check_import_budget
+
+# ダッシュボード本体はデータ読み込みモジュール（app.dashboard.data.loader）がなければ起動できない
+DASHBOARD_IMPORTABLE = find_spec('app.dashboard.data') is not None
+
+def assert_import_budget(module: str) -> None:
+    """モジュールの読み込み時間が上限内で、遅延読み込みすべきライブラリを読み込んでいないことを確認する関数"""
+    problems = check_import_budget(module, IMPORT_BUDGETS_MS[module], DEFERRED_MODULES.get(module))
+    assert not problems, "\n".join(problems)
+
+@pytest.mark.skipif(not DASHBOARD_IMPORTABLE, reason='app.dashboard.data.loaderがないため、ダッシュボード本体を読み込めない')
+def test_dashboard_import_budget() -> None:
+    """ダッシュボード本体の起動時の読み込み時間をテストする関数"""
+    assert_import_budget('app.dashboard.main')
+
+def test_utility_import_budgets() -> None:
+    """起動時に読み込むユーティリティの読み込み時間をテストする関数"""
+    for module in ('app.dashboard.utils.geo_join', 'app.dashboard.utils.tile_server', 'app.dashboard.utils.warmup'):
+        assert_import_budget(module)
+
+def test_command_import_budgets() -> None:
+    """データ作成用のコマンドの起動時の読み込み時間をテストする関数"""
+    for module in ('build_data', 'create_coordinates_json', 'create_boundaries_json', 'download_gml'):
+        assert_import_budget(module)
+
+def run_all_tests() -> None:
+    """全てのテストを実行する関数"""
+    if DASHBOARD_IMPORTABLE:
+        test_dashboard_import_budget()
+    test_utility_import_budgets()
+    test_command_import_budgets()
+    print("\n=== 全てのテストが完了しました ===")
+
+if __name__ == "__main__":
+    run_all_tests()
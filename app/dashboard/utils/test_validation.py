@@ -0,0 +1,126 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.dashboard.utils.constants import POPULATION_COLUMNS
+from app.dashboard.utils.validation import DataValidationError, validate_population_data
+
+# 三重県・津市・四日市市の計・男・女（年齢の合計=総数、男+女=計になる値）
+MUNICIPALITIES = [('240001', '三重県'), ('242012', '津市'), ('242021', '四日市市')]
+
+def population_frame() -> pd.DataFrame:
+    """問題のない人口データを作る関数"""
+    rows = []
+    for i, (code, name) in enumerate(MUNICIPALITIES):
+        male = [(i + 1) * 100 + j for j in range(1, len(POPULATION_COLUMNS))]
+        female = [(i + 1) * 110 + j for j in range(1, len(POPULATION_COLUMNS))]
+        total = [m + f for m, f in zip(male, female)]
+        for sex, buckets in (('計', total), ('男', male), ('女', female)):
+            rows.append([code, '三重県', name, sex, sum(buckets), *buckets])
+    return pd.DataFrame(rows, columns=['団体コード', '都道府県名', '市区町村名', '性別', *POPULATION_COLUMNS])
+
+def failed_counts(df: pd.DataFrame) -> Dict[str, int]:
+    """件数が1件以上のチェックと件数を返す関数"""
+    report = validate_population_data(df)
+    return {check['チェック']: check['件数'] for check in report['チェック'] if check['件数']}
+
+def failed_examples(df: pd.DataFrame, name: str) -> List[Dict[str, Any]]:
+    """チェックで問題のあった行の例を返す関数"""
+    report = validate_population_data(df)
+    return next(check['例'] for check in report['チェック'] if check['チェック'] == name)
+
+def test_valid_frame() -> None:
+    """問題のないデータでは、どのチェックも0件になることをテストする関数"""
+    report = validate_population_data(population_frame())
+    assert report['行数'] == 9
+    assert report['問題のある行数'] == 0
+    assert failed_counts(population_frame()) == {}
+
+def test_code_format() -> None:
+    """6桁のASCII数字でない団体コード（全角数字を含む）を検出することをテストする関数"""
+    df = population_frame()
+    df.loc[0, '団体コード'] = '24000'
+    df.loc[3, '団体コード'] = '２４２０１２'
+    assert failed_counts(df) == {'団体コードの形式': 2}
+
+def test_check_digit() -> None:
+    """検査数字が誤った団体コードを検出することをテストする関数"""
+    df = population_frame()
+    df.loc[df['団体コード'] == '242012', '団体コード'] = '242013'
+    counts = failed_counts(df)
+    assert counts == {'検査数字': 3}
+    assert {item['市区町村名'] for item in failed_examples(df, '検査数字')} == {'津市'}
+
+def test_bucket_sum() -> None:
+    """年齢の合計が総数と一致しない行を検出することをテストする関数"""
+    df = population_frame()
+    df.loc[1, '総数'] += 5
+    counts = failed_counts(df)
+    assert counts['年齢の合計と総数'] == 1
+    # 男の総数を変えたため、男+女と計の比較でも計の行が不一致になる
+    assert counts['男女の合計と計'] == 1
+
+def test_sex_total() -> None:
+    """男+女が計と一致しない行を、計の行で検出することをテストする関数"""
+    df = population_frame()
+    row = (df['団体コード'] == '242021') & (df['性別'] == '計')
+    df.loc[row, ['総数', '0歳～4歳']] += 1
+    assert failed_counts(df) == {'男女の合計と計': 1}
+    assert failed_examples(df, '男女の合計と計')[0]['性別'] == '計'
+
+def test_duplicates() -> None:
+    """同じ団体コード・性別の行を重複として検出することをテストする関数"""
+    df = population_frame()
+    df = pd.concat([df, df.iloc[[4]]], ignore_index=True)
+    assert failed_counts(df) == {'団体コード・性別の重複': 2}
+
+def test_duplicates_by_source() -> None:
+    """複数の出典を結合した表では、出典ごとに重複と男女の合計を判定することをテストする関数"""
+    first, second = population_frame(), population_frame()
+    second[POPULATION_COLUMNS] = second[POPULATION_COLUMNS] * 2
+    combined = pd.concat([first.assign(出典='2023年'), second.assign(出典='2024年')], ignore_index=True)
+    assert failed_counts(combined) == {}
+
+    combined = pd.concat([combined, combined.iloc[[0]]], ignore_index=True)
+    assert failed_counts(combined) == {'団体コード・性別の重複': 2}
+
+def test_negative_and_missing() -> None:
+    """負の値と欠損値（人口・キーの列）を検出することをテストする関数"""
+    df = population_frame()
+    df[POPULATION_COLUMNS] = df[POPULATION_COLUMNS].astype(float)
+    df.loc[2, ['総数', '0歳～4歳']] -= 1000
+    df.loc[5, '5歳～9歳'] = np.nan
+    df.loc[7, '市区町村名'] = None
+    counts = failed_counts(df)
+    assert counts['負の値'] == 1
+    assert counts['欠損値'] == 2
+    assert {item['団体コード'] for item in failed_examples(df, '欠損値')} == {'242012', '242021'}
+
+def test_strict() -> None:
+    """strict=Trueの場合に、問題があればDataValidationErrorを送出することをテストする関数"""
+    validate_population_data(population_frame(), strict=True)
+
+    df = population_frame()
+    df.loc[0, '団体コード'] = '240002'
+    with pytest.raises(DataValidationError) as excinfo:
+        validate_population_data(df, strict=True)
+    assert excinfo.value.report['問題のある行数'] == 1
+    assert '検査数字' in str(excinfo.value)
+
+def run_all_tests() -> None:
+    """全てのテストを実行する関数"""
+    test_valid_frame()
+    test_code_format()
+    test_check_digit()
+    test_bucket_sum()
+    test_sex_total()
+    test_duplicates()
+    test_duplicates_by_source()
+    test_negative_and_missing()
+    test_strict()
+    print("\n=== 全てのテストが完了しました ===")
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,115 @@
+import gzip
+import os
+import re
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from app.dashboard.utils.vector_tiles import TILES_DIR
+
+DEFAULT_HOST = os.environ.get('ESTAT_TILE_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('ESTAT_TILE_PORT', '8765'))
+# ブラウザから見たタイルのURL（別ホストから配信する場合に上書き）
+TILE_URL_TEMPLATE = os.environ.get(
+    'ESTAT_TILE_URL',
+    f"http://localhost:{DEFAULT_PORT}/tiles/{{z}}/{{x}}/{{y}}.json"
+)
+
+# タイルは作り直すまで変わらないため、ブラウザに長くキャッシュさせる
+CACHE_CONTROL = 'public, max-age=86400'
+EMPTY_TILE = b'{"extent":4096,"features":[]}'
+TILE_PATH_PATTERN = re.compile(r'^/tiles/(\d+)/(\d+)/(\d+)\.json$')
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    """z/x/yのタイルを返すHTTPハンドラ"""
+
+    def __init__(self, *args, tiles_dir: Path = TILES_DIR, **kwargs):
+        self.tiles_dir = tiles_dir
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        match = TILE_PATH_PATTERN.match(self.path.split('?')[0])
+        if not match:
+            self.send_error(404, 'Not Found')
+            return
+
+        z, x, y = match.groups()
+        tile_path = self.tiles_dir / z / x / f"{y}.json.gz"
+        if tile_path.exists():
+            stat = tile_path.stat()
+            etag = f'"{z}-{x}-{y}-{stat.st_size}-{int(stat.st_mtime)}"'
+        else:
+            etag = '"empty"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self._send_common_headers(etag)
+            self.end_headers()
+            return
+
+        # タイルはgzipで保存しているので、受け付けるクライアントにはそのまま返す
+        accepts_gzip = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if tile_path.exists():
+            body = tile_path.read_bytes()
+            if not accepts_gzip:
+                body = gzip.decompress(body)
+        else:
+            body = gzip.compress(EMPTY_TILE) if accepts_gzip else EMPTY_TILE
+
+        self.send_response(200)
+        self._send_common_headers(etag)
+        self.send_header('Content-Type', 'application/json')
+        if accepts_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_common_headers(self, etag: str):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        # 地図はStreamlitの別オリジンのiframeから読み込まれる
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def log_message(self, format, *args):
+        # アクセスごとのログは出さない
+        pass
+
+def create_tile_server(
+    tiles_dir: Path = TILES_DIR,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """タイルサーバーを作成する関数"""
+    handler = partial(TileRequestHandler, tiles_dir=tiles_dir)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_tile_server(
+    tiles_dir: Path = TILES_DIR,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """タイルサーバーをバックグラウンドのスレッドで起動する関数"""
+    server = create_tile_server(tiles_dir, host, port)
+    thread = threading.Thread(target=server.serve_forever, name='tile-server', daemon=True)
+    thread.start()
+    print(f"タイルサーバーを起動しました: http://{host}:{server.server_address[1]}/tiles/")
+    return server
+
+def main():
+    """タイルサーバーを起動する"""
+    server = create_tile_server()
+    print(f"タイルサーバーを起動しました: http://{DEFAULT_HOST}:{DEFAULT_PORT}/tiles/{{z}}/{{x}}/{{y}}.json")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("タイルサーバーを停止しました")
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard.utils.constants import POPULATION_COLUMNS
+from app.dashboard.utils.geo_join import CHECK_DIGIT_WEIGHTS
+
+# 1の場合は読み込み時の検証で問題があればエラーにする
+STRICT_VALIDATION = os.environ.get('ESTAT_STRICT_VALIDATION', '0') == '1'
+# 合計の比較で許容する差（人）
+SUM_TOLERANCE = 0.5
+# レポートに載せる問題のある行の例の件数
+EXAMPLE_ROWS = 10
+KEY_COLUMNS = ['団体コード', '都道府県名', '市区町村名', '性別']
+
+class DataValidationError(Exception):
+    """厳格モードの検証で問題が見つかった場合のエラー（reportに検証結果を持つ）"""
+
+    def __init__(self, report: Dict[str, Any]):
+        self.report = report
+        failed = [check['チェック'] for check in report['チェック'] if check['件数']]
+        super().__init__(f"データの検証で問題が見つかりました: {', '.join(failed)}")
+
+def check_digit_mask(codes: pd.Series) -> np.ndarray:
+    """6桁の団体コードの検査数字が正しい行のマスク（全行まとめて計算）"""
+    digits = np.frombuffer(codes.str.cat().encode('ascii'), dtype=np.uint8).reshape(-1, 6) - ord('0')
+    expected = (11 - (digits[:, :5] @ np.array(CHECK_DIGIT_WEIGHTS)) % 11) % 10
+    return expected == digits[:, 5]
+
+def sex_total_mismatch(df: pd.DataFrame, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """男+女が計と一致しない「計」の行のマスク（男・女・計がそろう行のみ比較）"""
+    sexes = df['性別'].astype(str).str.strip().to_numpy()
+    codes = df['団体コード'].astype(str)
+    if '出典' in df.columns:
+        # 複数のワークブックを結合した表は、出典ごとに男・女・計を組み合わせる
+        codes = codes + '|' + df['出典'].astype(str)
+    codes = codes.to_numpy()
+    positions = {}
+    for sex in ('計', '男', '女'):
+        rows = np.flatnonzero(sexes == sex)
+        by_code = pd.Series(rows, index=codes[rows])
+        positions[sex] = by_code[~by_code.index.duplicated()]
+
+    totals = positions['計']
+    male = positions['男'].reindex(totals.index)
+    female = positions['女'].reindex(totals.index)
+    complete = (male.notna() & female.notna()).to_numpy()
+
+    mismatch = np.zeros(len(df), dtype=bool)
+    total_rows = totals.to_numpy()[complete]
+    difference = (
+        values[male.to_numpy()[complete].astype(int)]
+        + values[female.to_numpy()[complete].astype(int)]
+        - values[total_rows]
+    )
+    with np.errstate(invalid='ignore'):
+        mismatch[total_rows] = (np.abs(difference) > tolerance).any(axis=1)
+    return mismatch
+
+def validate_population_data(
+    df: pd.DataFrame,
+    strict: bool = False,
+    tolerance: float = SUM_TOLERANCE
+) -> Dict[str, Any]:
+    """人口データの品質を検証する関数（各チェックは全行まとめて1度に計算する）
+
+    チェック: 団体コードの形式・検査数字、年齢の合計と総数、男+女と計、団体コード・性別の重複、負の値、欠損値。
+    strict=Trueの場合は、問題があればDataValidationErrorを送出する。
+    """
+    started = time.perf_counter()
+    codes = df['団体コード'].astype(str)
+    values = df[POPULATION_COLUMNS].to_numpy(dtype=float)
+
+    # \dは全角数字にも一致するため、ASCIIの数字に限定する
+    format_ok = codes.str.fullmatch(r'[0-9]{6}').fillna(False).to_numpy(dtype=bool)
+    check_digit_ok = np.ones(len(df), dtype=bool)
+    if format_ok.any():
+        check_digit_ok[format_ok] = check_digit_mask(codes[format_ok])
+
+    # 複数のワークブックを結合した表は、出典ごとに重複を判定する
+    duplicate_keys = ['出典', '団体コード', '性別'] if '出典' in df.columns else ['団体コード', '性別']
+    missing = np.isnan(values).any(axis=1) | df[KEY_COLUMNS].isna().any(axis=1).to_numpy()
+    with np.errstate(invalid='ignore'):
+        negative = (values < 0).any(axis=1)
+        bucket_mismatch = np.abs(values[:, 1:].sum(axis=1) - values[:, 0]) > tolerance
+
+    checks = {
+        '団体コードの形式': ~format_ok,
+        '検査数字': ~check_digit_ok,
+        '年齢の合計と総数': bucket_mismatch,
+        '男女の合計と計': sex_total_mismatch(df, values, tolerance),
+        '団体コード・性別の重複': df.duplicated(duplicate_keys, keep=False).to_numpy(),
+        '負の値': negative,
+        '欠損値': missing,
+    }
+
+    # 問題のある行の例は、該当する行だけをあとから取り出す
+    keys = df[KEY_COLUMNS].to_numpy(dtype=object)
+    results: List[Dict[str, Any]] = []
+    for name, mask in checks.items():
+        failed = np.flatnonzero(mask)
+        results.append({
+            'チェック': name,
+            '件数': int(len(failed)),
+            '例': [
+                {col: None if pd.isna(value) else value for col, value in zip(KEY_COLUMNS, keys[i])}
+                for i in failed[:EXAMPLE_ROWS]
+            ]
+        })
+
+    report = {
+        '行数': len(df),
+        '問題のある行数': int(np.logical_or.reduce(list(checks.values())).sum()) if len(df) else 0,
+        'チェック': results,
+        '所要時間(ms)': (time.perf_counter() - started) * 1000,
+    }
+    if strict and report['問題のある行数']:
+        raise DataValidationError(report)
+    return report
+
+def check_population_data(df: pd.DataFrame, strict: Optional[bool] = None) -> Dict[str, Any]:
+    """読み込み時にデータを検証し、問題があれば件数を表示する関数
+
+    strict（未指定は環境変数ESTAT_STRICT_VALIDATION）がTrueの場合は、問題があればDataValidationErrorを送出する。
+    """
+    report = validate_population_data(df, strict=STRICT_VALIDATION if strict is None else strict)
+    if report['問題のある行数']:
+        failed = [f"{check['チェック']} {check['件数']:,}件" for check in report['チェック'] if check['件数']]
+        print(f"データの検証で問題が見つかりました（{report['問題のある行数']:,}行）: {', '.join(failed)}")
+    return report
+
+def print_validation_report(report: Dict[str, Any]) -> None:
+    """検証結果のレポートを表示する関数"""
+    print(f"検証した行数: {report['行数']:,}行（{report['所要時間(ms)']:.1f}ms）")
+    print(f"問題のある行数: {report['問題のある行数']:,}行")
+    for check in report['チェック']:
+        print(f"- {check['チェック']}: {check['件数']:,}件")
+        for item in check['例']:
+            print(f"    {item['都道府県名']} {item['市区町村名']} {item['性別']} ({item['団体コード']})")
+
+def main():
+    """人口データを検証してレポートを表示する
+
+    使い方: python -m app.dashboard.utils.validation [Excelファイル] [--strict]
+    """
+    from app.dashboard.utils.data_loader import clean_data, load_excel_data
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    excel_path = Path(args[0]) if args else Path('data/24nsnen.xlsx')
+    if not excel_path.exists():
+        print(f"エラー: {excel_path} が見つかりません")
+        sys.exit(1)
+
+    report = validate_population_data(clean_data(load_excel_data(excel_path, validate=False)))
+    print_validation_report(report)
+    if '--strict' in sys.argv and report['問題のある行数']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import gzip
+import json
+import math
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.dashboard.utils.boundaries import BOUNDARIES_PATH, BoundaryStore
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+TILES_DIR = DATA_DIR / 'tiles'
+
+# タイル内座標の範囲（MVTと同じ4096）
+TILE_EXTENT = 4096
+# 隣接タイルとの継ぎ目が見えないよう、タイル外側にも少し描く
+TILE_BUFFER = 64
+MIN_ZOOM = 4
+MAX_ZOOM = 10
+
+def zoom_level_name(zoom: int) -> str:
+    """ズームごとに使う境界データの解像度"""
+    if zoom <= 6:
+        return 'low'
+    if zoom <= 8:
+        return 'medium'
+    return 'high'
+
+def project(coords: np.ndarray, zoom: int) -> np.ndarray:
+    """経度緯度をWebメルカトルの全体座標（タイル単位×TILE_EXTENT）に変換する関数"""
+    world = TILE_EXTENT * (2 ** zoom)
+    lng, lat = coords[:, 0], np.clip(coords[:, 1], -85.05112878, 85.05112878)
+    x = (lng + 180.0) / 360.0 * world
+    sin_lat = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * world
+    return np.stack([x, y], axis=1)
+
+def clip_ring(points: List[Tuple[float, float]], low: float, high: float) -> List[Tuple[float, float]]:
+    """Sutherland-Hodgman法でリングを正方形（low〜high）に切り抜く関数"""
+    def clip(points, axis, bound, keep_greater):
+        if not points:
+            return []
+        inside = (lambda p: p[axis] >= bound) if keep_greater else (lambda p: p[axis] <= bound)
+        result = []
+        previous = points[-1]
+        for current in points:
+            if inside(current) != inside(previous):
+                t = (bound - previous[axis]) / (current[axis] - previous[axis])
+                crossing = [previous[0] + t * (current[0] - previous[0]), previous[1] + t * (current[1] - previous[1])]
+                crossing[axis] = bound
+                result.append(tuple(crossing))
+            if inside(current):
+                result.append(current)
+            previous = current
+        return result
+
+    for axis in (0, 1):
+        points = clip(points, axis, low, True)
+        points = clip(points, axis, high, False)
+    return points
+
+def build_tile_pyramid(
+    store: BoundaryStore,
+    output_dir: Path = TILES_DIR,
+    min_zoom: int = MIN_ZOOM,
+    max_zoom: int = MAX_ZOOM
+) -> Dict[int, int]:
+    """境界データをz/x/yのタイル（gzip圧縮したJSON）に切り出す関数"""
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+
+    tile_counts = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        level = zoom_level_name(zoom)
+        if level not in store.level_names:
+            level = store.level_names[-1]
+        tiles: Dict[Tuple[int, int], List[Dict]] = defaultdict(list)
+
+        for code, obj in store.objects.items():
+            # 区を融合した政令指定都市の形状は区と重なるため、タイルには区の形状だけを入れる
+            if 'wards' in obj:
+                continue
+            geometry = store.geometry(code, level)
+            if geometry is None:
+                continue
+            rings = [project(np.asarray(ring, dtype=float), zoom) for polygon in geometry['coordinates'] for ring in polygon]
+            all_points = np.concatenate(rings)
+            min_tile = np.floor((all_points.min(axis=0) - TILE_BUFFER) / TILE_EXTENT).astype(int)
+            max_tile = np.floor((all_points.max(axis=0) + TILE_BUFFER) / TILE_EXTENT).astype(int)
+
+            # 地物の外接矩形にかかるタイルだけを切り抜く
+            for tx in range(min_tile[0], max_tile[0] + 1):
+                for ty in range(min_tile[1], max_tile[1] + 1):
+                    origin = np.array([tx * TILE_EXTENT, ty * TILE_EXTENT], dtype=float)
+                    clipped = []
+                    for ring in rings:
+                        local = [tuple(p) for p in (ring - origin).tolist()]
+                        part = clip_ring(local, -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER)
+                        if len(part) >= 3:
+                            rounded = np.round(np.asarray(part)).astype(int).tolist()
+                            clipped.append(rounded)
+                    if clipped:
+                        tiles[(tx, ty)].append({'code': code, 'rings': clipped})
+
+        for (tx, ty), features in tiles.items():
+            tile_path = output_dir / str(zoom) / str(tx) / f"{ty}.json.gz"
+            tile_path.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({'extent': TILE_EXTENT, 'features': features}, separators=(',', ':'))
+            with gzip.open(tile_path, 'wt', encoding='utf-8', compresslevel=9) as f:
+                f.write(payload)
+        tile_counts[zoom] = len(tiles)
+        print(f"ズーム{zoom}（{level}）: {len(tiles):,}タイル")
+
+    # タイルの作成条件を記録（サーバーとクライアントが参照）
+    with open(output_dir / 'metadata.json', 'w', encoding='utf-8') as f:
+        json.dump({'minzoom': min_zoom, 'maxzoom': max_zoom, 'extent': TILE_EXTENT, 'tiles': tile_counts}, f)
+    return tile_counts
+
+def load_tile_metadata(tiles_dir: Path = TILES_DIR) -> Optional[Dict]:
+    """タイルの作成条件を読み込む関数（未作成の場合はNone）"""
+    metadata_path = tiles_dir / 'metadata.json'
+    if not metadata_path.exists():
+        return None
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    """境界データからタイルを作成する"""
+    if not BOUNDARIES_PATH.exists():
+        print(f"エラー: {BOUNDARIES_PATH} が見つかりません。先に create_boundaries_json.py を実行してください")
+        return
+    store = BoundaryStore.load(BOUNDARIES_PATH)
+    counts = build_tile_pyramid(store)
+    print(f"\nタイル作成完了: {TILES_DIR}（合計 {sum(counts.values()):,}タイル）")
+
+if __name__ == '__main__':
+    main()
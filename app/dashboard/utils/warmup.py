@@ -0,0 +1,147 @@
+import importlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# 初回表示で読み込まれる重いライブラリ
+HEAVY_MODULES = ['folium', 'streamlit_folium', 'plotly.express', 'plotly.graph_objects', 'branca.colormap']
+
+class WarmupRegistry:
+    """起動時に各データを並行して読み込み、準備状況を管理する
+
+    読み込み中のデータを要求された場合は、新たに読み込まずに完了を待つ。
+    読み込みに失敗したデータは、次に要求された時に読み込み直す。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._loaders: Dict[str, Callable[['WarmupRegistry'], Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._started_at: Dict[str, float] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, name: str, loader: Callable[['WarmupRegistry'], Any]) -> None:
+        """読み込み処理を登録する関数（処理は依存するデータをget()で取得できる）"""
+        with self._lock:
+            self._loaders[name] = loader
+
+    def start(self) -> 'WarmupRegistry':
+        """登録済みの全データの読み込みを開始する関数"""
+        for name in list(self._loaders):
+            self._submit(name)
+        return self
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """データを取得する関数（読み込み中なら完了を待ち、未開始なら開始する）"""
+        return self._submit(name).result(timeout=timeout)
+
+    def is_ready(self, name: str) -> bool:
+        """データの読み込みが完了しているかを返す関数"""
+        future = self._futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def status(self) -> List[Dict[str, Any]]:
+        """データごとの準備状況を返す関数"""
+        rows = []
+        for name in self._loaders:
+            future = self._futures.get(name)
+            if future is None:
+                state, message = '未開始', ''
+            elif not future.done():
+                state, message = '読み込み中', ''
+            elif future.exception() is not None:
+                state, message = '失敗', str(future.exception())
+            else:
+                state, message = '完了', ''
+
+            started = self._started_at.get(name)
+            finished = self._finished_at.get(name)
+            elapsed = None
+            if started is not None:
+                elapsed = (finished or time.perf_counter()) - started
+            rows.append({'データ': name, '状態': state, '所要時間(秒)': elapsed, 'メッセージ': message})
+        return rows
+
+    def _submit(self, name: str) -> Future:
+        with self._lock:
+            future = self._futures.get(name)
+            # 一時的な失敗（ファイルのコピー中など）が残り続けないよう、失敗した読み込みは再実行する
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+            if name not in self._loaders:
+                raise KeyError(f"未登録のデータです: {name}")
+            if self._executor is None:
+                # 依存データを待つ処理があっても詰まらないよう、データ数分のスレッドを用意
+                workers = self.max_workers or max(len(self._loaders), 1)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='warmup')
+            future = self._executor.submit(self._run, name)
+            self._futures[name] = future
+            return future
+
+    def _run(self, name: str) -> Any:
+        self._started_at[name] = time.perf_counter()
+        try:
+            return self._loaders[name](self)
+        finally:
+            self._finished_at[name] = time.perf_counter()
+
+def import_heavy_modules(_registry: WarmupRegistry) -> List[str]:
+    """初回表示で使うライブラリを先に読み込む関数"""
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+    return HEAVY_MODULES
+
+def create_dashboard_warmup(excel_path: str) -> WarmupRegistry:
+    """ダッシュボードで使うデータの読み込み処理を登録する関数"""
+    from app.dashboard.data.loader import load_population_data
+    from app.dashboard.utils.cache import file_digest
+    from app.dashboard.utils.clustering import get_age_profile_clusters
+    from app.dashboard.utils.geo_join import load_geo_join_table
+    from app.dashboard.utils.shared_arrays import attach_population_arrays
+    from app.dashboard.utils.shared_dataset import load_shared_dataset
+    from app.dashboard.utils.spatial_index import MunicipalitySpatialIndex
+
+    def load_population(r):
+        # 別プロセスが公開した配列があれば、Excelを解析せずにメモリマップで共有する
+        attached = r.get('shared_arrays')
+        if attached:
+            return load_shared_dataset(excel_path, lambda path: attached[0], lambda: attached[3])
+        return load_shared_dataset(excel_path, load_population_data)
+
+    def load_join_table(r):
+        attached = r.get('shared_arrays')
+        if attached:
+            return attached[1], attached[2]
+        return load_geo_join_table(r.get('population').view())
+
+    registry = WarmupRegistry()
+    registry.register('shared_arrays', lambda r: attach_population_arrays(file_digest(excel_path)))
+    registry.register('population', load_population)
+    registry.register('join_table', load_join_table)
+    registry.register('rollup', lambda r: r.get('population').rollup)
+    registry.register('pyramids', lambda r: r.get('population').pyramids)
+    registry.register('similarity', lambda r: r.get('population').similarity)
+    registry.register('rankings', lambda r: r.get('population').rankings)
+    registry.register('clusters', lambda r: get_age_profile_clusters(r.get('population')))
+    registry.register('spatial_index', lambda r: MunicipalitySpatialIndex(r.get('join_table')[0]))
+    registry.register('libraries', import_heavy_modules)
+    return registry
+
+# プロセス全体で共有する読み込み状況
+_dashboard_warmup: Optional[WarmupRegistry] = None
+_dashboard_warmup_lock = threading.Lock()
+
+def start_dashboard_warmup(excel_path: str) -> WarmupRegistry:
+    """プロセスで1度だけ読み込みを開始し、以降は同じ読み込み状況を返す関数"""
+    global _dashboard_warmup
+    with _dashboard_warmup_lock:
+        if _dashboard_warmup is None:
+            _dashboard_warmup = create_dashboard_warmup(excel_path).start()
+        return _dashboard_warmup
+
+def get_dashboard_warmup() -> Optional[WarmupRegistry]:
+    """開始済みの読み込み状況を返す関数（未開始の場合はNone）"""
+    return _dashboard_warmup
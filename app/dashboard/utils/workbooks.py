@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from app.dashboard.utils.data_loader import clean_data, load_excel_data
+
+# 出典（どのワークブックの行か）を表す列
+SOURCE_COLUMNS = ['出典', '年', '区分']
+# ファイル名の規則（例: 24nsnen.xlsx は2024年の総計）
+WORKBOOK_NAME_PATTERN = re.compile(r'(\d{2})n([sjg])nen')
+VARIANT_CODES = {'s': '総計', 'j': '日本人', 'g': '外国人'}
+
+class WorkbookSource:
+    """読み込むワークブック1件と、その出典の情報"""
+
+    def __init__(self, path: Union[Path, str], year: Optional[int] = None, variant: Optional[str] = None,
+                 label: Optional[str] = None):
+        self.path = Path(path)
+        self.year = year
+        self.variant = variant or '総計'
+        self.label = label or (f"{year}年・{self.variant}" if year else f"{self.path.stem}・{self.variant}")
+
+    @classmethod
+    def from_path(cls, path: Union[Path, str]) -> 'WorkbookSource':
+        """ファイル名から年と区分を推定する関数（規則に合わない場合は年なし・総計とする）"""
+        match = WORKBOOK_NAME_PATTERN.search(Path(path).stem)
+        if match is None:
+            return cls(path)
+        return cls(path, 2000 + int(match.group(1)), VARIANT_CODES[match.group(2)])
+
+    def metadata(self) -> Dict[str, Any]:
+        return {'出典': self.label, '年': self.year, '区分': self.variant}
+
+def resolve_workbooks(pattern: Union[Path, str]) -> List[WorkbookSource]:
+    """globのパターンまたはマニフェスト（JSON）から、読み込むワークブックの一覧を作る関数
+
+    マニフェストは [{"path": "...", "年": 2024, "区分": "日本人", "出典": "..."}] の形式で、
+    pathはマニフェストのあるディレクトリからの相対パスでもよい。年・区分・出典は省略できる。
+    """
+    pattern = Path(pattern)
+    if pattern.suffix == '.json':
+        with open(pattern, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        sources = []
+        for entry in entries:
+            path = Path(entry['path'])
+            path = path if path.is_absolute() else pattern.parent / path
+            inferred = WorkbookSource.from_path(path)
+            sources.append(WorkbookSource(
+                path, entry.get('年', inferred.year), entry.get('区分', inferred.variant), entry.get('出典')
+            ))
+    else:
+        root = pattern.anchor or '.'
+        relative = pattern.relative_to(root) if pattern.is_absolute() else pattern
+        sources = [WorkbookSource.from_path(path) for path in sorted(Path(root).glob(str(relative)))]
+
+    if not sources:
+        raise FileNotFoundError(f"ワークブックが見つかりません: {pattern}")
+    labels = [source.label for source in sources]
+    duplicated = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicated:
+        raise ValueError(f"出典の名前が重複しています（マニフェストで出典を指定してください）: {', '.join(duplicated)}")
+    return sources
+
+def load_workbook(source: WorkbookSource) -> Tuple[pd.DataFrame, float]:
+    """ワークブック1件を読み込み、出典の列を付ける関数（プロセスプールの各プロセスで実行する）"""
+    started = time.perf_counter()
+    df = clean_data(load_excel_data(source.path))
+    metadata = source.metadata()
+    for i, col in enumerate(SOURCE_COLUMNS):
+        df.insert(i, col, metadata[col])
+    df['年'] = df['年'].astype('Int64')
+    return df, time.perf_counter() - started
+
+def load_workbooks(
+    sources: Sequence[WorkbookSource],
+    max_workers: Optional[int] = None
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """複数のワークブックをプロセスプールで並行して読み込み、出典の列を付けて1つにまとめる関数
+
+    Excelの解析はCPUで律速されるため、プロセス数はCPUのコア数（ファイル数が少なければファイル数）にする。
+    結果は指定した順に結合し、出典ごとの行数・所要時間の一覧と一緒に返す。
+
+    結合した表は出典ごとに同じ（団体コード, 性別）の行を持つ。団体コードで行を引く処理
+    （SharedDataset・RollupCube・SimilarityIndex等）には、select_sourceで1つの出典の行だけを渡すこと。
+    """
+    workers = max(min(max_workers or os.cpu_count() or 1, len(sources)), 1)
+    if workers == 1:
+        results = [load_workbook(source) for source in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(load_workbook, sources))
+
+    frames = [df for df, _ in results]
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SOURCE_COLUMNS)
+    report = [
+        {**source.metadata(), 'ファイル': source.path.name, '行数': len(df), '所要時間(秒)': elapsed}
+        for source, (df, elapsed) in zip(sources, results)
+    ]
+    return combined, report
+
+def select_source(combined: pd.DataFrame, label: str) -> pd.DataFrame:
+    """結合した表から1つの出典の行を取り出し、出典の列を除いて単一のワークブックと同じ形にする関数"""
+    labels = combined['出典'].unique().tolist()
+    if label not in labels:
+        raise ValueError(f"出典が見つかりません: {label}（{', '.join(map(str, labels))}）")
+    rows = combined[(combined['出典'] == label).to_numpy()]
+    return rows.drop(columns=SOURCE_COLUMNS).reset_index(drop=True)
+
+def ensure_single_source(df: pd.DataFrame) -> None:
+    """複数の出典の行を含む表であればエラーにする関数（団体コードで行を引く処理の前に確認する）"""
+    if '出典' in df.columns and df['出典'].nunique() > 1:
+        raise ValueError(
+            "複数の出典の行を含むため、団体コードごとの集計が重複します。select_sourceで1つの出典を選んでください"
+        )
+
+def main():
+    """複数のワークブックを並行して読み込み、出典ごとの件数を表示する
+
+    使い方: python -m app.dashboard.utils.workbooks [globのパターンまたはマニフェスト] [--workers=N]
+    """
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    workers = next((int(arg.split('=', 1)[1]) for arg in sys.argv[1:] if arg.startswith('--workers=')), None)
+    try:
+        sources = resolve_workbooks(args[0] if args else 'data/*nen.xlsx')
+    except (FileNotFoundError, ValueError) as e:
+        print(f"エラー: {str(e)}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    combined, report = load_workbooks(sources, workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(sources)}件のワークブックを読み込みました（{elapsed:.1f}秒、{len(combined):,}行）")
+    for row in report:
+        print(f"- {row['出典']}: {row['ファイル']}（{row['行数']:,}行、{row['所要時間(秒)']:.1f}秒）")
+
+if __name__ == '__main__':
+    main()
@@ -1,122 +1,183 @@
+from typing import Dict, List, Optional
+
+import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
-from app.dashboard.utils.constants import AGE_ORDER, GRAPH_COLORS
+from app.dashboard.utils.constants import AGE_ORDER, GRAPH_COLORS, LARGE_SELECTION_THRESHOLD
+
+# 選択数が多い場合の表示方法
+LARGE_SELECTION_MODES = {
+    'heatmap': 'ヒートマップ',
+    'small_multiples': '年齢区分ごとのグラフ',
+}
+
+def pivot_by_age(df: pd.DataFrame, value_column: str, groups: List[str] = AGE_ORDER) -> pd.DataFrame:
+    """縦長の表（市区町村×年齢区分）を1度だけピボットする関数（行は市区町村名の順、欠損は0）"""
+    return (
+        df.pivot_table(index='市区町村名', columns='年齢区分', values=value_column, aggfunc='first')
+        .reindex(columns=groups)
+        .fillna(0.0)
+        .sort_index()
+    )
+
+def create_stacked_share_chart(
+    pivots: Dict[str, pd.DataFrame],
+    title: str,
+    colors: Optional[Dict[str, str]] = None,
+    height: int = 500
+) -> go.Figure:
+    """年齢区分の構成比を市区町村ごとに積み上げた棒グラフを作成する関数
+
+    pivotsは表示名と市区町村×年齢区分の表の対応。複数ある場合は市区町村ごとに棒を並べる。
+    トレースは年齢区分ごとに1つで、値は表の列をそのまま使う。
+    """
+    labels = list(pivots)
+    first = pivots[labels[0]]
+    municipalities = first.index.astype(str)
+    if len(labels) == 1 and not labels[0]:
+        x_labels = list(municipalities)
+    else:
+        x_labels = [f"{mun}\n({label})" for mun in municipalities for label in labels]
+
+    fig = go.Figure()
+    for group in first.columns:
+        # 市区町村ごとに各表の値を交互に並べる
+        values = np.column_stack([pivots[label][group].to_numpy(dtype=float) for label in labels]).ravel()
+        fig.add_trace(go.Bar(
+            name=group,
+            x=x_labels,
+            y=values,
+            text=[f'{v:.1f}%' for v in values],
+            textposition='auto',
+            marker_color=(colors or {}).get(group)
+        ))
+
+    fig.update_layout(
+        title=title,
+        barmode='stack',
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=height,
+        yaxis_title='割合 (%)',
+        yaxis={'range': [0, 100]},
+        margin=dict(t=100, b=50)
+    )
+    return fig
+
+def create_share_heatmap(
+    pivots: Dict[str, pd.DataFrame],
+    title: str,
+    sort_group: Optional[str] = None
+) -> go.Figure:
+    """市区町村×年齢区分の構成比をヒートマップで表示する関数
+
+    行はsort_group（省略時は最後の年齢区分）の値の大きい順に並べる。複数の表は横に並べる。
+    """
+    from plotly.subplots import make_subplots
+
+    labels = list(pivots)
+    first = pivots[labels[0]]
+    sort_group = sort_group or first.columns[-1]
+    order = first[sort_group].sort_values(ascending=True).index
+
+    fig = make_subplots(
+        rows=1, cols=len(labels), shared_yaxes=True, horizontal_spacing=0.03,
+        subplot_titles=[label for label in labels if label] or None
+    )
+    for i, label in enumerate(labels):
+        pivot = pivots[label].loc[order]
+        fig.add_trace(go.Heatmap(
+            z=pivot.to_numpy(dtype=float),
+            x=list(pivot.columns),
+            y=list(pivot.index.astype(str)),
+            coloraxis='coloraxis',
+            hovertemplate=f'%{{y}}<br>%{{x}}: %{{z:.1f}}%<extra>{label}</extra>'
+        ), row=1, col=i + 1)
+
+    fig.update_layout(
+        title=f"{title}（{sort_group}の割合が高い順）",
+        coloraxis={'colorscale': 'YlOrRd', 'colorbar': {'title': '%'}},
+        # 行数に合わせて高さを変え、市区町村名を読めるようにする
+        height=max(500, 16 * len(order) + 150),
+        margin=dict(t=100, b=50)
+    )
+    return fig
 
-def create_age_distribution_chart(df: pd.DataFrame, title: str = None) -> go.Figure:
+def create_small_multiples(
+    pivots: Dict[str, pd.DataFrame],
+    title: str,
+    colors: Optional[Dict[str, str]] = None,
+    columns: int = 3
+) -> go.Figure:
+    """年齢区分ごとに、全市区町村の構成比を大きい順に並べた小さなグラフを作成する関数"""
+    from plotly.subplots import make_subplots
+
+    labels = list(pivots)
+    first = pivots[labels[0]]
+    groups = list(first.columns)
+    rows = (len(groups) + columns - 1) // columns
+
+    fig = make_subplots(rows=rows, cols=columns, subplot_titles=groups, vertical_spacing=0.12)
+    for i, group in enumerate(groups):
+        order = first[group].sort_values(ascending=False).index
+        for j, label in enumerate(labels):
+            fig.add_trace(go.Bar(
+                name=label or group,
+                x=list(order.astype(str)),
+                y=pivots[label].loc[order, group].to_numpy(dtype=float),
+                marker_color=(colors or {}).get(group),
+                opacity=1.0 if j == 0 else 0.5,
+                showlegend=False,
+                hovertemplate=f'%{{x}}<br>{label or group}: %{{y:.1f}}%<extra></extra>'
+            ), row=i // columns + 1, col=i % columns + 1)
+
+    fig.update_xaxes(showticklabels=False)
+    fig.update_layout(
+        title=title + ('' if len(labels) == 1 else f"（濃い色: {labels[0]}、薄い色: {labels[1]}）"),
+        barmode='overlay',
+        height=300 * rows + 100,
+        margin=dict(t=100, b=50)
+    )
+    return fig
+
+def create_comparison_chart(
+    pivots: Dict[str, pd.DataFrame],
+    title: str,
+    colors: Optional[Dict[str, str]] = None,
+    mode: str = 'heatmap',
+    threshold: int = LARGE_SELECTION_THRESHOLD,
+    height: int = 500
+) -> go.Figure:
+    """選択数に応じて比較グラフを作成する関数（thresholdを超えたらmodeの表示に切り替える）"""
+    if len(next(iter(pivots.values()))) <= threshold:
+        return create_stacked_share_chart(pivots, title, colors, height)
+    if mode == 'small_multiples':
+        return create_small_multiples(pivots, title, colors)
+    return create_share_heatmap(pivots, title)
+
+def create_age_distribution_chart(df: pd.DataFrame, title: str = None, mode: str = 'heatmap') -> go.Figure:
     """年齢構成比のグラフを作成する関数"""
     try:
-        # 市区町村のリストを取得
-        municipalities = sorted(df['市区町村名'].unique())
-        
-        # グラフの作成
-        fig = go.Figure()
-        
-        # 年齢区分ごとにデータを追加
-        for age in AGE_ORDER:
-            age_data = df[df['年齢区分'] == age]
-            percentages = []
-            
-            for mun in municipalities:
-                data = age_data[age_data['市区町村名'] == mun]
-                percentage = data['構成比'].iloc[0] if not data.empty else 0
-                percentages.append(percentage)
-            
-            fig.add_trace(go.Bar(
-                name=age,
-                x=municipalities,
-                y=percentages,
-                text=[f"{val:.1f}%" for val in percentages],
-                textposition='auto',
-                marker_color=GRAPH_COLORS[age]
-            ))
-        
-        # レイアウトの設定
-        fig.update_layout(
-            title=title or '年齢区分別人口構成比',
-            barmode='stack',
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            height=500,
-            yaxis_title='構成比（％）',
-            yaxis={'range': [0, 100]},
-            xaxis_title='市区町村'
-        )
-        
+        pivot = pivot_by_age(df, '構成比')
+        fig = create_comparison_chart({'': pivot}, title or '年齢区分別人口構成比', GRAPH_COLORS, mode)
+        if len(pivot) <= LARGE_SELECTION_THRESHOLD:
+            fig.update_layout(yaxis_title='構成比（％）', xaxis_title='市区町村')
         return fig
-    
+
     except Exception as e:
         raise Exception(f"年齢構成比グラフの作成に失敗しました: {str(e)}")
 
-def create_voting_power_chart(df: pd.DataFrame) -> go.Figure:
+def create_voting_power_chart(df: pd.DataFrame, mode: str = 'heatmap') -> go.Figure:
     """投票動向グラフを作成する関数"""
     try:
-        # 市区町村のリストを取得
-        municipalities = sorted(df['市区町村名'].unique())
-        
-        # グラフの作成
-        fig = go.Figure()
-        
-        # x軸のラベルを作成
-        x_labels = []
-        for mun in municipalities:
-            x_labels.extend([f"{mun}\n(人口構成比)", f"{mun}\n(投票影響度)"])
-        
-        # 年齢区分ごとにデータを追加
-        for age in AGE_ORDER:
-            age_data = df[df['年齢区分'] == age]
-            y_values = []
-            text_values = []
-            
-            for mun in municipalities:
-                mun_data = age_data[age_data['市区町村名'] == mun]
-                if not mun_data.empty:
-                    y_values.extend([
-                        mun_data['人口構成比'].values[0],
-                        mun_data['投票影響度'].values[0]
-                    ])
-                    text_values.extend([
-                        f'{mun_data["人口構成比"].values[0]:.1f}%',
-                        f'{mun_data["投票影響度"].values[0]:.1f}%'
-                    ])
-                else:
-                    y_values.extend([0, 0])
-                    text_values.extend(['0.0%', '0.0%'])
-            
-            fig.add_trace(go.Bar(
-                name=age,
-                x=x_labels,
-                y=y_values,
-                text=text_values,
-                textposition='auto',
-                marker_color=GRAPH_COLORS[age],
-                showlegend=True
-            ))
-        
-        # レイアウトの設定
-        fig.update_layout(
-            title='年齢区分別の人口構成比と投票影響度（20歳以上）',
-            barmode='stack',
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            height=500,
-            yaxis_title='割合 (%)',
-            yaxis={'range': [0, 100]},
-            margin=dict(t=100)
-        )
-        
-        return fig
-    
+        pivots = {label: pivot_by_age(df, label) for label in ['人口構成比', '投票影響度']}
+        return create_comparison_chart(pivots, '年齢区分別の人口構成比と投票影響度（20歳以上）', GRAPH_COLORS, mode)
+
     except Exception as e:
-        raise Exception(f"投票動向グラフの作成に失敗しました: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"投票動向グラフの作成に失敗しました: {str(e)}")
@@ -0,0 +1,122 @@
+import json
+import sys
+from datetime import datetime
+
+from app.dashboard.utils.build_pipeline import ROOT_DIR, BuildStep, run_pipeline, select_steps
+
+# 国土数値情報のURL（最新の行政区域データ）
+N03_URL = "https://nlftp.mlit.go.jp/ksj/gml/data/N03/N03-2023/N03-20230101_GML.zip"
+N03_ZIP = 'data/N03.zip'
+EXCEL_PATH = 'data/24nsnen.xlsx'
+
+def download_n03():
+    from download_gml import download_file
+    (ROOT_DIR / 'data').mkdir(exist_ok=True)
+    if download_file(N03_URL, str(ROOT_DIR / N03_ZIP)) is None:
+        raise RuntimeError("ダウンロードに失敗しました")
+
+def extract_n03():
+    from download_gml import extract_zip
+    extract_zip(str(ROOT_DIR / N03_ZIP), str(ROOT_DIR / 'data'))
+
+def create_centroids():
+    from create_coordinates_json import process_geojson
+    geojson_path = sorted((ROOT_DIR / 'data').glob('*.geojson'))[0]
+    municipalities = process_geojson(str(geojson_path))
+    with open(ROOT_DIR / 'city_coordinates.json', 'w', encoding='utf-8') as f:
+        json.dump(municipalities, f, ensure_ascii=False, indent=2)
+
+def create_boundaries():
+    from create_boundaries_json import create_boundaries
+    geojson_path = sorted((ROOT_DIR / 'data').glob('*.geojson'))[0]
+    create_boundaries(str(geojson_path))
+
+def create_tiles():
+    from app.dashboard.utils.vector_tiles import main
+    main()
+
+def create_p34_coordinates():
+    from app.dashboard.utils.create_coordinates_json import create_coordinates_database
+    create_coordinates_database()
+
+def create_geo_join():
+    from app.dashboard.utils.data_loader import clean_data, load_excel_data
+    from app.dashboard.utils.geo_join import load_geo_join_table, print_join_report
+    df = clean_data(load_excel_data(ROOT_DIR / EXCEL_PATH))
+    _, report = load_geo_join_table(df)
+    print_join_report(report)
+
+def shared_manifest():
+    """共有配列のマニフェストのパス（ESTAT_SHARED_DIRで保存先を変えた場合はその下）"""
+    from app.dashboard.utils.shared_arrays import MANIFEST_NAME, SHARED_DIR
+    return [str((SHARED_DIR / MANIFEST_NAME).resolve())]
+
+def publish_workbook_arrays():
+    from app.dashboard.utils.shared_arrays import main
+    sys.argv = [sys.argv[0], str(ROOT_DIR / EXCEL_PATH)]
+    main()
+
+STEPS = [
+    BuildStep('download', download_n03, outputs=[N03_ZIP], params={'url': N03_URL}),
+    BuildStep('extract', extract_n03, inputs=[N03_ZIP], outputs=['data/*.geojson'], depends_on=['download']),
+    BuildStep(
+        'centroids', create_centroids,
+        inputs=['data/*.geojson'], outputs=['city_coordinates.json'], depends_on=['extract']
+    ),
+    BuildStep(
+        'boundaries', create_boundaries,
+        inputs=['data/*.geojson'], outputs=['app/dashboard/data/boundaries.json'], depends_on=['extract']
+    ),
+    BuildStep(
+        'tiles', create_tiles,
+        inputs=['app/dashboard/data/boundaries.json'],
+        outputs=['app/dashboard/data/tiles/metadata.json'],
+        depends_on=['boundaries']
+    ),
+    BuildStep(
+        'p34_coordinates', create_p34_coordinates,
+        inputs=['app/dashboard/data/geocode/P34-14_*_GML.zip'],
+        outputs=['app/dashboard/data/city_coordinates.json']
+    ),
+    BuildStep(
+        'geo_join', create_geo_join,
+        inputs=[
+            EXCEL_PATH, 'city_coordinates.json', 'app/dashboard/data/city_coordinates*.json',
+            'app/dashboard/data/geocode/P34-14_*_GML.zip'
+        ],
+        outputs=['app/dashboard/data/cache/geo_join.json'],
+        depends_on=['centroids', 'p34_coordinates']
+    ),
+    BuildStep(
+        'workbook_arrays', publish_workbook_arrays,
+        inputs=[EXCEL_PATH, 'app/dashboard/data/cache/geo_join.json'],
+        outputs=shared_manifest,
+        depends_on=['geo_join']
+    ),
+]
+
+def main():
+    """派生データを依存関係の順にまとめて作成する
+
+    使い方: python build_data.py [ステップ名 ...] [--force]
+    ステップ名を指定した場合は、そのステップと依存先だけを実行する。
+    """
+    args = sys.argv[1:]
+    force = '--force' in args
+    targets = [arg for arg in args if not arg.startswith('--')]
+
+    print("派生データ作成プログラム")
+    print("=" * 50)
+    print(f"処理開始: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    steps = select_steps(STEPS, targets) if targets else STEPS
+    results = run_pipeline(steps, force=force)
+
+    print(f"\n処理完了: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    for name, result in results.items():
+        print(f"- {name}: {result['状態']}")
+    if any(result['状態'] in ('失敗', '中止') for result in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import json
+import glob
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# 進捗表示とトポロジーの処理（numpy・pandas）は起動を軽くするため、各処理の開始時に読み込む
+
+def load_n03_polygons(file_path: str) -> Tuple[Dict[str, List], Dict[str, Dict[str, str]]]:
+    """N03のGeoJSONを読み込み、団体コードごとにポリゴンをまとめる"""
+    from tqdm import tqdm
+    from app.dashboard.utils.boundaries import geometry_to_polygons
+    from app.dashboard.utils.geo_join import normalize_municipality_code
+
+    print(f"\nステップ1: GeoJSONファイル読み込み中... ({os.path.basename(file_path)})")
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    features = data.get('features', [])
+    print(f"読み込み完了: {len(features):,}件のデータ")
+
+    polygons_by_code = defaultdict(list)
+    properties = {}
+    skipped = 0
+    for feature in tqdm(features, desc="地物の集約"):
+        props = feature.get('properties', {})
+        code = normalize_municipality_code(props.get('N03_007'))
+        # 所属未定地などコードのない地物は除外
+        if code is None:
+            skipped += 1
+            continue
+
+        polygons_by_code[code].extend(geometry_to_polygons(feature.get('geometry') or {}))
+        if code not in properties:
+            # 政令指定都市の区は「〇〇市△△区」の形にする
+            city = props.get('N03_003') or ''
+            name = props.get('N03_004') or ''
+            properties[code] = {
+                'name': f"{city}{name}" if city.endswith('市') and name.endswith('区') else name,
+                'prefecture': props.get('N03_001')
+            }
+
+    print(f"団体数: {len(polygons_by_code):,}件（除外: {skipped:,}件）")
+    return polygons_by_code, properties
+
+def create_boundaries(file_path: str, output_path: Optional[str] = None) -> Dict:
+    """境界データを融合・簡略化・量子化して保存する（output_pathの既定はBOUNDARIES_PATH）"""
+    from app.dashboard.utils.boundaries import BOUNDARIES_PATH, SIMPLIFY_TOLERANCES, Topology, encode_topology
+    from app.dashboard.utils.designated_cities import ward_groups
+    from app.dashboard.utils.rollup import DESIGNATED_CITY_NAMES
+
+    output_path = output_path or str(BOUNDARIES_PATH)
+    print(f"\n処理開始: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    polygons_by_code, properties = load_n03_polygons(file_path)
+
+    print("\nステップ2: トポロジー構築中（共有境界の抽出と団体ごとの融合）...")
+    topology = Topology.from_polygons(polygons_by_code, properties)
+    print(f"弧の数: {len(topology.arcs):,}件")
+
+    # 政令指定都市は区の境界線を共有する弧から、全市をまとめて市の形状に融合する
+    groups = ward_groups(topology.objects)
+    dissolved = topology.dissolve(groups)
+    for city, wards in groups.items():
+        topology.properties[city] = {
+            'name': DESIGNATED_CITY_NAMES[city[:5]],
+            'prefecture': properties[wards[0]]['prefecture'],
+            'wards': wards
+        }
+    print(f"政令指定都市: {len(dissolved):,}市を融合")
+
+    print("\nステップ3: 解像度ごとの簡略化と量子化...")
+    encoded = encode_topology(topology, SIMPLIFY_TOLERANCES, {**topology.objects, **dissolved})
+    for level, info in encoded['levels'].items():
+        points = sum(len(arc) for arc in info['arcs'])
+        print(f"- {level}（許容誤差 {info['tolerance']}度）: {points:,}点")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(encoded, f, ensure_ascii=False, separators=(',', ':'))
+
+    size_mb = os.path.getsize(output_path) / 1024 / 1024
+    print(f"\nファイル保存完了: {output_path} ({size_mb:.1f}MB)")
+    print(f"処理完了: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    return encoded
+
+def main():
+    try:
+        print("市区町村境界データ生成プログラム")
+        print("=" * 50)
+
+        # GeoJSONファイルの検索
+        geojson_files = glob.glob('data/*.geojson')
+        if not geojson_files:
+            raise FileNotFoundError("GeoJSONファイルが見つかりません")
+
+        create_boundaries(geojson_files[0])
+
+    except Exception as e:
+        print(f"\nエラーが発生しました: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,8 @@ import json
 import glob
 import time
 from typing import Dict, Tuple, List
-from tqdm import tqdm
 from datetime import datetime
 
-# 政令指定都市のコードリスト（2023年1月時点）
-DESIGNATED_CITIES = {
-    "札幌市": "01100", "仙台市": "04100", "さいたま市": "11100", "千葉市": "12100",
-    "横浜市": "14100", "川崎市": "14130", "相模原市": "14150", "新潟市": "15100",
-    "静岡市": "22100", "浜松市": "22130", "名古屋市": "23100", "京都市": "26100",
-    "大阪市": "27100", "堺市": "27140", "神戸市": "28100", "岡山市": "33100",
-    "広島市": "34100", "北九州市": "40100", "福岡市": "40130", "熊本市": "43100"
-}
-
 # 除外するエリアのキーワード
 EXCLUDE_KEYWORDS = [
     "埋立地", "境界地", "所属未定地", "岩", "列岩", "河口部", "地先", "沖", "海",
@@ -74,6 +64,10 @@ def calculate_centroid(coords: List) -> Tuple[float, float]:
 
 def process_geojson(file_path: str) -> Dict:
     """GeoJSONファイルを処理"""
+    # 進捗表示と区の融合（numpy・pandas）は起動を軽くするため処理の開始時に読み込む
+    from tqdm import tqdm
+    from app.dashboard.utils.designated_cities import load_designated_cities
+    
     print(f"\n処理開始: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"ファイル: {os.path.basename(file_path)}")
     
@@ -97,11 +91,6 @@ def process_geojson(file_path: str) -> Dict:
             code = properties.get('N03_007')
             name = properties.get('N03_004')
             
-            # 政令指定都市の区は別途処理
-            if code[:5] in DESIGNATED_CITIES.values():
-                counter.update("skipped")
-                continue
-            
             # 無効な市区町村はスキップ
             if not is_valid_municipality(name, code):
                 counter.update("skipped")
@@ -139,6 +128,19 @@ def process_geojson(file_path: str) -> Dict:
             print(f"\n警告: {name}({code})の処理中にエラー: {str(e)}")
             counter.update("error")
     
+    # 政令指定都市は区を融合した市の形状から、市・区とも面積で重み付けした重心を使う
+    print("\nステップ3: 政令指定都市の区の融合中...")
+    designated = load_designated_cities(file_path, features)
+    for group, type_name in (('cities', 'designated_city'), ('wards', 'ward')):
+        for code, item in designated[group].items():
+            municipalities[code[:5]] = {
+                "name": item['name'],
+                "type": type_name,
+                "lat": item['lat'],
+                "lng": item['lng']
+            }
+    print(f"政令指定都市: {len(designated['cities']):,}市（{len(designated['wards']):,}区、N03 {designated['vintage']}）")
+    
     # 処理結果の表示
     print(f"\n処理完了: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"最終結果: {counter.get_progress()}")
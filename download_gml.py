@@ -1,13 +1,15 @@
 import os
-import requests
 import zipfile
 from typing import Optional
-from tqdm import tqdm
 
 def download_file(url: str, save_path: str) -> Optional[str]:
     """
     URLからファイルをダウンロード（進捗バー付き）
     """
+    # 起動を軽くするため、ダウンロードの開始時に読み込む
+    import requests
+    from tqdm import tqdm
+    
     try:
         response = requests.get(url, stream=True)
         response.raise_for_status()
@@ -38,6 +40,8 @@ def extract_zip(zip_path: str, extract_path: str) -> None:
     """
     ZIPファイルを解凍（進捗表示付き）
     """
+    from tqdm import tqdm
+    
     try:
         print("解凍を開始します...")
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 import streamlit as st
 from app.dashboard.main import run_dashboard
+from app.dashboard.utils.warmup import start_dashboard_warmup
 
 def main():
     # プロジェクトのルートディレクトリを取得
@@ -15,7 +16,10 @@ def main():
         layout="wide"
     )
     
-    run_dashboard(str(excel_path))
+    # データ・ライブラリの読み込みを並行して開始（プロセスで1度だけ）
+    warmup = start_dashboard_warmup(str(excel_path))
+    
+    run_dashboard(str(excel_path), warmup)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file